@@ -4,16 +4,26 @@ import os
 import streamlit as st
 import pandas as pd
 
-from core.io import load_input_data, normalize_triangle_like
-from core.guards import section_toggle, secure_delete
+from core.cache import load_normalized
+from ui.guards import section_toggle, secure_delete
+from ui.llm import llm_or_error, prompt_status
+from ui.perf import session_tracer, render_perf_panel
 from core.stats import run_basic_eda
-from core.export import export_tur1_excel, build_tur1_summary
-from core.prompts import prompt_tur1, prompt_tur2_from_excel, prompt_tur3
+from core.export import export_tur1_reports, read_tur1_summary
+from core.prompts import build_prompt_tur1, build_prompt_tur2, build_prompt_tur3
 from core.schemas import validate_json_output
-from core.viz import render_visuals
-from services.llm_client import call_llm
+from core.outliers import resolve_outlier_method
+from core.segments import run_segments
+from core.quality import quality_frame
+from core.store import shared_store
+from services.llm_client import call_llm, call_llm_stream, release_api_key
+from services.llm_cache import cache_mode
+from core.telemetry import activate
 
 st.set_page_config(page_title="reserveai — Kasko Hasar Analizi", layout="wide")
+# per-session span collector; every core / LLM stage of this run reports into it when enabled
+tracer = session_tracer()
+activate(tracer)
 
 st.title("reserveai · Kasko — 3 Turlu Akış")
 st.caption("Tur-1: EDA → Tur-2: Öneriler → Tur-3: Görselleştirme")
@@ -25,6 +35,23 @@ with st.sidebar:
     st.info("Her section kendi API anahtarını alır; section kapandığında anahtar **silinecektir**.")
     st.divider()
     st.markdown("**Örnek veri** için: `assets/kasko_cumulative_claims_sample.csv`")
+    llm_replay = cache_mode() == "replay"
+    llm_stream = st.toggle("LLM yanıtlarını akışla göster", value=True, key="llm_stream")
+    st.caption(f"LLM önbellek modu: `{cache_mode()}`" + (" — kayıtlı yanıtlar ağsız oynatılır." if llm_replay else ""))
+    tracer.enabled = st.toggle("Performans izleme (span'ler)", value=tracer.enabled, key="perf_enabled")
+    perf_box = st.container()
+
+
+def stop():
+    # st.stop() ends the run before the bottom of the page: show the performance panel first
+    with perf_box:
+        render_perf_panel(tracer)
+    st.stop()
+
+def tur1_output() -> dict:
+    # shared EDA (store) + this session's own LLM summary
+    return {"eda": st.session_state["tur1_report"].get()["eda"], "llm_summary": st.session_state.get("tur1_llm")}
+
 
 # ────────────────────────────────────────────────────────────────────────────────
 # Tur-1 (Analiz/EDA)
@@ -33,23 +60,42 @@ active_1 = section_toggle("tur1_active", label="Tur 1 Aktif mi?")
 if active_1:
     col1, col2 = st.columns([2, 1])
     with col1:
-        src = st.radio("Veri kaynağı", ["CSV yükle", "Örnek veriyi kullan"], horizontal=True, key="tur1_src")
-        if src == "CSV yükle":
-            up = st.file_uploader("Kümülatif gerçekleşen hasar verisini yükle (CSV)", type=["csv"], key="tur1_file")
-            df = load_input_data(up) if up else None
+        src = st.radio("Veri kaynağı", ["Dosya yükle", "Örnek veriyi kullan"], horizontal=True, key="tur1_src")
+        load_kw = {}
+        if src == "Dosya yükle":
+            up = st.file_uploader(
+                "Kümülatif gerçekleşen hasar verisini yükle (CSV / Parquet / Arrow)",
+                type=["csv", "parquet", "pq", "arrow", "feather", "ipc"], key="tur1_file",
+            )
+            if st.checkbox("Hasar bazlı (claim-level) CSV — parça parça okuyup üçgene indir", key="tur1_claim_level"):
+                load_kw["claim_level"] = True
         else:
-            df = load_input_data("assets/kasko_cumulative_claims_sample.csv")
+            up = "assets/kasko_cumulative_claims_sample.csv"
+
+        # İçerik hash'i ile önbellek: aynı dosya tekrar açılınca parse/normalize atlanır
+        try:
+            df_norm, notes_norm, tri, data_key = load_normalized(up, **load_kw) if up else (None, [], None, None)
+        except ValueError as e:
+            st.error(str(e))
+            df_norm = None
 
-        if df is not None:
-            st.success(f"Veri yüklendi: {len(df):,} satır")
+        if df_norm is not None:
+            st.success(f"Veri yüklendi: {len(df_norm):,} satır")
             with st.expander("İlk satırlar", expanded=False):
-                st.dataframe(df.head(50), use_container_width=True)
-            df_norm, notes_norm = normalize_triangle_like(df)
+                st.dataframe(df_norm.head(50), use_container_width=True)
             if notes_norm:
                 st.warning("\n".join(notes_norm))
-            st.session_state["tur1_df_norm"] = df_norm
+            # one shared read-only copy per content hash; the session keeps only a handle
+            handle = st.session_state.get("tur1_data")
+            if handle is None or handle.key != data_key:
+                st.session_state["tur1_data"] = shared_store().put((df_norm, tri), key=data_key)
+            seg_options = [c for c in df_norm.columns if not pd.api.types.is_numeric_dtype(df_norm[c])]
+            seg_keys = st.multiselect(
+                "Segment anahtarları (her segment ayrı işlenir)", seg_options,
+                default=[c for c in ["line_of_business"] if c in seg_options], key="tur1_seg_keys",
+            )
         else:
-            st.stop()
+            stop()
 
     with col2:
         api_key = st.text_input("OpenAI API Key (Tur 1)", type="password", key="tur1_api")
@@ -58,37 +104,68 @@ if active_1:
 
     if run_btn:
         with st.spinner("Tur-1: EDA çalışıyor..."):
-            df_norm = st.session_state["tur1_df_norm"]
-            eda_result = run_basic_eda(df_norm)
+            df_norm, tri = st.session_state["tur1_data"].get()
+            # EDA + Excel / bundle are computed once per dataset and shared by every session that opens it
+            store = shared_store()
+            report = store.open(f"{data_key}:tur1")
+            if report is None:
+                eda_result = run_basic_eda(df_norm, tri=tri)
+                xls, bundle = export_tur1_reports(df_norm, eda_result, tri=tri)
+                report = store.put({"eda": eda_result, "excel": xls.getvalue(), "bundle": bundle.getvalue()},
+                                   key=f"{data_key}:tur1")
+            st.session_state["tur1_report"] = report
+            shared = report.get()
+            eda_result = shared["eda"]
+            dq = quality_frame(eda_result.get("data_quality", {}))
+            failed = dq[dq["count"].fillna(0) > 0] if len(dq) else dq
+            if len(failed):
+                st.warning(f"Veri kalitesi: {len(failed)} kural ihlal edildi ({int(failed['count'].sum()):,} satır).")
+            with st.expander("Veri kalitesi kuralları", expanded=bool(len(failed))):
+                st.dataframe(dq, use_container_width=True, hide_index=True)
+            if seg_keys:
+                seg_run = run_segments(df_norm, keys=seg_keys, methods=("iqr",))
+                st.session_state["tur1_segments"] = store.put(seg_run, key=f"{data_key}:segments:{seg_keys}")
+                with st.expander(f"Segment bazlı özet ({len(seg_run.segments)} segment)", expanded=False):
+                    st.dataframe(seg_run.segment_frame(), use_container_width=True)
 
             # GPT'ye kısa özet (opsiyonel)
             llm_summary = None
             try:
-                prompt = prompt_tur1(eda_result)
-                if api_key:
-                    llm_summary = call_llm(api_key, model, prompt)
+                built = build_prompt_tur1(eda_result)
+                ready = prompt_status("Tur-1", built) and (api_key or llm_replay)
+                if ready and llm_stream:
+                    live = st.empty()
+                    llm_summary = llm_or_error(call_llm_stream, api_key, model, built.text, on_delta=live.markdown)
+                    live.empty()
+                elif ready:
+                    llm_summary = llm_or_error(call_llm, api_key, model, built.text)
             except Exception:
                 llm_summary = None
 
-            payload = {"eda": eda_result, "llm_summary": llm_summary}
-            st.session_state["tur1_out"] = payload
+            st.session_state["tur1_llm"] = llm_summary
+            payload = tur1_output()
 
-            # EXCEL RAPORU OLUŞTUR & İNDİR
-            xls = export_tur1_excel(df_norm, build_tur1_summary(df_norm))
-            st.session_state["tur1_excel_bytes"] = xls.getvalue()
+            # EXCEL RAPORU İNDİR
             st.success("Tur-1 tamamlandı. Excel raporu hazır.")
             st.download_button(
                 "Tur-1 Excel Raporunu İndir",
-                data=xls.getvalue(),
+                data=shared["excel"],
                 file_name="reserveai_tur1_summary.xlsx",
                 mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
             )
+            st.download_button(
+                "Tur-1 Veri Paketini İndir (Parquet/CSV/JSON)",
+                data=shared["bundle"],
+                file_name="reserveai_tur1_bundle.zip",
+                mime="application/zip",
+            )
             with st.expander("Tur-1 Çıktısı (JSON)", expanded=False):
                 st.json(payload)
 
 else:
     # Section kapandı -> ilgili bilgileri sil
-    secure_delete(["tur1_api", "tur1_out", "tur1_df_norm", "tur1_file", "tur1_excel_bytes"])
+    release_api_key(st.session_state.get("tur1_api"))
+    secure_delete(["tur1_api", "tur1_llm", "tur1_report", "tur1_data", "tur1_segments", "tur1_file"])
 
 st.divider()
 
@@ -97,9 +174,9 @@ st.divider()
 st.header("Tur 2 — Öneriler (Detaylara inme)")
 active_2 = section_toggle("tur2_active", label="Tur 2 Aktif mi?")
 if active_2:
-    if "tur1_out" not in st.session_state or "tur1_df_norm" not in st.session_state:
+    if "tur1_report" not in st.session_state or "tur1_data" not in st.session_state:
         st.warning("Tur-2 için Tur-1 verisi ve çıktısı gerekli.")
-        st.stop()
+        stop()
 
     col1, col2 = st.columns([2, 1])
     with col1:
@@ -109,24 +186,12 @@ if active_2:
         up_xls = st.file_uploader("Tur-1 Excel (reserveai_tur1_summary.xlsx)", type=["xlsx"], key="tur2_xls")
         if up_xls is not None:
             try:
-                x = pd.read_excel(up_xls, sheet_name=None)
-                shape = x.get("Summary")
-                cols = x.get("Columns")
-                sums = x.get("NumericSums")
-                segs = x.get("Segments")
-                ata = x.get("AgeToAge")
-                tur1_excel_summary = {
-                    "shape": shape.to_dict(orient="records")[0] if shape is not None and len(shape) else {},
-                    "columns": cols.to_dict(orient="records") if cols is not None else [],
-                    "numeric_sums": sums.to_dict(orient="records") if sums is not None else [],
-                    "segments": segs.to_dict(orient="records") if segs is not None else [],
-                    "age_to_age": ata.to_dict(orient="records") if ata is not None else [],
-                }
+                tur1_excel_summary = read_tur1_summary(up_xls)
             except Exception as e:
                 st.error(f"Excel okuma hatası: {e}")
 
         with st.expander("Tur-1 EDA Özeti", expanded=False):
-            st.json(st.session_state["tur1_out"]["eda"])
+            st.json(st.session_state["tur1_report"].get()["eda"])
 
     with col2:
         api_key2 = st.text_input("OpenAI API Key (Tur 2)", type="password", key="tur2_api")
@@ -135,13 +200,29 @@ if active_2:
 
     if run2:
         with st.spinner("Tur-2: Öneriler hazırlanıyor..."):
-            df_norm = st.session_state["tur1_df_norm"]
+            df_norm, _ = st.session_state["tur1_data"].get()
             excel_sum = tur1_excel_summary if tur1_excel_summary is not None else {"note": "excel not uploaded"}
-            prompt2 = prompt_tur2_from_excel(excel_sum, st.session_state["tur1_out"]["eda"])
+            built2 = build_prompt_tur2(excel_sum, st.session_state["tur1_report"].get()["eda"])
+            ready2 = prompt_status("Tur-2", built2) and (api_key2 or llm_replay)
 
             suggestions = None
-            if api_key2:
-                suggestions = call_llm(api_key2, model2, prompt2)
+            if ready2 and llm_stream:
+                # Akış: metin geldikçe gösterilir; top_recommendation tamamlanınca yöntem hemen seçilebilir
+                live, early = st.empty(), st.empty()
+
+                def _on_key(key, value):
+                    if key == "top_recommendation" and isinstance(value, dict) and value.get("method"):
+                        st.session_state["method_choice"] = value["method"]
+                        early.selectbox("Uygulanacak yöntem (yanıt tamamlanıyor):", [value["method"]], key="method_choice_early")
+
+                suggestions = llm_or_error(
+                    call_llm_stream, api_key2, model2, built2.text,
+                    on_delta=lambda buf: live.code(buf, language="json"), on_key=_on_key,
+                )
+                live.empty()
+                early.empty()
+            elif ready2:
+                suggestions = llm_or_error(call_llm, api_key2, model2, built2.text)
 
             # Eğer LLM çağrısı yoksa demo iskeleti
             if not suggestions or not isinstance(suggestions, dict):
@@ -198,6 +279,7 @@ if active_2:
             if "method_choice" in st.session_state:
                 st.caption(f"Seçili yöntem: **{st.session_state['method_choice']}**")
 else:
+    release_api_key(st.session_state.get("tur2_api"))
     secure_delete(["tur2_api", "tur2_out", "method_choice"])
 
 st.divider()
@@ -207,31 +289,33 @@ st.divider()
 st.header("Tur 3 — Görselleştirme")
 active_3 = section_toggle("tur3_active", label="Tur 3 Aktif mi?")
 if active_3:
-    if ("tur1_df_norm" not in st.session_state) or ("tur1_out" not in st.session_state) or ("tur2_out" not in st.session_state):
+    if ("tur1_data" not in st.session_state) or ("tur1_report" not in st.session_state) or ("tur2_out" not in st.session_state):
         st.warning("Tur-3 için Tur-1 verisi/çıktısı ve Tur-2 çıktısı gerekli.")
-        st.stop()
+        stop()
 
     col1, col2 = st.columns([2, 1])
     with col1:
         st.write("Tur-1 & Tur-2 çıktıları ve normalize veri ile grafik + seçilen yöntem analizi.")
         with st.expander("Tur-1 & Tur-2 özetleri", expanded=False):
-            st.json({"tur1": st.session_state["tur1_out"], "tur2": st.session_state["tur2_out"]})
+            st.json({"tur1": tur1_output(), "tur2": st.session_state["tur2_out"]})
     with col2:
         api_key3 = st.text_input("OpenAI API Key (Tur 3)", type="password", key="tur3_api")
         model3 = st.text_input("Model", value=st.session_state.get("tur2_model", "gpt-4o-mini"), key="tur3_model")
         run3 = st.button("Tur 3 — Görselleştir", use_container_width=True)
 
     if run3:
+        # altair + chart layer load only when Tur-3 actually renders (faster cold start)
+        from ui.viz import render_visuals, render_outlier_method, render_reserves
         with st.spinner("Tur-3: Grafikler oluşturuluyor ve yöntem uygulanıyor..."):
-            df_norm = st.session_state["tur1_df_norm"]
+            df_norm, tri = st.session_state["tur1_data"].get()
             viz_spec = None
 
             # 1) LLM'den kısa anlatım (opsiyonel)
             narr = None
             try:
-                prompt3 = prompt_tur3(df_norm, st.session_state["tur1_out"], st.session_state["tur2_out"])
-                if api_key3:
-                    narr = call_llm(api_key3, model3, prompt3)
+                built3 = build_prompt_tur3(df_norm, tur1_output(), st.session_state["tur2_out"])
+                if prompt_status("Tur-3", built3) and (api_key3 or llm_replay):
+                    narr = llm_or_error(call_llm, api_key3, model3, built3.text)
             except Exception:
                 narr = None
 
@@ -257,25 +341,25 @@ if active_3:
             st.markdown(f"### Uygulanan Yöntem: **{chosen}**")
             st.markdown("Aşağıda yöntemin uygulanması, grafikler ve kısa yorum yer alır.")
 
-            # 3) Yönteme göre uygulama
-            low = chosen.lower()
-            if "iqr" in low and "age" in low:
-                from core.viz import apply_iqr_on_ata, render_outlier_result_iqr
-                flags = apply_iqr_on_ata(df_norm)
-                render_visuals(df_norm, st.session_state["tur1_out"], st.session_state["tur2_out"], viz_spec)
-                render_outlier_result_iqr(flags)
-                st.success("IQR (Tukey) ile age-to-age faktörlerinde olası uç değerler işaretlendi.")
-            elif "z" in low and "score" in low:
-                from core.viz import apply_zscore_on_incremental, render_outlier_result_zscore
-                ztab = apply_zscore_on_incremental(df_norm, col="incurred_cum", z=3.0)
-                render_visuals(df_norm, st.session_state["tur1_out"], st.session_state["tur2_out"], viz_spec)
-                render_outlier_result_zscore(ztab, z=3.0)
-                st.success("z-score (|z|≥3) ile incremental incurred outlier analizi yapıldı.")
+            # 3) Yönteme göre uygulama (core.outliers kayıt defteri üzerinden)
+            render_visuals(df_norm, tur1_output(), st.session_state["tur2_out"], viz_spec, tri=tri)
+            method = resolve_outlier_method(chosen)
+            if method is not None:
+                flags = method.apply(tri)
+                render_outlier_method(method, flags, tri=tri)
+                st.success(f"{method.label}: {int(flags['is_outlier'].sum()) if not flags.empty else 0} hücre işaretlendi.")
             else:
                 # Diğer yöntemler için şimdilik genel görseller + açıklama
-                render_visuals(df_norm, st.session_state["tur1_out"], st.session_state["tur2_out"], viz_spec)
                 st.info("Seçilen yöntemin özel uygulaması henüz kodlanmadı. Genel grafikler gösterildi.")
 
+            # 4) Rezerv: chain-ladder ultimate / IBNR (ultimate_incurred ile karşılaştırmalı)
+            render_reserves(tri, df_norm)
+
             st.success("Tur-3 görselleştirme ve analiz tamamlandı.")
 else:
+    release_api_key(st.session_state.get("tur3_api"))
     secure_delete(["tur3_api"])
+
+# filled last so the panel includes the spans of this run
+with perf_box:
+    render_perf_panel(tracer)
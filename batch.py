@@ -0,0 +1,51 @@
+"""
+Headless batch runner (no Streamlit):
+
+    python batch.py data/ "archive/**/*.parquet" --out results --workers 4 [--method iqr] [--llm]
+
+Every input runs load -> normalize -> EDA -> (optional) LLM recommendation -> outlier method and
+writes <name>.json / <name>.xlsx plus results/manifest.json.
+"""
+import argparse
+import os
+import sys
+
+from core.pipeline import run_batch, DEFAULT_METHOD
+from core.outliers import OUTLIER_METHODS
+from core.parallel import shutdown_pools
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="reserve.ai Tur-1..3 batch runner")
+    ap.add_argument("inputs", nargs="+", help="dosya, klasör veya glob deseni")
+    ap.add_argument("--out", required=True, help="çıktı klasörü")
+    ap.add_argument("--workers", type=int, default=None, help="eşzamanlı dosya sayısı (varsayılan: CPU-1)")
+    ap.add_argument("--method", default=None, choices=list(OUTLIER_METHODS),
+                    help=f"aykırı değer yöntemi; verilmezse LLM önerisi, o da yoksa {DEFAULT_METHOD}")
+    ap.add_argument("--llm", action="store_true", help="Tur-1/Tur-2 LLM yorum ve önerisini de al")
+    ap.add_argument("--model", default="gpt-4o-mini")
+    ap.add_argument("--claim-level", action="store_true", help="ClaimLevel verisi (transactions)")
+    args = ap.parse_args(argv)
+
+    try:
+        manifest = run_batch(
+            args.inputs, args.out, workers=args.workers, method=args.method,
+            api_key=os.environ.get("OPENAI_API_KEY"), model=args.model, use_llm=args.llm,
+            load_kw={"claim_level": True} if args.claim_level else None,
+        )
+    except ValueError as e:
+        print(e, file=sys.stderr)
+        return 2
+    finally:
+        shutdown_pools()
+    for item in manifest["unmatched_inputs"]:
+        print(f"[skip] {item}: eşleşen dosya yok", file=sys.stderr)
+    for f in manifest["files"]:
+        detail = f"{f['method']}, {f['n_flagged']} aykırı" if f["status"] == "ok" else f["error"]
+        print(f"[{f['status']}] {f['input']} ({detail}, {f['timings']['total']:.2f}s)")
+    print(f"{manifest['n_ok']}/{manifest['n_files']} başarılı -> {os.path.join(args.out, 'manifest.json')}")
+    return 0 if manifest["n_failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
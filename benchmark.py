@@ -0,0 +1,174 @@
+"""
+Stage benchmark on synthetic triangles:
+
+    python benchmark.py --sizes small medium large --repeat 3 --out bench.json
+    python benchmark.py --sizes small medium --save-baseline          # store benchmarks/baseline.json
+    python benchmark.py --sizes small medium                          # compare against it
+
+Each stage (load, normalize, EDA, every outlier method, chain ladder, Mack, chart data, Excel) is timed
+from cold memo caches (best of --repeat) and its peak Python/NumPy allocation is taken from a separate
+tracemalloc pass. Stages slower / larger than the baseline by more than the tolerance are flagged and the
+exit code is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from core.io import load_input_data, normalize_triangle_like, memory_report
+from core.stats import build_eda
+from core.outliers import OUTLIER_METHODS
+from core.reserving import chain_ladder
+from core.stochastic import mack_table
+from core.chartdata import ay_curves, paid_incurred_ratio, incremental_heatmap
+from core.export import export_tur1_excel
+from core.synthetic import synthetic_triangle
+from core.memo import clear_all_caches
+from core.parallel import shutdown_pools
+
+SIZES = {
+    "small": dict(n_segments=2, n_ay=10, n_dev=40),
+    "medium": dict(n_segments=10, n_ay=30, n_dev=80),
+    "large": dict(n_segments=40, n_ay=60, n_dev=240, dev_freq="month"),
+}
+# method params for the benchmark run (the ODP default of 10k simulations dominates everything else)
+METHOD_PARAMS = {"odp": {"n_sims": 1_000}}
+BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+# differences below these are noise whatever the ratio
+MIN_SECONDS = 0.02
+MIN_BYTES = 1024 ** 2
+
+
+def _stages(csv_path: str):
+    # (name, fn(ctx)) in pipeline order; ctx carries the outputs later stages need
+    stages = [
+        ("load", lambda c: c.update(raw=load_input_data(csv_path))),
+        ("normalize", lambda c: c.update(zip(("df", "notes", "tri"), normalize_triangle_like(c["raw"].copy())))),
+        ("eda", lambda c: c.update(eda=build_eda(c["df"], tri=c["tri"]))),
+    ]
+    for name, m in OUTLIER_METHODS.items():
+        params = METHOD_PARAMS.get(name, {})
+        stages.append((f"outliers:{name}", lambda c, m=m, p=params: c.setdefault("flags", {}).update({m.name: m.apply(c["tri"], **p)})))
+    stages += [
+        ("chain_ladder", lambda c: chain_ladder(c["tri"], tail=True, df=c["df"])),
+        ("mack", lambda c: mack_table(c["tri"], "incurred_cum")),
+        ("chart_data", lambda c: (ay_curves(c["tri"], "incurred_cum"), paid_incurred_ratio(c["tri"]),
+                                  incremental_heatmap(c["tri"], "incurred_cum"))),
+        ("excel", lambda c: export_tur1_excel(c["df"], c["eda"], tri=c["tri"], flags=c["flags"].get("iqr"))),
+    ]
+    return stages
+
+def _run_once(stages, trace: bool) -> dict:
+    clear_all_caches()
+    ctx, out = {}, {}
+    for name, fn in stages:
+        if trace:
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+        t = time.perf_counter()
+        fn(ctx)
+        dt = time.perf_counter() - t
+        out[name] = tracemalloc.get_traced_memory()[1] - base if trace else dt
+    return out
+
+def bench_size(size: str, repeat: int = 3, memory: bool = True, seed: int = 0) -> dict:
+    df, _ = synthetic_triangle(seed=seed, **SIZES[size])
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"{size}.csv")
+        df.to_csv(path, index=False)
+        stages = _stages(path)
+        runs = [_run_once(stages, trace=False) for _ in range(max(1, repeat))]
+        raw = load_input_data(path)
+        frame = memory_report(raw, normalize_triangle_like.uncached(raw)[0]).loc["TOTAL"]
+        peaks = {}
+        if memory:
+            tracemalloc.start()
+            try:
+                peaks = _run_once(stages, trace=True)
+            finally:
+                tracemalloc.stop()
+    clear_all_caches()
+    return {
+        "params": SIZES[size],
+        "rows": len(df),
+        "frame_bytes": {"raw": int(frame["bytes_before"]), "normalized": int(frame["bytes_after"])},
+        "stages": {name: {"seconds": round(min(r[name] for r in runs), 5),
+                          **({"peak_bytes": int(peaks[name])} if memory else {})} for name, _ in stages},
+    }
+
+def compare(result: dict, baseline: dict, tolerance: float = 0.25, mem_tolerance: float = 0.25) -> list:
+    """Regressions of result vs baseline: stages slower (or with larger peak) than (1 + tolerance) × baseline."""
+    flagged = []
+    for size, res in result["sizes"].items():
+        old_size = baseline.get("sizes", {}).get(size)
+        if old_size is None or old_size.get("params") != res["params"]:
+            continue
+        for stage, cur in res["stages"].items():
+            old = old_size["stages"].get(stage)
+            if old is None:
+                continue
+            checks = [("seconds", tolerance, MIN_SECONDS), ("peak_bytes", mem_tolerance, MIN_BYTES)]
+            for metric, tol, floor in checks:
+                if metric in cur and metric in old and cur[metric] > old[metric] * (1 + tol) and cur[metric] - old[metric] > floor:
+                    flagged.append({"size": size, "stage": stage, "metric": metric, "baseline": old[metric],
+                                    "current": cur[metric], "ratio": round(cur[metric] / max(old[metric], 1e-12), 2)})
+    return flagged
+
+def run_benchmark(sizes=("small", "medium"), repeat: int = 3, memory: bool = True) -> dict:
+    return {
+        "meta": {"python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+                 "platform": platform.platform(), "cpus": os.cpu_count(), "repeat": repeat},
+        "sizes": {size: bench_size(size, repeat, memory) for size in sizes},
+    }
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="reserve.ai stage benchmark (synthetic triangles)")
+    ap.add_argument("--sizes", nargs="+", default=["small", "medium"], choices=list(SIZES))
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--no-memory", action="store_true", help="tracemalloc geçişini atla")
+    ap.add_argument("--out", default=None, help="sonuç JSON dosyası")
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--save-baseline", action="store_true", help="sonucu baseline olarak kaydet")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="süre için izin verilen oransal artış")
+    ap.add_argument("--mem-tolerance", type=float, default=0.25, help="bellek için izin verilen oransal artış")
+    args = ap.parse_args(argv)
+
+    try:
+        result = run_benchmark(args.sizes, args.repeat, not args.no_memory)
+    finally:
+        shutdown_pools()
+    for size, res in result["sizes"].items():
+        print(f"\n{size}: {res['rows']:,} satır {res['params']}")
+        fb = res["frame_bytes"]
+        print(f"  frame: {fb['raw'] / 1024 ** 2:.1f} MB -> normalize {fb['normalized'] / 1024 ** 2:.1f} MB")
+        for stage, m in res["stages"].items():
+            mem = f"{m['peak_bytes'] / 1024 ** 2:9.1f} MB" if "peak_bytes" in m else ""
+            print(f"  {stage:<20} {m['seconds']:9.4f} s {mem}")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance, args.mem_tolerance)
+        result["regressions"] = regressions
+        for r in regressions:
+            print(f"[REGRESSION] {r['size']}/{r['stage']} {r['metric']}: {r['baseline']} -> {r['current']} (x{r['ratio']})")
+        if not regressions:
+            print(f"\nBaseline ile karşılaştırıldı ({args.baseline}): gerileme yok.")
+    for path in [args.out] + ([args.baseline] if args.save_baseline else []):
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(result, f, ensure_ascii=False, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from .io import load_input_data, normalize_triangle_like
+from .triangle import build_triangle
+from .memo import memoize, copy_shallow
+from .telemetry import traced
+
+# bump when normalize_triangle_like output changes so stale entries are not served
+NORMALIZE_VERSION = 3
+CACHE_DIR = os.environ.get("RESERVEAI_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "reserveai"))
+
+def content_hash(file_or_path, block: int = 1 << 20) -> str:
+    """sha256 of the raw input bytes (path or file-like; file position is restored)."""
+    h = hashlib.sha256()
+    if isinstance(file_or_path, str):
+        with open(file_or_path, "rb") as f:
+            for chunk in iter(lambda: f.read(block), b""):
+                h.update(chunk)
+        return h.hexdigest()
+    pos = file_or_path.tell()
+    file_or_path.seek(0)
+    for chunk in iter(lambda: file_or_path.read(block), b""):
+        h.update(chunk)
+    file_or_path.seek(pos)
+    return h.hexdigest()
+
+def cache_key(file_or_path, **params) -> str:
+    payload = json.dumps({"content": content_hash(file_or_path), "params": params,
+                          "version": NORMALIZE_VERSION}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class NormalizedCache:
+    """Normalize edilmiş frame'leri içerik hash'i ile Parquet olarak saklar."""
+
+    def __init__(self, cache_dir: str = CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _paths(self, key: str) -> tuple:
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".parquet", base + ".json"
+
+    def get(self, key: str):
+        data, meta = self._paths(key)
+        if not (os.path.exists(data) and os.path.exists(meta)):
+            return None
+        try:
+            df = pd.read_parquet(data)
+            with open(meta, encoding="utf-8") as f:
+                notes = json.load(f)["notes"]
+        except Exception:
+            return None
+        return df, notes
+
+    def put(self, key: str, df: pd.DataFrame, notes: list):
+        data, meta = self._paths(key)
+        os.makedirs(os.path.dirname(data), exist_ok=True)
+        # write-then-rename so a concurrent reader never sees a half-written entry
+        df.to_parquet(data + ".tmp", index=False)
+        os.replace(data + ".tmp", data)
+        with open(meta + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"notes": list(notes), "version": NORMALIZE_VERSION}, f, ensure_ascii=False)
+        os.replace(meta + ".tmp", meta)
+
+@traced("load_normalized")
+def load_normalized(file_or_path, cache=None, **load_kw):
+    """
+    load_input_data + normalize_triangle_like with an on-disk cache keyed by input content.
+    Returns (df_norm, notes, tri, key); a cache hit skips parsing and normalization.
+    """
+    if file_or_path is None:
+        return None, [], None, None
+    key = cache_key(file_or_path, **load_kw)
+    df, notes, tri = _normalized_for_key(key, file_or_path, cache, load_kw)
+    return df, notes, tri, key
+
+@memoize(maxsize=4, key=lambda key, *args: key, copy_result=copy_shallow)
+def _normalized_for_key(key: str, file_or_path, cache, load_kw: dict):
+    # in-process layer over the on-disk cache; Streamlit reruns of the same file hit here
+    cache = NormalizedCache() if cache is None else cache
+    hit = cache.get(key)
+    if hit is not None:
+        df, notes = hit
+        has_axes = {"accident_year","development_quarter"}.issubset(df.columns)
+        return df, notes, (build_triangle(df) if has_axes else None)
+    df, notes, tri = normalize_triangle_like(load_input_data(file_or_path, **load_kw))
+    try:
+        cache.put(key, df, notes)
+    except Exception:
+        # cache is best-effort (read-only disk, missing pyarrow, ...)
+        pass
+    return df, notes, tri
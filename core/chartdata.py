@@ -0,0 +1,87 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from .triangle import _portfolio_sum
+from .memo import memoize
+
+# max marks per chart; above this the data is binned or thinned so the Vega-Lite spec stays bounded
+POINT_BUDGET = 5_000
+
+
+def _block_nansum(arr: np.ndarray, fa: int, fd: int) -> np.ndarray:
+    # sum (fa × fd) blocks of a 2-D array; blocks with no observed cell stay NaN
+    a, d = arr.shape
+    na, nd = -(-a // fa), -(-d // fd)
+    pad = np.full((na * fa, nd * fd), np.nan)
+    pad[:a, :d] = arr
+    blocks = pad.reshape(na, fa, nd, fd).transpose(0, 2, 1, 3).reshape(na, nd, fa * fd)
+    return _portfolio_sum(np.moveaxis(blocks, -1, 0))
+
+def _grid_frame(arr: np.ndarray, years: np.ndarray, dev: np.ndarray, value_name: str) -> pd.DataFrame:
+    a, d = np.nonzero(~np.isnan(arr))
+    return pd.DataFrame({"accident_year": years[a], "development_quarter": dev[d], value_name: arr[a, d]})
+
+@memoize(maxsize=32, copy_result=pd.DataFrame.copy)
+def ay_curves(tri, col: str = "incurred_cum", budget: int = POINT_BUDGET) -> pd.DataFrame:
+    """Portfolio cumulative curve per AY; dev points are thinned by a common stride, each AY keeps its last point."""
+    arr = tri.cumulative(col, portfolio=True)
+    obs = ~np.isnan(arr)
+    # leave room for the per-AY last points so the total stays within budget
+    stride = max(1, math.ceil(obs.sum() / max(budget - arr.shape[0], 1)))
+    if stride > 1:
+        last = arr.shape[1] - 1 - np.argmax(obs[:, ::-1], axis=1)
+        keep = np.zeros_like(obs)
+        keep[:, ::stride] = True
+        keep[np.arange(arr.shape[0]), last] = True
+        arr = np.where(keep, arr, np.nan)
+    return _grid_frame(arr, tri.accident_years, tri.dev, col)
+
+@memoize(maxsize=32, copy_result=pd.DataFrame.copy)
+def paid_incurred_ratio(tri, budget: int = POINT_BUDGET) -> pd.DataFrame:
+    """Portfolio paid / incurred by dev quarter; adjacent quarters are pooled when they exceed the budget."""
+    paid = np.nansum(tri.cumulative("paid_cum"), axis=(0, 1))
+    incurred = np.nansum(tri.cumulative("incurred_cum"), axis=(0, 1))
+    dev = tri.dev
+    f = max(1, math.ceil(len(dev) / budget))
+    if f > 1:
+        paid = _block_nansum(paid[None], 1, f)[0]
+        incurred = _block_nansum(incurred[None], 1, f)[0]
+        dev = dev[::f]
+    out = pd.DataFrame({"development_quarter": dev, "paid": paid, "incurred": incurred})
+    out["ratio"] = out["paid"] / out["incurred"]
+    return out
+
+@memoize(maxsize=32, copy_result=pd.DataFrame.copy)
+def incremental_heatmap(tri, col: str = "incurred_cum", budget: int = POINT_BUDGET) -> pd.DataFrame:
+    """Portfolio incremental AY × dev grid; summed over square AY/dev blocks (labelled by block start) above the budget."""
+    arr = tri.incremental(col, portfolio=True)
+    years, dev = tri.accident_years, tri.dev
+    f = max(1, math.ceil(math.sqrt(np.count_nonzero(~np.isnan(arr)) / budget)))
+    if f > 1:
+        fa, fd = min(f, arr.shape[0]), min(f, arr.shape[1])
+        arr, years, dev = _block_nansum(arr, fa, fd), years[::fa], dev[::fd]
+    return _grid_frame(arr, years, dev, "inc_incr")
+
+@memoize(maxsize=32, copy_result=pd.DataFrame.copy)
+def outlier_scatter(flags: pd.DataFrame, x: str, y: str, tooltip=(), budget: int = POINT_BUDGET) -> pd.DataFrame:
+    """
+    Only the encoded columns, at most `budget` rows. Flagged rows come first (the `budget` furthest from
+    the median of y when there are more); inliers fill the rest as evenly spaced order statistics of y
+    so the bulk of the distribution keeps its shape.
+    """
+    cols = list(dict.fromkeys([x, y, "is_outlier", *tooltip]))
+    out = flags[[c for c in cols if c in flags.columns]]
+    if len(out) <= budget:
+        return out.reset_index(drop=True)
+    flagged = out["is_outlier"].fillna(False).astype(bool).to_numpy()
+    top = out[flagged]
+    if len(top) > budget:
+        v = pd.to_numeric(top[y], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        dist = np.nan_to_num(np.abs(v - np.nanmedian(pd.to_numeric(out[y], errors="coerce"))), nan=-1.0)
+        top = top.iloc[np.sort(np.argsort(-dist, kind="stable")[:budget])]
+    inliers = out[~flagged].sort_values(y, kind="stable")
+    n = max(budget - len(top), 0)
+    idx = np.unique(np.linspace(0, len(inliers) - 1, n).round().astype(int)) if n and len(inliers) else []
+    return pd.concat([top, inliers.iloc[idx]], ignore_index=True)
@@ -0,0 +1,172 @@
+import numpy as np
+import pandas as pd
+
+from .outliers import register_outlier_method, _matrix, _long, _quiet
+from .parallel import run_tasks
+
+# bootstrap resamples are generated in blocks of at most this many float64 cells per task
+BOOT_CELLS_PER_TASK = 4_000_000
+
+def evt_series(values: np.ndarray, series: str = "incremental") -> np.ndarray:
+    """Positive sample used by the EVT estimators: incremental amounts, or age-to-age excess (factor - 1)."""
+    x = np.asarray(values, dtype="float64").ravel()
+    if series == "ata":
+        x = x - 1.0
+    x = x[np.isfinite(x)]
+    return x[x > 0]
+
+def _hill_curve(logs_desc: np.ndarray, k_max: int) -> np.ndarray:
+    # logs sorted descending along the last axis; xi(k) = mean(log X_(1..k)) - log X_(k+1)
+    k = np.arange(1, k_max + 1)
+    top = np.cumsum(logs_desc[..., :k_max], axis=-1) / k
+    return top - logs_desc[..., 1:k_max + 1]
+
+def _default_k_max(n: int) -> int:
+    return max(0, min(n - 1, int(0.5 * n)))
+
+def hill_plot(x: np.ndarray, k_max=None) -> pd.DataFrame:
+    """Hill estimates of the tail index for every candidate threshold X_(k+1), k = 1..k_max."""
+    x = np.sort(np.asarray(x, dtype="float64"))[::-1]
+    k_max = _default_k_max(x.size) if k_max is None else min(int(k_max), x.size - 1)
+    if k_max < 1:
+        return pd.DataFrame(columns=["k", "threshold", "xi", "alpha"])
+    xi = _hill_curve(np.log(x), k_max)
+    with _quiet():
+        alpha = 1.0 / xi
+    return pd.DataFrame({"k": np.arange(1, k_max + 1), "threshold": x[1:k_max + 1], "xi": xi, "alpha": alpha})
+
+def _boot_hill_block(x: np.ndarray, k_max: int, n_boot: int, seed) -> np.ndarray:
+    # (n_boot, n) resample tensor -> sorted logs -> (n_boot, k_max) Hill curves
+    rng = np.random.default_rng(seed)
+    logs = np.log(x)[rng.integers(0, x.size, size=(n_boot, x.size))]
+    logs = -np.sort(-logs, axis=1)
+    return _hill_curve(logs, k_max)
+
+def bootstrap_hill(x: np.ndarray, k_max=None, n_boot: int = 2000, level: float = 0.90,
+                   seed: int = 0, workers=None) -> pd.DataFrame:
+    """
+    Hill plot with percentile bootstrap bands. Resamples are drawn as batched (block × n) tensors;
+    blocks are independent (SeedSequence.spawn) and spread over the process pool.
+    """
+    return bootstrap_hill_many({None: x}, k_max=k_max, n_boot=n_boot, level=level,
+                               seed=seed, workers=workers).drop(columns="segment")
+
+def bootstrap_hill_many(samples: dict, k_max=None, n_boot: int = 2000, level: float = 0.90,
+                        seed: int = 0, workers=None) -> pd.DataFrame:
+    """bootstrap_hill for several segments at once; every (segment, block) is one pool task."""
+    tasks, owners, plots = [], [], {}
+    root = np.random.SeedSequence(seed)
+    for seg, x in samples.items():
+        x = np.asarray(x, dtype="float64")
+        plot = hill_plot(x, k_max)
+        if plot.empty:
+            continue
+        plots[seg] = plot
+        km = int(plot["k"].iloc[-1])
+        block = max(1, min(n_boot, BOOT_CELLS_PER_TASK // max(1, x.size)))
+        sizes = [block] * (n_boot // block) + ([n_boot % block] if n_boot % block else [])
+        for size, ss in zip(sizes, root.spawn(len(sizes))):
+            tasks.append((x, km, size, ss))
+            owners.append(seg)
+    results = run_tasks(_boot_hill_block, tasks, workers=workers)
+
+    q = [(1 - level) / 2, 0.5, 1 - (1 - level) / 2]
+    frames = []
+    for seg, plot in plots.items():
+        curves = np.vstack([r for r, o in zip(results, owners) if o == seg])
+        with _quiet():
+            lo, med, hi = np.nanquantile(curves, q, axis=0)
+        frames.append(plot.assign(segment=seg, lo=lo, median=med, hi=hi))
+    if not frames:
+        return pd.DataFrame(columns=["k", "threshold", "xi", "alpha", "segment", "lo", "median", "hi"])
+    return pd.concat(frames, ignore_index=True)
+
+def fit_gpd(excess: np.ndarray) -> dict:
+    """
+    GPD fit of threshold excesses by probability-weighted moments (Hosking & Wallis, 1987).
+    Closed form, so it vectorizes and needs no optimizer; valid for xi < 0.5.
+    """
+    y = np.sort(np.asarray(excess, dtype="float64"))
+    n = y.size
+    if n < 3:
+        return {"xi": np.nan, "sigma": np.nan, "n": int(n)}
+    a0 = y.mean()
+    a1 = np.mean(y * (n - np.arange(1, n + 1)) / (n - 1))
+    d = a0 - 2 * a1
+    if d <= 0:
+        return {"xi": np.nan, "sigma": np.nan, "n": int(n)}
+    return {"xi": float(2 - a0 / d), "sigma": float(2 * a0 * a1 / d), "n": int(n)}
+
+def gpd_sf(y: np.ndarray, xi: float, sigma: float) -> np.ndarray:
+    """P(Y > y) for GPD(xi, sigma) excesses."""
+    y = np.asarray(y, dtype="float64")
+    with _quiet():
+        if abs(xi) < 1e-9:
+            return np.exp(-y / sigma)
+        base = np.maximum(1 + xi * y / sigma, 0.0)
+        return np.where(base > 0, base ** (-1.0 / xi), 0.0)
+
+def gpd_threshold_scan(x: np.ndarray, quantiles=None) -> pd.DataFrame:
+    """GPD fits and mean excess over candidate POT thresholds (threshold stability diagnostics)."""
+    x = np.asarray(x, dtype="float64")
+    quantiles = np.linspace(0.70, 0.97, 10) if quantiles is None else np.asarray(quantiles)
+    if x.size == 0:
+        return pd.DataFrame(columns=["quantile", "threshold", "n_exceed", "mean_excess", "xi", "sigma"])
+    us = np.quantile(x, quantiles)
+    rows = []
+    for q, u in zip(quantiles, us):
+        exc = x[x > u] - u
+        fit = fit_gpd(exc)
+        rows.append({
+            "quantile": float(q), "threshold": float(u), "n_exceed": int(exc.size),
+            "mean_excess": float(exc.mean()) if exc.size else np.nan,
+            "xi": fit["xi"], "sigma": fit["sigma"],
+        })
+    return pd.DataFrame(rows)
+
+def evt_samples(tri, series: str = "incremental", col: str = "incurred_cum", portfolio: bool = False) -> dict:
+    view = "ata" if series == "ata" else "incremental"
+    x, segs = _matrix(tri, view, col, portfolio)
+    return {seg: evt_series(x[i], series) for i, seg in enumerate(segs)}
+
+
+@register_outlier_method("evt", "EVT (POT + Hill)", keywords=("evt", "hill", "extreme", "peaks over"),
+                         priority=10, series="incremental", q=0.90, alpha=0.01)
+def evt_pot(tri, col: str = "incurred_cum", series: str = "incremental", q: float = 0.90,
+            alpha: float = 0.01, portfolio: bool = False) -> pd.DataFrame:
+    """
+    Peaks-over-threshold per segment: threshold at the q-quantile of the positive series, GPD fitted
+    to the excesses; a cell is flagged when its tail probability falls below alpha.
+    """
+    view = "ata" if series == "ata" else "incremental"
+    x, segs = _matrix(tri, view, col, portfolio)
+    shift = 1.0 if series == "ata" else 0.0
+    S, A, D = x.shape
+    u = np.full((S, D), np.nan)
+    xi = np.full((S, D), np.nan)
+    sigma = np.full((S, D), np.nan)
+    tail = np.full(x.shape, np.nan)
+    for i in range(S):
+        pos = evt_series(x[i], series)
+        if pos.size < 10:
+            continue
+        ui = float(np.quantile(pos, q))
+        fit = fit_gpd(pos[pos > ui] - ui)
+        if np.isnan(fit["xi"]):
+            continue
+        u[i], xi[i], sigma[i] = ui + shift, fit["xi"], fit["sigma"]
+        exc = (x[i] - shift) - ui
+        zeta = np.mean(pos > ui)
+        tail[i] = np.where(exc > 0, zeta * gpd_sf(np.maximum(exc, 0), fit["xi"], fit["sigma"]), 1.0)
+    tail[np.isnan(x)] = np.nan
+    value_name = "factor" if series == "ata" else "incremental"
+    dev_name, dev_labels = ("age", tri.age_labels) if series == "ata" else ("development_quarter", tri.dev)
+    with _quiet():
+        flag = tail < alpha
+    return _long(x, segs, tri, dev_name, dev_labels, value_name, {
+        "tail_prob": tail,
+        "is_outlier": flag,
+        "threshold": u,
+        "xi": xi,
+        "sigma": sigma,
+    })
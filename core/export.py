@@ -1,82 +1,263 @@
 
 import pandas as pd
 import numpy as np
+import json
+import os
+import tempfile
+import zipfile
 from io import BytesIO
 
-def build_tur1_summary(df: pd.DataFrame) -> dict:
-    info = {}
-    info["shape"] = {"rows": int(df.shape[0]), "cols": int(df.shape[1])}
-    dtypes = df.dtypes.astype(str).to_dict()
-    nulls = df.isna().sum().to_dict()
-    uniques = {c: int(df[c].nunique(dropna=True)) for c in df.columns}
-    # numeric columns
-    num_cols = [c for c in df.columns if pd.api.types.is_numeric_dtype(df[c])]
-    sums = {c: float(pd.to_numeric(df[c], errors="coerce").sum()) for c in num_cols}
-    # segment candidates = low-cardinality columns (<=12 unique) or categorical-like
-    seg_candidates = []
-    for c in df.columns:
-        try:
-            u = uniques[c]
-            if u>1 and u<=12:
-                seg_candidates.append({"column": c, "unique": int(u)})
-        except Exception:
-            pass
-    # age-to-age on incurred
-    ata = {}
-    try:
-        piv = df.pivot_table(index="accident_year", columns="development_quarter", values="incurred_cum", aggfunc="last")
-        piv = piv.sort_index()
-        for j in range(1, piv.shape[1]):
-            num = piv.get(j+1, pd.Series()).sum(skipna=True)
-            den = piv.get(j, pd.Series()).sum(skipna=True)
-            if den and den != 0:
-                ata[f"{j}->{j+1}"] = float(num/den)
-    except Exception:
-        ata = {}
-    return {
-        "shape": info["shape"],
-        "dtypes": dtypes,
-        "null_counts": {k:int(v) for k,v in nulls.items()},
-        "unique_counts": uniques,
-        "numeric_sums": sums,
-        "segment_candidates": seg_candidates,
-        "age_to_age_incurred": ata
-    }
+from .stats import build_eda
+from .triangle import build_triangle
+from .memo import memoize, copy_bytesio
+from .telemetry import span
+from .quality import quality_frame
 
-def export_tur1_excel(df: pd.DataFrame, summary: dict) -> BytesIO:
-    bio = BytesIO()
-    with pd.ExcelWriter(bio, engine="xlsxwriter") as xw:
-        # Sheets
-        pd.DataFrame([summary["shape"]]).to_excel(xw, sheet_name="Summary", index=False)
-        meta = pd.DataFrame({
+# rows converted to Python values per batch while streaming a sheet
+WRITE_BATCH_ROWS = 10_000
+# Excel's row limit (header included); longer tables continue on <name>_2, <name>_3, ...
+EXCEL_MAX_ROWS = 1_048_576
+BUNDLE_FORMATS = ("parquet", "csv", "json")
+# hidden sheet with the exact summary as JSON; bump SUMMARY_VERSION when the payload layout changes
+SUMMARY_SHEET = "_reserveai"
+SUMMARY_FORMAT = "reserveai.tur1_summary"
+SUMMARY_VERSION = 1
+SUMMARY_CHUNK_CHARS = 32_000  # Excel cells hold at most 32,767 characters
+# sheets parsed by the fallback reader for files without the embedded summary
+LEGACY_SHEETS = {"Summary": "shape", "Columns": "columns", "NumericSums": "numeric_sums",
+                 "Segments": "segments", "AgeToAge": "age_to_age"}
+
+def build_tur1_summary(df: pd.DataFrame, tri=None) -> dict:
+    # summary part of the Tur-1 EDA (no monotonicity / coverage checks)
+    return build_eda(df, tri=tri, checks=False)
+
+def tur1_tables(df: pd.DataFrame, summary: dict, tri=None, flags=None, include_data: bool = True) -> dict:
+    """Every table of the Tur-1 report, in sheet order; shared by the workbook and the bundles."""
+    tables = {
+        "Summary": pd.DataFrame([summary["shape"]]),
+        "Columns": pd.DataFrame({
             "column": list(summary["dtypes"].keys()),
             "dtype": list(summary["dtypes"].values()),
             "nulls": [summary["null_counts"].get(c,0) for c in summary["dtypes"].keys()],
             "unique": [summary["unique_counts"].get(c,0) for c in summary["dtypes"].keys()],
-        })
-        meta.to_excel(xw, sheet_name="Columns", index=False)
-        pd.DataFrame(list(summary["numeric_sums"].items()), columns=["column","sum"]).to_excel(xw, sheet_name="NumericSums", index=False)
-        pd.DataFrame(summary["segment_candidates"]).to_excel(xw, sheet_name="Segments", index=False)
-        if summary.get("age_to_age_incurred"):
-            pd.DataFrame(list(summary["age_to_age_incurred"].items()), columns=["age_to_age","factor"]).to_excel(xw, sheet_name="AgeToAge", index=False)
-
-        # Add a couple of charts using xlsxwriter
-        wb  = xw.book
-        # Chart 1: Numeric sums bar (top 10)
+        }),
+        "NumericSums": pd.DataFrame(list(summary["numeric_sums"].items()), columns=["column","sum"]),
+        "Segments": pd.DataFrame(summary["segment_candidates"]),
+    }
+    if summary.get("age_to_age_incurred"):
+        tables["AgeToAge"] = pd.DataFrame(list(summary["age_to_age_incurred"].items()), columns=["age_to_age","factor"])
+    if summary.get("data_quality"):
+        tables["DataQuality"] = quality_frame(summary["data_quality"])
+    if not include_data:
+        return tables
+    tables["Triangle"] = df
+    if tri is None and {"accident_year","development_quarter"}.issubset(df.columns):
+        tri = build_triangle(df)
+    if tri is not None and "incurred_cum" in tri:
+        tables["Factors"] = tri.to_frame("ata", "incurred_cum").rename(columns={"incurred_cum": "factor"})
+        if flags is None:
+            from .outliers import OUTLIER_METHODS
+            flags = OUTLIER_METHODS["iqr"].apply(tri)
+    if flags is not None and len(flags):
+        tables["OutlierFlags"] = flags
+    return tables
+
+def _rows(df: pd.DataFrame):
+    # row-major batches of plain Python values; NaN/NA become blanks
+    for start in range(0, len(df), WRITE_BATCH_ROWS):
+        part = df.iloc[start:start + WRITE_BATCH_ROWS]
+        yield from part.astype(object).where(part.notna(), None).itertuples(index=False, name=None)
+
+def _write_sheet(wb, name: str, df: pd.DataFrame, header_fmt=None):
+    # returns the first sheet; xlsxwriter signals an out-of-range cell with -1 instead of raising
+    per_sheet = EXCEL_MAX_ROWS - 1
+    first = None
+    for i, start in enumerate(range(0, max(len(df), 1), per_sheet)):
+        ws = wb.add_worksheet(name if i == 0 else f"{name}_{i + 1}")
+        first = first or ws
+        rows = enumerate(_rows(df.iloc[start:start + per_sheet]), start=1)
+        if ws.write_row(0, 0, [str(c) for c in df.columns], header_fmt) == -1 or \
+                any(ws.write_row(r, 0, row) == -1 for r, row in rows):
+            raise ValueError(f"'{name}' tablosu Excel sayfa sınırlarını aşıyor ({len(df.columns)} kolon).")
+    return first
+
+def _add_chart_data(wb, summary: dict):
+    # Chart 1: Numeric sums bar (top 10)
+    ns = pd.DataFrame(list(summary["numeric_sums"].items()), columns=["column","sum"]).sort_values("sum", ascending=False).head(10)
+    ns_sheet = wb.add_worksheet("ChartData")
+    for r,(cname,s) in enumerate(ns.values.tolist(), start=1):
+        ns_sheet.write(r,0,cname); ns_sheet.write(r,1,float(s))
+    chart = wb.add_chart({"type":"column"})
+    chart.add_series({
+        "name": "Numeric sums (top10)",
+        "categories": ["ChartData", 1, 0, len(ns), 0],
+        "values": ["ChartData", 1, 1, len(ns), 1]
+    })
+    chart.set_title({"name":"Numeric column sums (top 10)"})
+    return chart
+
+def _encode(obj):
+    # JSON keeps only str keys; dicts with other keys (e.g. int accident years) go as item lists
+    if isinstance(obj, dict):
+        if all(isinstance(k, str) for k in obj):
+            return {k: _encode(v) for k, v in obj.items()}
+        return {"__items__": [[k, _encode(v)] for k, v in obj.items()]}
+    if isinstance(obj, (list, tuple)):
+        return [_encode(v) for v in obj]
+    if isinstance(obj, np.generic):
+        return obj.item()
+    return obj
+
+def _decode(obj):
+    if isinstance(obj, dict):
+        if set(obj) == {"__items__"}:
+            return {k: _decode(v) for k, v in obj["__items__"]}
+        return {k: _decode(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_decode(v) for v in obj]
+    return obj
+
+def _add_summary_sheet(wb, summary: dict):
+    text = json.dumps(_encode(summary), ensure_ascii=False, separators=(",", ":"))
+    chunks = [text[i:i + SUMMARY_CHUNK_CHARS] for i in range(0, len(text), SUMMARY_CHUNK_CHARS)] or [""]
+    ws = wb.add_worksheet(SUMMARY_SHEET)
+    ws.write_row(0, 0, [SUMMARY_FORMAT, SUMMARY_VERSION, len(chunks)])
+    for r, chunk in enumerate(chunks, start=1):
+        ws.write_string(r, 0, chunk)
+    ws.hide()
+    wb.set_custom_property("reserveai_summary_version", SUMMARY_VERSION)
+
+def write_tur1_workbook(target, summary: dict, tables: dict):
+    """
+    Writes the workbook in xlsxwriter's constant_memory mode: each sheet is streamed row by row
+    to a temp file, so only the current row is held in memory. target is a path or a binary file object.
+    """
+    import xlsxwriter
+    with span("excel_build", sheets=len(tables), rows=sum(len(t) for t in tables.values())):
+        wb = xlsxwriter.Workbook(target, {"constant_memory": True, "tmpdir": tempfile.gettempdir()})
         try:
-            ns = pd.DataFrame(list(summary["numeric_sums"].items()), columns=["column","sum"]).sort_values("sum", ascending=False).head(10)
-            ns_sheet = wb.add_worksheet("ChartData")
-            for r,(cname,s) in enumerate(ns.values.tolist(), start=1):
-                ns_sheet.write(r,0,cname); ns_sheet.write(r,1,float(s))
-            chart = wb.add_chart({"type":"column"})
-            chart.add_series({
-                "name": "Numeric sums (top10)",
-                "categories": ["ChartData", 1, 0, len(ns), 0],
-                "values": ["ChartData", 1, 1, len(ns), 1]
-            })
-            chart.set_title({"name":"Numeric column sums (top 10)"})
-            wb.get_worksheet_by_name("Summary").insert_chart(5, 0, chart)
-        except Exception:
-            pass
+            bold = wb.add_format({"bold": True})
+            sheets = {name: _write_sheet(wb, name, t, bold) for name, t in tables.items()}
+            # Add a couple of charts using xlsxwriter
+            try:
+                chart = _add_chart_data(wb, summary)
+                sheets["Summary"].insert_chart(5, 0, chart)
+            except Exception:
+                pass
+            _add_summary_sheet(wb, summary)
+        finally:
+            wb.close()
+    return target
+
+@memoize(maxsize=8, copy_result=copy_bytesio)
+def export_tur1_excel(df: pd.DataFrame, summary: dict, tri=None, flags=None, include_data: bool = True) -> BytesIO:
+    bio = BytesIO()
+    write_tur1_workbook(bio, summary, tur1_tables(df, summary, tri=tri, flags=flags, include_data=include_data))
     bio.seek(0)
     return bio
+
+@memoize(maxsize=4, copy_result=lambda r: tuple(copy_bytesio(b) for b in r))
+def export_tur1_reports(df: pd.DataFrame, summary: dict, tri=None, flags=None):
+    """(xlsx, zip bundle) as BytesIO from one set of tables: the report is assembled once for both."""
+    tables = tur1_tables(df, summary, tri=tri, flags=flags)
+    xlsx = BytesIO()
+    write_tur1_workbook(xlsx, summary, tables)
+    xlsx.seek(0)
+    return xlsx, export_tur1_bundle(tables)
+
+def export_tur1_excel_file(df: pd.DataFrame, summary: dict, path: str = None, tri=None, flags=None) -> str:
+    """Same report written to disk (a temp file when path is None) instead of RAM; returns the path."""
+    if path is None:
+        fd, path = tempfile.mkstemp(prefix="reserveai_tur1_", suffix=".xlsx")
+        os.close(fd)
+    write_tur1_workbook(path, summary, tur1_tables(df, summary, tri=tri, flags=flags))
+    return path
+
+def read_embedded_summary(file_or_path):
+    """
+    Reads only the hidden summary sheet (openpyxl read-only mode: other sheets are never parsed).
+    Returns the exact summary dict, or None for files written before it existed / newer versions.
+    """
+    import openpyxl
+    wb = openpyxl.load_workbook(file_or_path, read_only=True, data_only=True)
+    try:
+        if SUMMARY_SHEET not in wb.sheetnames:
+            return None
+        rows = wb[SUMMARY_SHEET].iter_rows(min_col=1, max_col=3, values_only=True)
+        fmt, version, n = next(rows, (None, None, None))
+        if fmt != SUMMARY_FORMAT or not isinstance(version, (int, float)) or version > SUMMARY_VERSION:
+            return None
+        text = "".join(row[0] or "" for _, row in zip(range(int(n)), rows))
+        return _decode(json.loads(text))
+    finally:
+        wb.close()
+
+def _read_legacy_summary(file_or_path) -> dict:
+    # older reports: rebuild the summary from the individual sheets (lossy)
+    with pd.ExcelFile(file_or_path) as xl:
+        x = {name: xl.parse(name) for name in LEGACY_SHEETS if name in xl.sheet_names}
+    shape = x.get("Summary")
+    out = {key: (x[name].to_dict(orient="records") if name in x else []) for name, key in LEGACY_SHEETS.items()}
+    out["shape"] = shape.to_dict(orient="records")[0] if shape is not None and len(shape) else {}
+    return out
+
+def read_tur1_summary(file_or_path) -> dict:
+    """
+    Tur-1 Excel özetini okur: gömülü özet varsa {"version", "eda"} döner (tam ve kayıpsız),
+    yoksa eski dosyalar için sayfa sayfa ayrıştırılmış özet döner.
+    """
+    try:
+        eda = read_embedded_summary(file_or_path)
+    except Exception:
+        eda = None
+    if eda is not None:
+        return {"version": SUMMARY_VERSION, "eda": eda}
+    if hasattr(file_or_path, "seek"):
+        file_or_path.seek(0)
+    return _read_legacy_summary(file_or_path)
+
+def _table_bytes(df: pd.DataFrame, fmt: str) -> bytes:
+    if fmt == "parquet":
+        buf = BytesIO()
+        df.to_parquet(buf, index=False)
+        return buf.getvalue()
+    if fmt == "csv":
+        return df.to_csv(index=False).encode("utf-8")
+    if fmt == "json":
+        return df.to_json(orient="records", lines=True, force_ascii=False, date_format="iso").encode("utf-8")
+    raise ValueError(f"Bilinmeyen format: {fmt}")
+
+def export_tur1_bundle(tables: dict, out_dir: str = None, formats=BUNDLE_FORMATS):
+    """
+    Writes every table in each format in a single pass over the tables, plus a manifest.json.
+    With out_dir files go to <out_dir>/<format>/<table>.<ext>; otherwise a zip is returned as BytesIO.
+    """
+    manifest = {"tables": {}, "formats": list(formats)}
+    bio = None if out_dir else BytesIO()
+    zf = zipfile.ZipFile(bio, "w", compression=zipfile.ZIP_DEFLATED) if bio is not None else None
+    try:
+        for name, df in tables.items():
+            manifest["tables"][name] = {"rows": int(len(df)), "columns": [str(c) for c in df.columns]}
+            for fmt in formats:
+                rel = f"{fmt}/{name}.{'jsonl' if fmt == 'json' else fmt}"
+                data = _table_bytes(df, fmt)
+                if zf is not None:
+                    zf.writestr(rel, data)
+                else:
+                    path = os.path.join(out_dir, rel)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    with open(path, "wb") as f:
+                        f.write(data)
+        meta = json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8")
+        if zf is not None:
+            zf.writestr("manifest.json", meta)
+        else:
+            with open(os.path.join(out_dir, "manifest.json"), "wb") as f:
+                f.write(meta)
+    finally:
+        if zf is not None:
+            zf.close()
+    if bio is not None:
+        bio.seek(0)
+        return bio
+    return out_dir
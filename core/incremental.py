@@ -0,0 +1,336 @@
+import json
+import math
+
+import numpy as np
+import pandas as pd
+
+from .triangle import Triangle, build_triangle, PORTFOLIO
+from .stats import MONOTONE_COLS, _monotonicity
+
+IQR_K = 1.5
+Z_THRESHOLD = 3.0
+STATE_VERSION = 1
+
+
+def _sorted_quantile(v: np.ndarray, q: float) -> float:
+    # same linear interpolation as np.nanquantile, on an already sorted array
+    if v.size == 0:
+        return np.nan
+    pos = q * (v.size - 1)
+    lo = int(np.floor(pos))
+    hi = min(lo + 1, v.size - 1)
+    return float(v[lo] + (pos - lo) * (v[hi] - v[lo]))
+
+
+class _Column:
+    """
+    One development column kept sorted (with the AY of every value) plus Welford moments,
+    so fences and the set of flagged AYs can be refreshed without touching the other cells.
+    """
+    __slots__ = ("vals", "ays", "mean", "m2", "lo", "hi", "flagged")
+
+    def __init__(self, vals=(), ays=()):
+        vals = np.asarray(vals, dtype=float)
+        order = np.argsort(vals, kind="stable")
+        self.vals = vals[order]
+        self.ays = np.asarray(ays, dtype=np.int64)[order]
+        self.mean = float(vals.mean()) if vals.size else 0.0
+        self.m2 = float(((vals - self.mean) ** 2).sum()) if vals.size else 0.0
+        self.lo = self.hi = np.nan
+        self.flagged = set()
+
+    def insert(self, v: float, ay: int):
+        i = int(np.searchsorted(self.vals, v, side="right"))
+        self.vals = np.concatenate((self.vals[:i], [v], self.vals[i:]))
+        self.ays = np.concatenate((self.ays[:i], [ay], self.ays[i:]))
+        delta = v - self.mean
+        self.mean += delta / self.vals.size
+        self.m2 += delta * (v - self.mean)
+
+    def iqr_fences(self, k: float) -> tuple:
+        q1, q3 = _sorted_quantile(self.vals, 0.25), _sorted_quantile(self.vals, 0.75)
+        return q1 - k * (q3 - q1), q3 + k * (q3 - q1)
+
+    def z_fences(self, z: float) -> tuple:
+        n = self.vals.size
+        sd = np.sqrt(self.m2 / (n - 1)) if n > 1 else 0.0
+        if not sd > 0:
+            return np.nan, np.nan
+        return self.mean - z * sd, self.mean + z * sd
+
+    def refence(self, lo: float, hi: float, inclusive: bool) -> tuple:
+        """Moves the fences; returns (added, removed) flagged AYs. Cost is O(log n + flagged)."""
+        if np.isnan(lo):
+            new = set()
+        else:
+            a = np.searchsorted(self.vals, lo, side="right" if inclusive else "left")
+            b = np.searchsorted(self.vals, hi, side="left" if inclusive else "right")
+            new = set(self.ays[:a].tolist()) | set(self.ays[b:].tolist())
+        added, removed = new - self.flagged, self.flagged - new
+        self.lo, self.hi, self.flagged = lo, hi, new
+        return added, removed
+
+
+class DiagonalState:
+    """
+    Persisted pipeline state for quarter-close updates: triangle arrays, running column sums and
+    volume-weighted link sums, sorted ATA columns (IQR) and incremental moments (z-score).
+    append() folds in a new diagonal and reports only what changed.
+    """
+
+    def __init__(self, tri: Triangle, violations: dict, col: str = "incurred_cum",
+                 k: float = IQR_K, z: float = Z_THRESHOLD):
+        self.col, self.k, self.z = col, k, z
+        self.segments = list(tri.segments)
+        self.segment_key = tri.segment_key
+        self.accident_years = np.array(tri.accident_years, dtype=np.int64)
+        self.dev = np.array(tri.dev, dtype=np.int64)
+        self.values = {c: np.array(v) for c, v in tri.values.items()}
+        self.violations = {c: set(v) for c, v in violations.items()}
+        self._rebuild_stats()
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, segment_cols=None, **kw) -> "DiagonalState":
+        mono = _monotonicity(df)
+        violations = {c: set(mono.get(c + "_nondecreasing", {}).get("violations_by_AY", []))
+                      for c in MONOTONE_COLS if c in df.columns}
+        return cls(build_triangle(df, segment_cols=segment_cols), violations, **kw)
+
+    # ── full (re)build: only at creation / load ─────────────────────────────────────
+    def _rebuild_stats(self):
+        tri = self.triangle()
+        cum = self.values[self.col]
+        self.col_sums = np.nansum(cum, axis=1)
+        num, den = cum[..., 1:], cum[..., :-1]
+        ok = ~(np.isnan(num) | np.isnan(den))
+        self.link_num = np.where(ok, num, 0.0).sum(axis=1)
+        self.link_den = np.where(ok, den, 0.0).sum(axis=1)
+        ata, inc = tri.ata(self.col), tri.incremental(self.col)
+        self.ata_cols, self.inc_cols = {}, {}
+        for s in range(len(self.segments)):
+            for j, d in enumerate(self.dev):
+                x = inc[s, :, j]
+                m = ~np.isnan(x)
+                self.inc_cols[(s, int(d))] = _Column(x[m], self.accident_years[m])
+                if j < len(self.dev) - 1:
+                    f = ata[s, :, j]
+                    m = ~np.isnan(f)
+                    self.ata_cols[(s, int(d))] = _Column(f[m], self.accident_years[m])
+        for c in self.ata_cols.values():
+            c.refence(*c.iqr_fences(self.k), inclusive=False)
+        for c in self.inc_cols.values():
+            c.refence(*c.z_fences(self.z), inclusive=True)
+
+    def triangle(self) -> Triangle:
+        values = {}
+        for c, v in self.values.items():
+            v = v.copy()
+            v.setflags(write=False)
+            values[c] = v
+        return Triangle(values, self.segments, self.accident_years, self.dev, segment_key=self.segment_key)
+
+    def age_to_age(self) -> dict:
+        """Portfolio age-to-age factors, same definition as the EDA's age_to_age_incurred."""
+        sums = self.col_sums.sum(axis=0)
+        return {f"{int(a)}->{int(b)}": float(n / d) for a, b, n, d in zip(self.dev[:-1], self.dev[1:], sums[1:], sums[:-1])
+                if d and d != 0}
+
+    def dev_coverage(self) -> dict:
+        obs = ~np.isnan(self.values[self.col])
+        last = np.where(obs.any(axis=(0, 2)), obs.any(axis=0)[:, ::-1].argmax(axis=1), -1)
+        return {int(a): int(self.dev[-1 - i]) for a, i in zip(self.accident_years, last) if i >= 0}
+
+    # ── growth ─────────────────────────────────────────────────────────────────────
+    def _segment_index(self, label) -> int:
+        if label not in self.segments:
+            self.segments.append(label)
+            for c, v in self.values.items():
+                self.values[c] = np.concatenate([v, np.full((1,) + v.shape[1:], np.nan)], axis=0)
+            self.col_sums = np.vstack([self.col_sums, np.zeros((1, self.col_sums.shape[1]))])
+            self.link_num = np.vstack([self.link_num, np.zeros((1, self.link_num.shape[1]))])
+            self.link_den = np.vstack([self.link_den, np.zeros((1, self.link_den.shape[1]))])
+        return self.segments.index(label)
+
+    def _grow_axes(self, years, devs):
+        new_years = np.union1d(self.accident_years, years).astype(np.int64)
+        lo = min(int(self.dev[0]) if self.dev.size else int(devs.min()), int(devs.min()))
+        hi = max(int(self.dev[-1]) if self.dev.size else int(devs.max()), int(devs.max()))
+        new_dev = np.arange(lo, hi + 1)
+        if new_years.size == self.accident_years.size and new_dev.size == self.dev.size:
+            return
+        ai = np.searchsorted(new_years, self.accident_years)
+        di = self.dev - lo
+        S = len(self.segments)
+        for c, v in self.values.items():
+            out = np.full((S, new_years.size, new_dev.size), np.nan)
+            out[:, ai[:, None], di[None, :]] = v
+            self.values[c] = out
+        sums = np.zeros((S, new_dev.size))
+        sums[:, di] = self.col_sums
+        self.col_sums = sums
+        num, den = np.zeros((S, new_dev.size - 1)), np.zeros((S, new_dev.size - 1))
+        num[:, di[:-1]], den[:, di[:-1]] = self.link_num, self.link_den
+        self.link_num, self.link_den = num, den
+        self.accident_years, self.dev = new_years, new_dev
+
+    def _labels(self, df: pd.DataFrame) -> list:
+        key = self.segment_key
+        if key is None:
+            return [PORTFOLIO] * len(df)
+        if isinstance(key, tuple):
+            return list(df[list(key)].itertuples(index=False, name=None))
+        return df[key].tolist()
+
+    # ── incremental update ─────────────────────────────────────────────────────────
+    def append(self, df_new: pd.DataFrame) -> dict:
+        """
+        Folds new cells (normally one diagonal) into the state. Only cells past each AY's latest
+        development are accepted; restated history raises ValueError (rebuild with from_frame).
+        Work is proportional to the new cells plus the flags that actually change.
+        """
+        ay = pd.to_numeric(df_new["accident_year"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        dq = pd.to_numeric(df_new["development_quarter"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        keep = ~(np.isnan(ay) | np.isnan(dq))
+        # one cell per key (last row wins, as in build_triangle), folded in dev order
+        df_new = df_new[keep].assign(_ay=ay[keep].astype(np.int64), _dq=dq[keep].astype(np.int64))
+        keys = ([] if self.segment_key is None else list(np.atleast_1d(self.segment_key))) + ["_ay", "_dq"]
+        df_new = df_new.drop_duplicates(keys, keep="last").sort_values("_dq", kind="stable")
+        ay, dq = df_new["_ay"].to_numpy(), df_new["_dq"].to_numpy()
+        report = {"new_cells": 0, "new_accident_years": sorted(set(ay.tolist()) - set(self.accident_years.tolist())),
+                  "new_development_quarters": sorted(set(dq.tolist()) - set(self.dev.tolist())),
+                  "monotonicity": {}, "age_to_age_incurred": {}, "fences": {"iqr": [], "zscore": []},
+                  "flags": {"iqr": {"added": [], "removed": []}, "zscore": {"added": [], "removed": []}}}
+        if not len(df_new):
+            return report
+        old_ata = self.age_to_age()
+        seg_idx = [self._segment_index(lbl) for lbl in self._labels(df_new)]
+        self._grow_axes(ay, dq)
+        a_idx = np.searchsorted(self.accident_years, ay)
+        d_idx = dq - self.dev[0]
+        cols = {c: pd.to_numeric(df_new[c], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+                for c in self.values if c in df_new.columns}
+
+        # validate every row before folding any, so a rejected batch leaves the state untouched
+        for i, (s, a, d) in enumerate(zip(seg_idx, a_idx, d_idx)):
+            for c, vals in cols.items():
+                obs = np.flatnonzero(~np.isnan(self.values[c][s, a]))
+                if not np.isnan(vals[i]) and obs.size and obs[-1] >= d:
+                    raise ValueError(f"Yeni köşegen geçmişi değiştiriyor: {self.segments[s]}, AY {self.accident_years[a]}, "
+                                     f"devQ {self.dev[d]} ({c}); durumu from_frame ile yeniden kurun.")
+
+        touched_cols = set()
+        for i, (s, a, d) in enumerate(zip(seg_idx, a_idx, d_idx)):
+            touched = False
+            for c, vals in cols.items():
+                v = vals[i]
+                if np.isnan(v):
+                    continue
+                row = self.values[c][s, a]
+                obs = np.flatnonzero(~np.isnan(row))
+                prev_d = obs[-1] if obs.size else -1
+                prev = row[prev_d] if obs.size else np.nan
+                if c in self.violations and obs.size and v < prev:
+                    year = int(self.accident_years[a])
+                    if year not in self.violations[c]:
+                        self.violations[c].add(year)
+                        report["monotonicity"].setdefault(c + "_nondecreasing", []).append(year)
+                if c == self.col:
+                    self._fold_main(s, a, d, v, prev, prev_d)
+                self.values[c][s, a, d] = v
+                touched = True
+            report["new_cells"] += touched
+            if touched and self.col in cols and not np.isnan(cols[self.col][i]):
+                touched_cols.add((s, d))
+        # fences move once per touched column, so the flag diff is the net change of the batch
+        for s, d in sorted(touched_cols):
+            self._refence(report, s, d)
+
+        new_ata = self.age_to_age()
+        for age, f in new_ata.items():
+            if old_ata.get(age) != f:
+                report["age_to_age_incurred"][age] = {"old": old_ata.get(age), "new": f}
+        return report
+
+    def _fold_main(self, s: int, a: int, d: int, v: float, prev: float, prev_d: int):
+        year = int(self.accident_years[a])
+        dev = int(self.dev[d])
+        self.col_sums[s, d] += v
+        # incremental = diff against the last observed cell (first cell keeps its cumulative)
+        inc = v - prev if prev_d >= 0 else v
+        self.inc_cols.setdefault((s, dev), _Column()).insert(inc, year)
+        if prev_d == d - 1 and prev_d >= 0:
+            self.link_num[s, d - 1] += v
+            self.link_den[s, d - 1] += prev
+            if prev != 0:
+                self.ata_cols.setdefault((s, int(self.dev[d - 1])), _Column()).insert(v / prev, year)
+
+    def _refence(self, report: dict, s: int, d: int):
+        seg, dev = self.segments[s], int(self.dev[d])
+        cols = [("zscore", (s, dev), self.inc_cols.get((s, dev)), True, dev)]
+        if d >= 1:
+            cols.append(("iqr", (s, dev - 1), self.ata_cols.get((s, dev - 1)), False, f"{dev - 1}->{dev}"))
+        for method, key, col, inclusive, where in cols:
+            if col is None:
+                continue
+            fences = col.z_fences(self.z) if method == "zscore" else col.iqr_fences(self.k)
+            old = (col.lo, col.hi)
+            added, removed = col.refence(*fences, inclusive=inclusive)
+            if any(a != b and not (math.isnan(a) and math.isnan(b)) for a, b in zip(old, fences)):
+                report["fences"][method].append({"segment": seg, "at": where, "old": list(old), "new": list(fences)})
+            report["flags"][method]["added"] += [(seg, where, y) for y in sorted(added)]
+            report["flags"][method]["removed"] += [(seg, where, y) for y in sorted(removed)]
+
+    # ── persistence ────────────────────────────────────────────────────────────────
+    def save(self, path: str):
+        """Single .npz: triangle arrays, running sums and the sorted columns (concatenated + offsets)."""
+        arrays = {f"values__{c}": v for c, v in self.values.items()}
+        arrays.update(col_sums=self.col_sums, link_num=self.link_num, link_den=self.link_den,
+                      accident_years=self.accident_years, dev=self.dev)
+        for name, store in (("ata", self.ata_cols), ("inc", self.inc_cols)):
+            keys = sorted(store)
+            arrays[f"{name}__keys"] = np.array(keys, dtype=np.int64).reshape(-1, 2)
+            arrays[f"{name}__offsets"] = np.cumsum([0] + [store[k].vals.size for k in keys])
+            arrays[f"{name}__vals"] = np.concatenate([store[k].vals for k in keys]) if keys else np.zeros(0)
+            arrays[f"{name}__ays"] = np.concatenate([store[k].ays for k in keys]) if keys else np.zeros(0, np.int64)
+            arrays[f"{name}__moments"] = np.array([[store[k].mean, store[k].m2] for k in keys]).reshape(-1, 2)
+        meta = {
+            "version": STATE_VERSION, "col": self.col, "k": self.k, "z": self.z,
+            "segments": [list(s) if isinstance(s, tuple) else s for s in self.segments],
+            "segment_key": list(self.segment_key) if isinstance(self.segment_key, tuple) else self.segment_key,
+            "violations": {c: sorted(v) for c, v in self.violations.items()},
+        }
+        arrays["meta"] = np.array(json.dumps(meta, ensure_ascii=False, default=str))
+        with open(path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "DiagonalState":
+        with np.load(path, allow_pickle=False) as z:
+            meta = json.loads(str(z["meta"]))
+            if meta.get("version") != STATE_VERSION:
+                raise ValueError(f"Desteklenmeyen durum sürümü: {meta.get('version')}")
+            state = cls.__new__(cls)
+            state.col, state.k, state.z = meta["col"], meta["k"], meta["z"]
+            key = meta["segment_key"]
+            state.segment_key = tuple(key) if isinstance(key, list) else key
+            state.segments = [tuple(s) if isinstance(s, list) else s for s in meta["segments"]]
+            state.violations = {c: set(v) for c, v in meta["violations"].items()}
+            state.accident_years, state.dev = z["accident_years"], z["dev"]
+            state.values = {name[len("values__"):]: z[name] for name in z.files if name.startswith("values__")}
+            state.col_sums, state.link_num, state.link_den = z["col_sums"], z["link_num"], z["link_den"]
+            for name in ("ata", "inc"):
+                store, off = {}, z[f"{name}__offsets"]
+                vals, ays, mom = z[f"{name}__vals"], z[f"{name}__ays"], z[f"{name}__moments"]
+                for i, (s, d) in enumerate(z[f"{name}__keys"].tolist()):
+                    col = _Column.__new__(_Column)
+                    col.vals, col.ays = vals[off[i]:off[i + 1]], ays[off[i]:off[i + 1]]
+                    col.mean, col.m2 = float(mom[i, 0]), float(mom[i, 1])
+                    col.lo = col.hi = np.nan
+                    col.flagged = set()
+                    store[(s, d)] = col
+                setattr(state, f"{name}_cols", store)
+        for c in state.ata_cols.values():
+            c.refence(*c.iqr_fences(state.k), inclusive=False)
+        for c in state.inc_cols.values():
+            c.refence(*c.z_fences(state.z), inclusive=True)
+        return state
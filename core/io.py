@@ -1,38 +1,192 @@
 
+import numpy as np
 import pandas as pd
-import streamlit as st
 
-def load_input_data(file_or_path):
+from .triangle import build_triangle, SEGMENT_COLS
+from .memo import memoize, copy_shallow
+from .telemetry import traced
+
+# columns the pipeline understands; columnar inputs are projected to these when present
+INPUT_COLS = [
+    "line_of_business","valuation_quarter","accident_year","development_quarter","ultimate_incurred",
+    "exposure_policies","ultimate_claims","incurred_cum","paid_cum","reported_claims_cum",
+]
+PARQUET_EXT = (".parquet", ".pq")
+ARROW_EXT = (".arrow", ".feather", ".ipc")
+
+# claim-level amount column -> triangle column it is reduced into
+CLAIM_AMOUNT_COLS = {"incurred": "incurred_cum", "paid": "paid_cum"}
+CLAIM_CHUNKSIZE = 250_000
+
+@traced("load")
+def load_input_data(file_or_path, claim_level: bool = False, **stream_kw):
     if file_or_path is None:
         return None
+    fmt = input_format(file_or_path)
+    if fmt == "parquet":
+        return _read_parquet(file_or_path)
+    if fmt == "arrow":
+        return _read_arrow(file_or_path)
+    if claim_level:
+        return load_claims_streaming(file_or_path, **stream_kw)
     if isinstance(file_or_path, str):
         return pd.read_csv(file_or_path)
     return pd.read_csv(file_or_path)
 
-def normalize_triangle_like(df: pd.DataFrame):
+def input_format(file_or_path) -> str:
+    name = file_or_path if isinstance(file_or_path, str) else getattr(file_or_path, "name", "")
+    name = str(name).lower()
+    if name.endswith(PARQUET_EXT):
+        return "parquet"
+    if name.endswith(ARROW_EXT):
+        return "arrow"
+    return "csv"
+
+def _project(names) -> list | None:
+    cols = [c for c in names if c in INPUT_COLS]
+    return cols or None
+
+def _read_parquet(file_or_path) -> pd.DataFrame:
+    import pyarrow.parquet as pq
+    pf = pq.ParquetFile(file_or_path)
+    return pf.read(columns=_project(pf.schema_arrow.names)).to_pandas()
+
+def _read_arrow(file_or_path) -> pd.DataFrame:
+    # Arrow IPC file format (Feather v2); memory-mapped when given a path
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    src = pa.memory_map(file_or_path) if isinstance(file_or_path, str) else file_or_path
+    reader = ipc.open_file(src)
+    cols = _project(reader.schema.names)
+    table = reader.read_all()
+    return (table.select(cols) if cols else table).to_pandas()
+
+def _csv_header(file_or_path) -> list:
+    cols = list(pd.read_csv(file_or_path, nrows=0).columns)
+    if hasattr(file_or_path, "seek"):
+        file_or_path.seek(0)
+    return cols
+
+def load_claims_streaming(file_or_path, chunksize: int = CLAIM_CHUNKSIZE, segment_cols=None,
+                          amount_cols=None, count_col=None, amounts: str = "incremental"):
+    """
+    Claim-level CSV'yi parça parça okuyup (segment, AY, devQ) hücrelerine indirger.
+    Yalnızca gerekli kolonlar, açık dtype'larla okunur; bellek dosya boyutuna değil
+    üçgen boyutuna bağlıdır. amounts="incremental" ise hücre toplamları AY içinde
+    kümülatife çevrilir; count_col (0/1 bildirim bayrağı) reported_claims_cum olur.
+    """
+    header = _csv_header(file_or_path)
+    expected = dict(CLAIM_AMOUNT_COLS if amount_cols is None else amount_cols)
+    amount_cols = {src: dst for src, dst in expected.items() if src in header}
+    if count_col and count_col in header:
+        amount_cols[count_col] = "reported_claims_cum"
+    if not amount_cols:
+        raise ValueError(f"Claim-level dosyada tutar kolonu yok; beklenen kolonlardan en az biri: "
+                         f"{list(expected) + ([count_col] if count_col else [])}")
+    if segment_cols is None:
+        segment_cols = [c for c in SEGMENT_COLS if c in header]
+    keys = list(segment_cols) + ["accident_year","development_quarter"]
+    missing = [c for c in keys if c not in header]
+    if missing:
+        raise ValueError(f"Claim-level dosyada beklenen kolonlar eksik: {missing}")
+
+    dtype = {c: "category" for c in segment_cols}
+    dtype.update({"accident_year": "float64", "development_quarter": "float64"})
+    dtype.update({c: "float64" for c in amount_cols})
+    acc = None
+    for chunk in pd.read_csv(file_or_path, usecols=keys + list(amount_cols), dtype=dtype, chunksize=chunksize):
+        part = chunk.groupby(keys, observed=True, sort=False)[list(amount_cols)].sum()
+        acc = part if acc is None else pd.concat([acc, part]).groupby(level=keys, observed=True, sort=False).sum()
+    if acc is None:
+        return pd.DataFrame(columns=keys + list(amount_cols.values()))
+
+    out = acc.rename(columns=amount_cols).reset_index()
+    for c in segment_cols:
+        out[c] = out[c].astype(str)
+    out = out.sort_values(keys).reset_index(drop=True)
+    if amounts == "incremental":
+        vals = list(amount_cols.values())
+        out[vals] = out.groupby(keys[:-1], sort=False)[vals].cumsum()
+    return out
+
+# dtype plan of the normalized frame: key / count columns get the narrowest integer that holds them,
+# label columns become categoricals, money columns stay float64 unless float32 is requested
+INT_COLS = ["accident_year","development_quarter","ultimate_claims","reported_claims_cum","exposure_policies"]
+MONEY_COLS = ["incurred_cum","paid_cum","ultimate_incurred"]
+LABEL_COLS = ["valuation_quarter"]
+_INT_WIDTHS = (np.int8, np.int16, np.int32, np.int64)
+
+def _narrow_int(s: pd.Series):
+    # smallest signed width for the value range; nullable (Int8..Int64) only when there are missing values.
+    # None when the values are not integers (fractions, inf, beyond int64) - the caller decides
+    v = pd.to_numeric(s, errors="coerce")
+    vals = v.to_numpy(dtype="float64", na_value=np.nan)
+    vals = vals[~np.isnan(vals)]
+    if not np.all(np.isfinite(vals)) or np.any(vals != np.round(vals)):
+        return None
+    lo, hi = (vals.min(), vals.max()) if vals.size else (0, 0)
+    # float(iinfo.max) + 1 is exact up to int32 and rounds to 2**63 for int64
+    width = next((t for t in _INT_WIDTHS if np.iinfo(t).min <= lo and hi < float(np.iinfo(t).max) + 1), None)
+    if width is None:
+        return None
+    return v.astype(f"Int{np.iinfo(width).bits}" if vals.size < len(v) else width)
+
+def _is_sorted(df: pd.DataFrame, keys: list) -> bool:
+    # O(n) check of the lexicographic order sort_values(keys, na_position="last") would produce
+    tied = np.ones(max(len(df) - 1, 0), dtype=bool)
+    for k in keys:
+        v = np.nan_to_num(df[k].to_numpy(dtype="float64", na_value=np.nan), nan=np.inf)
+        if np.any(tied & (v[1:] < v[:-1])):
+            return False
+        tied &= v[1:] == v[:-1]
+    return True
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Deep bytes per column before / after normalization, plus a total row."""
+    b = before.memory_usage(index=False, deep=True)
+    a = after.memory_usage(index=False, deep=True)
+    out = pd.DataFrame({
+        "dtype_before": before.dtypes.astype(str), "bytes_before": b,
+        "dtype_after": after.dtypes.astype(str).reindex(b.index), "bytes_after": a.reindex(b.index),
+    })
+    out.loc["TOTAL"] = ["", b.sum(), "", a.sum()]
+    out["saved_pct"] = (1 - out["bytes_after"] / out["bytes_before"].where(out["bytes_before"] > 0)) * 100
+    return out
+
+@traced("normalize")
+@memoize(maxsize=8, copy_result=copy_shallow)
+def normalize_triangle_like(df: pd.DataFrame, segment_cols=None, float32: bool = False):
+    """
+    Typed, sorted (AY, devQ) view of df plus its Triangle. The caller's frame is never modified:
+    converted columns are new arrays, untouched ones are shared (copy-on-write), and the row sort
+    is skipped when the input is already in order. float32=True halves the money columns.
+    """
     notes = []
-    # Column normalization / renaming tolerant read
-    rename_map = {
-        "accident_year":"accident_year",
-        "development_quarter":"development_quarter",
-        "incurred_cum":"incurred_cum",
-        "paid_cum":"paid_cum",
-        "reported_claims_cum":"reported_claims_cum",
-        "ultimate_incurred":"ultimate_incurred",
-        "exposure_policies":"exposure_policies",
-        "ultimate_claims":"ultimate_claims",
-        "line_of_business":"line_of_business",
-        "valuation_quarter":"valuation_quarter",
-    }
     missing = [c for c in ["accident_year","development_quarter","incurred_cum","paid_cum"] if c not in df.columns]
     if missing:
         notes.append(f"Beklenen kolonlar eksik: {missing}")
-    # type handling
-    for col in ["accident_year","development_quarter","ultimate_claims","reported_claims_cum","exposure_policies"]:
+    labels = LABEL_COLS + list(SEGMENT_COLS if segment_cols is None else segment_cols)
+    typed = {}
+    for col in INT_COLS:
         if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce').astype('Int64')
-    for col in ["incurred_cum","paid_cum","ultimate_incurred"]:
+            narrowed = _narrow_int(df[col])
+            if narrowed is None:
+                if col in ("accident_year","development_quarter"):
+                    raise ValueError(f"'{col}' kolonu tam sayı olmayan (veya int64 aralığı dışında) değerler içeriyor.")
+                notes.append(f"'{col}' tam sayı olmayan (veya int64 aralığı dışında) değerler içeriyor; float64 olarak bırakıldı.")
+                narrowed = pd.to_numeric(df[col], errors="coerce").astype("float64")
+            typed[col] = narrowed
+    for col in MONEY_COLS:
         if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-    df = df.sort_values(["accident_year","development_quarter"], na_position="last").reset_index(drop=True)
-    return df, notes
+            typed[col] = pd.to_numeric(df[col], errors="coerce").astype("float32" if float32 else "float64")
+    for col in labels:
+        if col in df.columns and col not in typed and not pd.api.types.is_numeric_dtype(df[col]):
+            typed[col] = df[col].astype("category")
+    out = df.assign(**typed) if typed else df.copy(deep=False)
+    keys = [c for c in ["accident_year","development_quarter"] if c in out.columns]
+    if keys and not _is_sorted(out, keys):
+        out = out.sort_values(keys, na_position="last", kind="stable")
+    out = out.reset_index(drop=True)
+    has_axes = {"accident_year","development_quarter"}.issubset(out.columns)
+    tri = build_triangle(out, segment_cols=segment_cols) if has_axes else None
+    return out, notes, tri
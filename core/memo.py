@@ -0,0 +1,131 @@
+import functools
+import hashlib
+import threading
+from collections import OrderedDict
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+def _digest(*parts) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for p in parts:
+        h.update(p if isinstance(p, bytes) else str(p).encode("utf-8"))
+    return h.hexdigest()
+
+def frame_fingerprint(df) -> str:
+    """Content fingerprint of a DataFrame/Series: values, index, column names and dtypes."""
+    values = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    cols = list(df.columns) if isinstance(df, pd.DataFrame) else [df.name]
+    dtypes = df.dtypes.astype(str).tolist() if isinstance(df, pd.DataFrame) else [str(df.dtype)]
+    return _digest(values.tobytes(), cols, dtypes)
+
+def array_fingerprint(arr: np.ndarray) -> str:
+    arr = np.ascontiguousarray(arr)
+    return _digest(arr.tobytes(), arr.dtype.str, arr.shape)
+
+def fingerprint(obj) -> str:
+    """Stable key for memoization: content-based for frames/arrays/files, structural for containers."""
+    if obj is None or isinstance(obj, (bool, int, float, str, bytes)):
+        return repr(obj)
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return "df:" + frame_fingerprint(obj)
+    if isinstance(obj, np.ndarray):
+        return "nd:" + array_fingerprint(obj)
+    if callable(getattr(obj, "fingerprint", None)):
+        return "fp:" + obj.fingerprint()
+    if isinstance(obj, dict):
+        return "{" + ",".join(f"{fingerprint(k)}:{fingerprint(v)}" for k, v in sorted(obj.items(), key=lambda kv: repr(kv[0]))) + "}"
+    if isinstance(obj, (list, tuple)):
+        return "[" + ",".join(fingerprint(v) for v in obj) + "]"
+    if hasattr(obj, "read") and hasattr(obj, "seek"):
+        from .cache import content_hash
+        return "io:" + content_hash(obj)
+    # unknown objects only hit for the very same instance
+    return f"id:{type(obj).__name__}:{id(obj)}"
+
+def _nbytes(obj) -> int:
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return int(obj.memory_usage(deep=False).sum()) if isinstance(obj, pd.DataFrame) else int(obj.memory_usage(deep=False))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    if isinstance(obj, BytesIO):
+        return obj.getbuffer().nbytes
+    if isinstance(obj, (bytes, str)):
+        return len(obj)
+    if isinstance(obj, (list, tuple)):
+        return sum(_nbytes(v) for v in obj)
+    if isinstance(obj, dict):
+        return sum(_nbytes(k) + _nbytes(v) for k, v in obj.items())
+    if obj is None or isinstance(obj, (bool, int, float)):
+        return 8
+    if hasattr(obj, "nbytes"):
+        return int(obj.nbytes)
+    return 1024
+
+# every memoized function, so benchmarks / tests can start from cold caches
+_MEMOIZED = []
+
+def clear_all_caches():
+    for wrapper in _MEMOIZED:
+        wrapper.cache_clear()
+
+def copy_bytesio(bio: BytesIO) -> BytesIO:
+    return BytesIO(bio.getvalue())
+
+def copy_shallow(obj):
+    # new frame / container objects around shared column data (copy-on-write keeps the cache intact)
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return obj.copy(deep=False)
+    if isinstance(obj, (list, tuple)):
+        return type(obj)(copy_shallow(v) for v in obj)
+    return obj
+
+def memoize(maxsize: int = 32, max_bytes: int = 512 * 1024**2, copy_result=None, key=None):
+    """
+    Content-hash memoization with LRU eviction bounded by entry count and approximate result bytes.
+    Results are shared between callers; pass copy_result (e.g. copy.deepcopy) for mutable results.
+    key(*args, **kwargs) -> str overrides the default fingerprint of all arguments.
+    """
+    def deco(fn):
+        entries = OrderedDict()
+        sizes = {}
+        lock = threading.Lock()
+        stats = {"hits": 0, "misses": 0}
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs) if key else _digest(fingerprint(list(args)), fingerprint(kwargs))
+            with lock:
+                if k in entries:
+                    entries.move_to_end(k)
+                    stats["hits"] += 1
+                    res = entries[k]
+                    return copy_result(res) if copy_result else res
+                stats["misses"] += 1
+            res = fn(*args, **kwargs)
+            size = _nbytes(res)
+            with lock:
+                entries[k] = res
+                sizes[k] = size
+                while entries and (len(entries) > maxsize or sum(sizes.values()) > max_bytes):
+                    old, _ = entries.popitem(last=False)
+                    sizes.pop(old, None)
+            return copy_result(res) if copy_result else res
+
+        def cache_clear():
+            with lock:
+                entries.clear()
+                sizes.clear()
+
+        def cache_info() -> dict:
+            with lock:
+                return {**stats, "entries": len(entries), "bytes": sum(sizes.values()), "maxsize": maxsize}
+
+        wrapper.cache_clear = cache_clear
+        wrapper.cache_info = cache_info
+        wrapper.uncached = fn
+        _MEMOIZED.append(wrapper)
+        return wrapper
+    return deco
+
@@ -0,0 +1,151 @@
+import re
+import warnings
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from .triangle import PORTFOLIO, segment_labels, build_triangle
+from .memo import memoize, copy_shallow
+from .telemetry import span
+
+
+@dataclass(frozen=True)
+class OutlierMethod:
+    name: str
+    label: str
+    func: object
+    keywords: tuple = ()
+    defaults: dict = field(default_factory=dict)
+    priority: int = 100
+
+    def apply(self, tri, **params) -> pd.DataFrame:
+        kw = dict(self.defaults)
+        kw.update(params)
+        with span(f"outlier:{self.name}") as s:
+            flags = _apply_method(self.name, tri, **kw)
+            s.set(cells=len(flags))
+        return flags
+
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+# name -> OutlierMethod; resolve_outlier_method tries lower priority first, then insertion order
+OUTLIER_METHODS = {}
+
+def register_outlier_method(name: str, label: str, keywords=(), priority: int = 100, **defaults):
+    def deco(fn):
+        OUTLIER_METHODS[name] = OutlierMethod(name, label, fn, tuple(keywords), defaults, priority)
+        return fn
+    return deco
+
+@memoize(maxsize=64, copy_result=copy_shallow)
+def _apply_method(name: str, tri, **params) -> pd.DataFrame:
+    return OUTLIER_METHODS[name].func(tri, **params)
+
+def resolve_outlier_method(text):
+    """LLM/kullanıcı yöntem adını kayıtlı bir yönteme eşler; eşleşme yoksa None."""
+    if not text:
+        return None
+    # whole words only ("made up" is not mad); a method name anywhere in the text beats keyword priority
+    words = _WORD.findall(str(text).lower())
+    for w in words:
+        if w in OUTLIER_METHODS:
+            return OUTLIER_METHODS[w]
+    present = set(words)
+    for m in sorted(OUTLIER_METHODS.values(), key=lambda m: m.priority):
+        if any(set(_WORD.findall(kw)) <= present for kw in m.keywords):
+            return m
+    return None
+
+
+@contextmanager
+def _quiet():
+    # all-NaN columns are expected (short AYs); silence nan-reduction warnings
+    with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        yield
+
+def _matrix(tri, view: str, col: str, portfolio: bool):
+    arr = getattr(tri, view)(col, portfolio)
+    segs = [PORTFOLIO] if portfolio else tri.segments
+    return (arr[None] if portfolio else arr), segs
+
+def _long(arr: np.ndarray, segs, tri, dev_name: str, dev_labels, value_name: str, stats: dict) -> pd.DataFrame:
+    # arr is (S, A, D); rows come out ordered by segment, dev, AY
+    # stats are (S, D) per-column parameters broadcast to their cells
+    t = arr.transpose(0, 2, 1)
+    s, d, a = np.nonzero(~np.isnan(t))
+    out = {
+        "segment": segment_labels(segs)[s],
+        dev_name: np.asarray(dev_labels)[d],
+        "accident_year": tri.accident_years[a].astype(int),
+        value_name: t[s, d, a],
+    }
+    for k, v in stats.items():
+        out[k] = v[s, d] if v.ndim == 2 else v.transpose(0, 2, 1)[s, d, a]
+    return pd.DataFrame(out)
+
+
+@register_outlier_method("mad", "MAD / robust z (incremental)", keywords=("mad", "robust"), threshold=3.5)
+def mad_on_incremental(tri, col: str = "incurred_cum", threshold: float = 3.5, portfolio: bool = False) -> pd.DataFrame:
+    x, segs = _matrix(tri, "incremental", col, portfolio)
+    with _quiet():
+        med = np.nanmedian(x, axis=1, keepdims=True)
+        mad = np.nanmedian(np.abs(x - med), axis=1, keepdims=True)
+        rz = np.where(mad > 0, 0.6745 * (x - med) / mad, 0.0)
+    rz[np.isnan(x)] = np.nan
+    return _long(x, segs, tri, "development_quarter", tri.dev, "incremental", {
+        "robust_z": rz,
+        "is_outlier": np.abs(np.nan_to_num(rz)) >= threshold,
+        "median": med[:, 0, :],
+        "mad": mad[:, 0, :],
+    })
+
+
+@register_outlier_method("zscore", "z-score (incremental)", keywords=("z score", "z-score", "zscore"), z=3.0)
+def zscore_on_incremental(tri, col: str = "incurred_cum", z: float = 3.0, portfolio: bool = False) -> pd.DataFrame:
+    x, segs = _matrix(tri, "incremental", col, portfolio)
+    n = np.sum(~np.isnan(x), axis=1, keepdims=True)
+    with _quiet():
+        mu = np.nanmean(x, axis=1, keepdims=True)
+        sd = np.where(n > 1, np.nanstd(x, axis=1, ddof=1, keepdims=True), 0.0)
+        zval = np.where(sd > 0, (x - mu) / sd, 0.0)
+    return _long(x, segs, tri, "development_quarter", tri.dev, "incremental", {
+        "z": zval,
+        "is_outlier": np.abs(zval) >= z,
+        "mu": mu[:, 0, :],
+        "sd": sd[:, 0, :],
+    })
+
+
+@register_outlier_method("iqr", "IQR / Tukey (age-to-age)", keywords=("iqr", "tukey"), k=1.5)
+def iqr_on_ata(tri, col: str = "incurred_cum", k: float = 1.5, portfolio: bool = False) -> pd.DataFrame:
+    x, segs = _matrix(tri, "ata", col, portfolio)
+    with _quiet():
+        q1, q3 = np.nanquantile(x, [0.25, 0.75], axis=1)
+    iqr = q3 - q1
+    lo, hi = q1 - k*iqr, q3 + k*iqr
+    with _quiet():
+        flag = (x < lo[:, None, :]) | (x > hi[:, None, :])
+    return _long(x, segs, tri, "age", tri.age_labels, "factor", {
+        "lo": lo,
+        "hi": hi,
+        "is_outlier": flag,
+    })
+
+
+def apply_iqr_on_ata(df_norm: pd.DataFrame, tri=None, k=1.5) -> pd.DataFrame:
+    if tri is None:
+        tri = build_triangle(df_norm)
+    return OUTLIER_METHODS["iqr"].apply(tri, col="incurred_cum", k=k)
+
+def apply_zscore_on_incremental(df_norm: pd.DataFrame, col="incurred_cum", z=3.0, tri=None) -> pd.DataFrame:
+    if tri is None:
+        tri = build_triangle(df_norm)
+    return OUTLIER_METHODS["zscore"].apply(tri, col=col, z=z)
+
+
+# methods living in their own modules register on import
+from . import evt, stochastic  # noqa: E402,F401
@@ -0,0 +1,29 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+_POOLS = {}
+
+def default_workers() -> int:
+    return max(1, (os.cpu_count() or 1) - 1)
+
+def process_pool(max_workers=None) -> ProcessPoolExecutor:
+    """Process-wide pool per worker count; reused across calls so workers start only once."""
+    n = max_workers or default_workers()
+    if n not in _POOLS:
+        _POOLS[n] = ProcessPoolExecutor(max_workers=n)
+    return _POOLS[n]
+
+def run_tasks(fn, tasks, workers=None) -> list:
+    """fn(*task) for every task, in order. workers<=1 (or a single task) runs inline."""
+    tasks = list(tasks)
+    n = default_workers() if workers is None else int(workers)
+    if n <= 1 or len(tasks) <= 1:
+        return [fn(*t) for t in tasks]
+    pool = process_pool(n)
+    futures = [pool.submit(fn, *t) for t in tasks]
+    return [f.result() for f in futures]
+
+def shutdown_pools():
+    for pool in _POOLS.values():
+        pool.shutdown(cancel_futures=True)
+    _POOLS.clear()
@@ -0,0 +1,166 @@
+import glob
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+from .cache import load_normalized
+from .stats import run_basic_eda
+from .export import export_tur1_excel_file, SUMMARY_VERSION
+from .outliers import OUTLIER_METHODS, resolve_outlier_method
+from .prompts import build_prompt_tur1, build_prompt_tur2
+from .parallel import run_tasks
+
+DEFAULT_METHOD = "iqr"
+INPUT_EXTS = (".csv", ".parquet", ".pq", ".arrow", ".feather", ".ipc")
+MANIFEST_NAME = "manifest.json"
+
+
+def _llm_step(fn, api_key, model, built):
+    # LLM is optional in batch runs: any failure (or an over-budget prompt) is recorded, never fatal
+    if built.over_budget:
+        return None, f"prompt token bütçesini aşıyor (~{built.tokens:,} > {built.budget:,}); gönderilmedi"
+    try:
+        return fn(api_key, model, built.text), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+def _check_method(method):
+    # an explicit method must be a registered name; only LLM recommendations fall back to DEFAULT_METHOD
+    if method is not None and method not in OUTLIER_METHODS:
+        raise ValueError(f"Bilinmeyen aykırı değer yöntemi: {method} (seçenekler: {', '.join(OUTLIER_METHODS)})")
+
+def run_file(path: str, out_dir: str, method: str = None, api_key: str = None, model: str = "gpt-4o-mini",
+             use_llm: bool = False, load_kw: dict = None, stem: str = None) -> dict:
+    """
+    Tur-1..3 for one input without any UI: load -> normalize -> EDA -> (optional) LLM summary and
+    recommendation -> outlier method -> <stem>.json + <stem>.xlsx in out_dir. Returns the manifest entry.
+    method (a registered name, else ValueError) overrides the LLM recommendation; a missing or
+    unrecognized recommendation falls back to DEFAULT_METHOD.
+    """
+    _check_method(method)
+    t0 = time.perf_counter()
+    timings = {}
+    stem = stem or os.path.splitext(os.path.basename(path))[0]
+    df, notes, tri, key = load_normalized(path, **(load_kw or {}))
+    timings["load"] = time.perf_counter() - t0
+    if tri is None:
+        raise ValueError(f"accident_year / development_quarter kolonları yok: {path}")
+
+    t = time.perf_counter()
+    eda = run_basic_eda(df, tri=tri)
+    timings["eda"] = time.perf_counter() - t
+
+    llm_summary = recommendation = None
+    llm_errors = []
+    if use_llm:
+        from services.llm_client import call_llm
+        t = time.perf_counter()
+        llm_summary, err = _llm_step(call_llm, api_key, model, build_prompt_tur1(eda))
+        llm_errors += [err] if err else []
+        excel_summary = {"version": SUMMARY_VERSION, "eda": eda}
+        recommendation, err = _llm_step(call_llm, api_key, model, build_prompt_tur2(excel_summary, eda))
+        llm_errors += [err] if err else []
+        timings["llm"] = time.perf_counter() - t
+
+    chosen = method
+    if method:
+        resolved = OUTLIER_METHODS[method]
+    else:
+        if isinstance(recommendation, dict):
+            chosen = (recommendation.get("top_recommendation") or {}).get("method")
+        resolved = resolve_outlier_method(chosen) or OUTLIER_METHODS[DEFAULT_METHOD]
+
+    t = time.perf_counter()
+    flags = resolved.apply(tri)
+    timings["outliers"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    xlsx = export_tur1_excel_file(df, eda, path=os.path.join(out_dir, stem + ".xlsx"), tri=tri, flags=flags)
+    flagged = flags[flags["is_outlier"]] if len(flags) else flags
+    payload = {
+        "input": path,
+        "key": key,
+        "notes": notes,
+        "eda": eda,
+        "llm_summary": llm_summary,
+        "recommendation": recommendation,
+        "method": {"requested": chosen, "name": resolved.name, "label": resolved.label},
+        "n_cells": int(len(flags)),
+        "n_flagged": int(len(flagged)),
+        "flagged": json.loads(flagged.to_json(orient="records", date_format="iso")),
+    }
+    js = os.path.join(out_dir, stem + ".json")
+    with open(js, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2, default=str)
+    timings["export"] = time.perf_counter() - t
+    timings["total"] = time.perf_counter() - t0
+    return {
+        "input": path, "status": "ok", "outputs": {"json": js, "xlsx": xlsx},
+        "method": resolved.name, "n_flagged": payload["n_flagged"],
+        "llm_errors": llm_errors, "timings": {k: round(v, 4) for k, v in timings.items()},
+    }
+
+def _run_one(path: str, out_dir: str, stem: str, kw: dict) -> dict:
+    # worker entry: a failing file becomes a manifest entry instead of aborting the batch
+    t0 = time.perf_counter()
+    try:
+        return run_file(path, out_dir, stem=stem, **kw)
+    except Exception as e:
+        return {"input": path, "status": "failed", "error": f"{type(e).__name__}: {e}",
+                "timings": {"total": round(time.perf_counter() - t0, 4)}}
+
+def expand_inputs(inputs) -> list:
+    """Files, directories (supported extensions, non-recursive) and glob patterns -> sorted unique paths."""
+    out = []
+    for item in [inputs] if isinstance(inputs, str) else inputs:
+        if os.path.isdir(item):
+            found = [os.path.join(item, n) for n in os.listdir(item)]
+            found = [p for p in found if os.path.isfile(p) and p.lower().endswith(INPUT_EXTS)]
+        elif os.path.isfile(item):
+            found = [item]
+        else:
+            found = [p for p in glob.glob(item, recursive=True) if os.path.isfile(p)]
+        out += found
+    return sorted(dict.fromkeys(os.path.normpath(p) for p in out))
+
+def _output_stems(paths: list) -> list:
+    # same file name in different folders -> name, name_2, ...
+    seen, stems = {}, []
+    for p in paths:
+        stem = os.path.splitext(os.path.basename(p))[0]
+        seen[stem] = seen.get(stem, 0) + 1
+        stems.append(stem if seen[stem] == 1 else f"{stem}_{seen[stem]}")
+    return stems
+
+def run_batch(inputs, out_dir: str, workers: int = None, method: str = None, api_key: str = None,
+              model: str = "gpt-4o-mini", use_llm: bool = False, load_kw: dict = None) -> dict:
+    """
+    Headless Tur-1..3 over many inputs: every file runs through run_file in the shared process pool
+    (at most `workers` at once) and out_dir/manifest.json records settings, per-file status and outputs.
+    """
+    _check_method(method)
+    items = [inputs] if isinstance(inputs, str) else list(inputs)
+    unmatched = [item for item in items if not expand_inputs(item)]
+    paths = expand_inputs(items)
+    if not paths:
+        raise ValueError(f"Girdi dosyası bulunamadı: {inputs}")
+    os.makedirs(out_dir, exist_ok=True)
+    started = datetime.now(timezone.utc)
+    kw = {"method": method, "api_key": api_key, "model": model, "use_llm": use_llm, "load_kw": load_kw}
+    tasks = [(p, out_dir, stem, kw) for p, stem in zip(paths, _output_stems(paths))]
+    files = run_tasks(_run_one, tasks, workers=workers)
+    manifest = {
+        "started": started.isoformat(),
+        "finished": datetime.now(timezone.utc).isoformat(),
+        "settings": {"workers": workers, "method": method, "model": model if use_llm else None,
+                     "use_llm": use_llm, "load_kw": load_kw or {}},
+        "unmatched_inputs": unmatched,
+        "n_files": len(files),
+        "n_ok": sum(f["status"] == "ok" for f in files),
+        "n_failed": sum(f["status"] != "ok" for f in files),
+        "files": files,
+    }
+    with open(os.path.join(out_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, default=str)
+    return manifest
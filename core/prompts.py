@@ -1,17 +1,142 @@
 import json
+import math
+from typing import NamedTuple
 
-def prompt_tur1(eda_result: dict) -> str:
-    return f"""
+# per-turn prompt budgets (estimated tokens, template included)
+TOKEN_BUDGETS = {"tur1": 2000, "tur2": 3000, "tur3": 3500}
+# compaction levels tried in order until the prompt fits: (top_k, significant digits, sample rows)
+COMPACTION_LEVELS = [(None, None, 40), (24, 6, 20), (12, 5, 10), (6, 4, 5), (3, 3, 0)]
+
+
+class PromptBuild(NamedTuple):
+    text: str
+    tokens: int
+    level: int
+    budget: int
+    # True when even the most compact level exceeds the budget; callers should not send it
+    over_budget: bool = False
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 chars per token for JSON-heavy English/Turkish text; no tokenizer dependency
+    return int(math.ceil(len(text) / 4))
+
+def _dumps(obj) -> str:
+    # deterministic and compact: identical inputs give byte-identical prompts (cache friendly)
+    return json.dumps(obj, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+
+def _round(obj, digits):
+    if digits is None:
+        return obj
+    if isinstance(obj, float):
+        return float(f"{obj:.{digits}g}") if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _round(v, digits) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_round(v, digits) for v in obj]
+    return obj
+
+def _top_factors(factors: dict, k) -> dict:
+    # keep the k factors furthest from 1 (ties broken by age label) and describe the rest
+    if k is None or len(factors) <= k:
+        return factors
+    ranked = sorted(factors.items(), key=lambda kv: (-abs(math.log(kv[1])) if kv[1] and kv[1] > 0 else 0, kv[0]))
+    vals = sorted(factors.values())
+    return {
+        "top": dict(sorted(ranked[:k])),
+        "n": len(vals), "min": vals[0], "median": vals[len(vals) // 2], "max": vals[-1],
+    }
+
+def _top_list(items: list, k) -> list | dict:
+    if k is None or len(items) <= k:
+        return items
+    return {"first": items[:k], "n": len(items)}
+
+def compact_eda(eda: dict, top_k=None, digits=None) -> dict:
+    """Summarize the Tur-1 EDA: top-k age-to-age factors, aggregated violations, non-zero nulls only."""
+    if not isinstance(eda, dict):
+        return eda
+    out = dict(eda)
+    if top_k is not None:
+        out["null_counts"] = {c: n for c, n in eda.get("null_counts", {}).items() if n}
+        if "age_to_age_incurred" in eda:
+            out["age_to_age_incurred"] = _top_factors(eda["age_to_age_incurred"], top_k)
+        if "monotonicity" in eda:
+            out["monotonicity"] = {
+                c: {"ok": v.get("ok"), "n_violations": len(v.get("violations_by_AY", [])),
+                    "violations_by_AY": _top_list(v.get("violations_by_AY", []), top_k)}
+                for c, v in eda["monotonicity"].items()
+            }
+        cov = eda.get("dev_quarter_max_by_AY")
+        if isinstance(cov, dict) and len(cov) > top_k:
+            vals = list(cov.values())
+            out["dev_quarter_max_by_AY"] = {"n_AY": len(vals), "min": min(vals), "max": max(vals),
+                                            "last": dict(list(cov.items())[-top_k:])}
+        if "data_quality" in eda:
+            # failing rules only, with fewer sample keys as the level tightens
+            out["data_quality"] = {
+                name: {"count": r["count"], "severity": r["severity"], "sample": r["sample"][:max(top_k // 8, 1)]}
+                for name, r in eda["data_quality"].items() if r.get("count")
+            }
+        if top_k <= 6:
+            # at the tightest levels per-column dtypes/uniques add little
+            out.pop("dtypes", None)
+            out.pop("unique_counts", None)
+    return _round(out, digits)
+
+def excel_as_eda(excel_summary: dict) -> dict:
+    """Tur-1 Excel özetini EDA anahtarlarına çevirir (tekrarları ayıklamak için)."""
+    if not isinstance(excel_summary, dict):
+        return {}
+    if "eda" in excel_summary:
+        return dict(excel_summary["eda"])
+    out = {}
+    if excel_summary.get("shape"):
+        out["shape"] = excel_summary["shape"]
+    if excel_summary.get("numeric_sums"):
+        out["numeric_sums"] = {r.get("column"): r.get("sum") for r in excel_summary["numeric_sums"]}
+    if excel_summary.get("segments"):
+        out["segment_candidates"] = excel_summary["segments"]
+    if excel_summary.get("age_to_age"):
+        out["age_to_age_incurred"] = {r.get("age_to_age"): r.get("factor") for r in excel_summary["age_to_age"]}
+    if excel_summary.get("columns"):
+        out["dtypes"] = {r.get("column"): r.get("dtype") for r in excel_summary["columns"]}
+    for k, v in excel_summary.items():
+        if k not in ("shape", "numeric_sums", "segments", "age_to_age", "columns"):
+            out[k] = v
+    return out
+
+def dedupe_against(extra: dict, base: dict) -> dict:
+    """extra içinde base ile (yuvarlanmış) aynı olan anahtarları at; kalan fark döner."""
+    return {k: v for k, v in extra.items() if _dumps(_round(v, 6)) != _dumps(_round(base.get(k), 6))}
+
+def _fit(render, budget: int) -> PromptBuild:
+    text = ""
+    for level, params in enumerate(COMPACTION_LEVELS):
+        text = render(*params)
+        tokens = estimate_tokens(text)
+        if tokens <= budget:
+            return PromptBuild(text, tokens, level, budget)
+    return PromptBuild(text, estimate_tokens(text), len(COMPACTION_LEVELS) - 1, budget, over_budget=True)
+
+def build_prompt_tur1(eda_result: dict, budget: int = TOKEN_BUDGETS["tur1"]) -> PromptBuild:
+    def render(top_k, digits, _rows):
+        return f"""
     You are an actuarial assistant focusing on Auto Hull (Kasko) cumulative claims.
     Summarize this EDA in <=150 words. Emphasize: shape, numeric totals, low-cardinality
-    segments, monotonicity, and material age-to-age signals.
+    segments, monotonicity, data-quality rule failures, and material age-to-age signals.
     EDA_JSON:
-    {json.dumps(eda_result, ensure_ascii=False)}
+    {_dumps(compact_eda(eda_result, top_k, digits))}
     """
+    return _fit(render, budget)
 
-def prompt_tur2_from_excel(excel_summary: dict, eda_result: dict) -> str:
-    # Açık ve seçilebilir bir öneri istiyoruz: top_recommendation zorunlu
-    return f"""
+def build_prompt_tur2(excel_summary: dict, eda_result: dict, budget: int = TOKEN_BUDGETS["tur2"]) -> PromptBuild:
+    # Excel özeti büyük ölçüde EDA'nın kopyası: yalnızca farklı olan kısımları gönder
+    extra = dedupe_against(excel_as_eda(excel_summary), eda_result or {})
+
+    def render(top_k, digits, _rows):
+        # Açık ve seçilebilir bir öneri istiyoruz: top_recommendation zorunlu
+        return f"""
     You are an actuarial data QA consultant. Given the Turn-1 dataset summary (from Excel) and EDA,
     propose an OUTLIER analysis plan for cumulative claims triangles.
 
@@ -19,6 +144,7 @@ def prompt_tur2_from_excel(excel_summary: dict, eda_result: dict) -> str:
       - IQR/Tukey (on incremental losses and on age-to-age factors),
       - z-score / robust MAD,
       - EVT (POT) with Hill estimator (outline thresholding and diagnostics).
+      - ODP bootstrap / Mack chain ladder (reserve variability; residual diagnostics).
 
     Return STRICT JSON with keys:
     {{
@@ -33,14 +159,20 @@ def prompt_tur2_from_excel(excel_summary: dict, eda_result: dict) -> str:
       "notes": "<free text>"
     }}
 
-    EXCEL_SUMMARY_JSON: {json.dumps(excel_summary, ensure_ascii=False)}
-    EDA_JSON: {json.dumps(eda_result, ensure_ascii=False)}
+    EXCEL_SUMMARY_JSON (only fields not already in EDA_JSON): {_dumps(compact_eda(extra, top_k, digits))}
+    EDA_JSON: {_dumps(compact_eda(eda_result, top_k, digits))}
     """
+    return _fit(render, budget)
 
-def prompt_tur3(df_norm, tur1_out, tur2_out) -> str:
-    # Tur-3: anlatımı zenginleştirmek için kısa plan istiyoruz
-    sample = df_norm.head(40).to_dict(orient="records")
-    return f"""
+def build_prompt_tur3(df_norm, tur1_out, tur2_out, budget: int = TOKEN_BUDGETS["tur3"]) -> PromptBuild:
+    tur1_out = tur1_out if isinstance(tur1_out, dict) else {"raw": tur1_out}
+
+    def render(top_k, digits, rows):
+        sample = df_norm.head(rows).to_dict(orient="records") if rows else []
+        tur1 = dict(tur1_out)
+        tur1["eda"] = compact_eda(tur1_out.get("eda"), top_k, digits)
+        # Tur-3: anlatımı zenginleştirmek için kısa plan istiyoruz
+        return f"""
     You are an actuarial analyst. Using the Turn-2 recommendation, choose ONE method (prefer the 'top_recommendation')
     and produce a concise narrative (<=120 words) including:
     - chosen_method,
@@ -55,7 +187,17 @@ def prompt_tur3(df_norm, tur1_out, tur2_out) -> str:
       "narrative": "<<=120 words>"
     }}
 
-    TUR1={json.dumps(tur1_out, ensure_ascii=False)}
-    TUR2={json.dumps(tur2_out, ensure_ascii=False)}
-    SAMPLE_ROWS={json.dumps(sample, ensure_ascii=False)}
+    TUR1={_dumps(_round(tur1, digits))}
+    TUR2={_dumps(_round(tur2_out, digits))}
+    SAMPLE_ROWS={_dumps(_round(sample, digits))}
     """
+    return _fit(render, budget)
+
+def prompt_tur1(eda_result: dict) -> str:
+    return build_prompt_tur1(eda_result).text
+
+def prompt_tur2_from_excel(excel_summary: dict, eda_result: dict) -> str:
+    return build_prompt_tur2(excel_summary, eda_result).text
+
+def prompt_tur3(df_norm, tur1_out, tur2_out) -> str:
+    return build_prompt_tur3(df_norm, tur1_out, tur2_out).text
@@ -0,0 +1,204 @@
+import re
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .triangle import SEGMENT_COLS
+
+SAMPLE_KEYS = 5
+# development periods per accident year that infer_dev_per_year accepts (4 = quarters, 12 = months)
+DEV_FREQUENCIES = (1, 2, 4, 12)
+_QUARTER = re.compile(r"(\d{4})\D*[Qq]([1-4])")
+
+
+@dataclass(frozen=True)
+class QualityRule:
+    name: str
+    label: str
+    func: object
+    columns: tuple = ()
+    severity: str = "error"
+    needs_dev_freq: bool = False
+
+
+# name -> QualityRule; check_quality evaluates them in insertion order
+QUALITY_RULES = {}
+
+def register_quality_rule(name: str, label: str, columns=(), severity: str = "error", needs_dev_freq: bool = False):
+    """
+    func(cols) -> boolean row mask of offending rows; skipped when a required column is missing,
+    or (needs_dev_freq) when the development period length is unknown.
+    """
+    def deco(fn):
+        QUALITY_RULES[name] = QualityRule(name, label, fn, tuple(columns), severity, needs_dev_freq)
+        return fn
+    return deco
+
+
+class _Columns:
+    """Columnar view shared by every rule: each column / group code is materialized once per check."""
+
+    def __init__(self, df: pd.DataFrame, segment_cols, dev_per_year: int):
+        self.df = df
+        self.n = len(df)
+        self.segment_cols = [c for c in segment_cols if c in df.columns]
+        self.dev_per_year = dev_per_year
+        self._cache = {}
+
+    def num(self, col: str) -> np.ndarray:
+        if col not in self._cache:
+            self._cache[col] = pd.to_numeric(self.df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        return self._cache[col]
+
+    def codes(self, *extra) -> np.ndarray:
+        # group code per row over segment columns + extra; rows with a missing key get -1
+        key = ("codes",) + extra
+        if key not in self._cache:
+            keys = self.segment_cols + list(extra)
+            g = self.df.groupby(keys, sort=False, dropna=True, observed=True).ngroup()
+            self._cache[key] = g.fillna(-1).to_numpy(dtype=np.int64)
+        return self._cache[key]
+
+    def keys(self, idx: np.ndarray) -> list:
+        cols = self.segment_cols + [c for c in ("accident_year","development_quarter") if c in self.df.columns]
+        sub = self.df.iloc[idx][cols]
+        return [{c: (v.item() if hasattr(v, "item") else v) for c, v in row.items() if pd.notna(v)}
+                for row in sub.astype(object).to_dict("records")]
+
+
+def infer_dev_per_year(df: pd.DataFrame, segment_cols=None):
+    """
+    Development periods per accident year read off the triangle shape: within a segment the latest
+    period of an AY exceeds the next AY's by one year of periods. AYs already at the maximum development
+    (truncated triangles) are ignored. None when there is no evidence or it is not one of DEV_FREQUENCIES.
+    """
+    if not {"accident_year","development_quarter"}.issubset(df.columns):
+        return None
+    segs = [c for c in (SEGMENT_COLS if segment_cols is None else segment_cols) if c in df.columns]
+    last = df.groupby(segs + ["accident_year"], observed=True, sort=True)["development_quarter"].max().reset_index()
+    if len(last) < 2:
+        return None
+    ay = pd.to_numeric(last["accident_year"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    dev = pd.to_numeric(last["development_quarter"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    pairs = (ay[1:] - ay[:-1] == 1) & (dev[:-1] < np.nanmax(dev))
+    for c in segs:
+        v = last[c].to_numpy()
+        pairs &= v[1:] == v[:-1]
+    steps = (dev[:-1] - dev[1:])[pairs]
+    steps = steps[~np.isnan(steps)]
+    if not steps.size:
+        return None
+    step = float(np.median(steps))
+    return int(step) if step in DEV_FREQUENCIES else None
+
+
+def _quarter_index(values: pd.Series) -> np.ndarray:
+    # "2025-Q3" / "2025Q3" / dates -> year*4 + quarter-1; labels are parsed once per distinct value
+    cat = values.astype("category")
+    parsed = []
+    for label in cat.cat.categories:
+        m = _QUARTER.search(str(label))
+        if m:
+            parsed.append(int(m.group(1)) * 4 + int(m.group(2)) - 1)
+            continue
+        ts = pd.to_datetime(label, errors="coerce")
+        parsed.append(np.nan if pd.isna(ts) else ts.year * 4 + ts.quarter - 1)
+    lookup = np.append(np.asarray(parsed, dtype="float64"), np.nan)
+    codes = cat.cat.codes.to_numpy()
+    return lookup[np.where(codes < 0, len(parsed), codes)]
+
+
+@register_quality_rule("duplicate_keys", "Tekrarlanan (segment, AY, devQ) anahtarı",
+                       columns=("accident_year","development_quarter"))
+def _duplicate_keys(c: _Columns) -> np.ndarray:
+    codes = c.codes("accident_year","development_quarter")
+    counts = np.bincount(codes[codes >= 0], minlength=1)
+    return (codes >= 0) & (counts[np.maximum(codes, 0)] > 1)
+
+@register_quality_rule("dev_gaps", "Gelişim dizisinde boşluk", columns=("accident_year","development_quarter"),
+                       severity="warning")
+def _dev_gaps(c: _Columns) -> np.ndarray:
+    # flags the first row after a missing development period inside its (segment, AY)
+    group, dev = c.codes("accident_year"), c.num("development_quarter")
+    ok = (group >= 0) & ~np.isnan(dev)
+    order = np.flatnonzero(ok)[np.lexsort((dev[ok], group[ok]))]
+    g, d = group[order], dev[order]
+    jump = np.zeros(len(order), dtype=bool)
+    jump[1:] = (g[1:] == g[:-1]) & (d[1:] - d[:-1] > 1)
+    mask = np.zeros(c.n, dtype=bool)
+    mask[order[jump]] = True
+    return mask
+
+@register_quality_rule("paid_gt_incurred", "Ödenen > gerçekleşen (paid_cum > incurred_cum)",
+                       columns=("paid_cum","incurred_cum"))
+def _paid_gt_incurred(c: _Columns) -> np.ndarray:
+    return c.num("paid_cum") > c.num("incurred_cum")
+
+@register_quality_rule("reported_gt_ultimate_claims", "Bildirilen hasar adedi > nihai hasar adedi",
+                       columns=("reported_claims_cum","ultimate_claims"))
+def _reported_gt_ultimate(c: _Columns) -> np.ndarray:
+    return c.num("reported_claims_cum") > c.num("ultimate_claims")
+
+@register_quality_rule("negative_exposure", "Negatif poliçe adedi (exposure_policies < 0)",
+                       columns=("exposure_policies",))
+def _negative_exposure(c: _Columns) -> np.ndarray:
+    return c.num("exposure_policies") < 0
+
+@register_quality_rule("inconsistent_ultimate_incurred", "AY içinde farklı ultimate_incurred değerleri",
+                       columns=("accident_year","ultimate_incurred"))
+def _inconsistent_ultimate(c: _Columns) -> np.ndarray:
+    group, v = c.codes("accident_year"), c.num("ultimate_incurred")
+    ok = (group >= 0) & ~np.isnan(v)
+    n_groups = max(int(group.max()) + 1, 1) if c.n else 1
+    lo = np.full(n_groups, np.inf)
+    hi = np.full(n_groups, -np.inf)
+    np.minimum.at(lo, group[ok], v[ok])
+    np.maximum.at(hi, group[ok], v[ok])
+    bad = hi > lo
+    return ok & bad[np.maximum(group, 0)]
+
+@register_quality_rule("future_dated", "Değerleme çeyreğinden sonraki hücre",
+                       columns=("valuation_quarter","accident_year","development_quarter"), needs_dev_freq=True)
+def _future_dated(c: _Columns) -> np.ndarray:
+    # calendar quarter of the cell: AY Q1 + (dev-1) periods
+    cell = c.num("accident_year") * 4 + np.floor((c.num("development_quarter") - 1) * 4 / c.dev_per_year)
+    return cell > _quarter_index(c.df["valuation_quarter"])
+
+
+def check_quality(df: pd.DataFrame, rules=None, segment_cols=None, sample: int = SAMPLE_KEYS,
+                  dev_per_year: int = None) -> dict:
+    """
+    Evaluates the data-quality rules as columnar masks over one shared set of converted columns.
+    Returns {rule: {label, severity, ok, count, sample}} with up to `sample` offending
+    (segment, AY, devQ) keys; rules whose columns are missing report `skipped` instead.
+    dev_per_year=None infers the development period length (infer_dev_per_year); rules that
+    need it are skipped when it cannot be determined.
+    """
+    segment_cols = SEGMENT_COLS if segment_cols is None else segment_cols
+    cols = _Columns(df, segment_cols, dev_per_year)
+    out = {}
+    for name in QUALITY_RULES if rules is None else rules:
+        rule = QUALITY_RULES[name]
+        missing = [c for c in rule.columns if c not in df.columns]
+        if missing:
+            out[name] = {"label": rule.label, "severity": rule.severity, "skipped": f"eksik kolonlar: {missing}"}
+            continue
+        if rule.needs_dev_freq and cols.dev_per_year is None:
+            cols.dev_per_year = infer_dev_per_year(df, segment_cols) or 0
+        if rule.needs_dev_freq and not cols.dev_per_year:
+            out[name] = {"label": rule.label, "severity": rule.severity,
+                         "skipped": "gelişim periyodu (çeyrek / ay) veriden belirlenemedi"}
+            continue
+        idx = np.flatnonzero(rule.func(cols))
+        out[name] = {"label": rule.label, "severity": rule.severity, "ok": idx.size == 0,
+                     "count": int(idx.size), "sample": cols.keys(idx[:sample])}
+    return out
+
+def quality_frame(report: dict) -> pd.DataFrame:
+    """One row per rule (for tables / Excel)."""
+    return pd.DataFrame([{
+        "rule": name, "label": r["label"], "severity": r["severity"], "ok": r.get("ok"),
+        "count": r.get("count"), "skipped": r.get("skipped"),
+        "sample": "; ".join("/".join(str(v) for v in k.values()) for k in r.get("sample", [])),
+    } for name, r in report.items()])
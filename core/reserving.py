@@ -0,0 +1,211 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .triangle import PORTFOLIO, segment_labels
+from .outliers import _quiet
+
+LDF_METHODS = ("volume", "simple")
+# future development periods multiplied into a fitted tail factor
+TAIL_HORIZON = 100
+
+
+def _pairs(C: np.ndarray, exclude=None) -> tuple:
+    # (..., A, D-1) numerator/denominator of every usable j -> j+1 link
+    num, den = C[..., 1:], C[..., :-1]
+    ok = ~(np.isnan(num) | np.isnan(den)) & (den > 0)
+    if exclude is not None:
+        ok &= ~np.asarray(exclude, dtype=bool)
+    return num, den, ok
+
+def _nanquantiles(x: np.ndarray, qs, axis: int = -2) -> list:
+    # linear-interpolation quantiles ignoring NaN from a single sort (np.nanquantile loops per slice)
+    s = np.sort(x, axis=axis)
+    n = np.sum(~np.isnan(x), axis=axis, keepdims=True)
+    out = []
+    for q in qs:
+        pos = q * np.maximum(n - 1, 0)
+        lo = np.floor(pos).astype(np.intp)
+        hi = np.minimum(lo + 1, np.maximum(n - 1, 0))
+        v_lo = np.take_along_axis(s, lo, axis=axis)
+        v_hi = np.take_along_axis(s, hi, axis=axis)
+        out.append(np.where(n > 0, v_lo + (pos - lo) * (v_hi - v_lo), np.nan))
+    return out
+
+def iqr_exclusions(C: np.ndarray, k: float = 1.5) -> np.ndarray:
+    """Links outside the Tukey fences of their development column (same rule as iqr_on_ata)."""
+    num, den, ok = _pairs(C)
+    f = np.where(ok, num / np.where(ok, den, 1.0), np.nan)
+    with _quiet():
+        q1, q3 = _nanquantiles(f, [0.25, 0.75])
+    iqr = q3 - q1
+    with _quiet():
+        return ok & ((f < q1 - k * iqr) | (f > q3 + k * iqr))
+
+def link_ratios(C: np.ndarray, method: str = "volume", exclude=None) -> np.ndarray:
+    """
+    Age-to-age development factors (..., D-1) for stacked cumulative arrays (..., A, D).
+    volume: sum(C[j+1]) / sum(C[j]) over AYs with both cells; simple: mean of the AY factors.
+    exclude: boolean (..., A, D-1) mask of links to leave out (e.g. iqr_exclusions), or "iqr".
+    Columns without any usable link get 1.0.
+    """
+    if isinstance(exclude, str):
+        if exclude != "iqr":
+            raise ValueError(f"Bilinmeyen dışlama kuralı: {exclude}")
+        exclude = iqr_exclusions(C)
+    num, den, ok = _pairs(C, exclude)
+    n = ok.sum(axis=-2)
+    if method == "volume":
+        s_num = np.where(ok, num, 0.0).sum(axis=-2)
+        s_den = np.where(ok, den, 0.0).sum(axis=-2)
+        with _quiet():
+            f = s_num / s_den
+    elif method == "simple":
+        with _quiet():
+            f = np.where(ok, num / np.where(ok, den, 1.0), 0.0).sum(axis=-2) / n
+    else:
+        raise ValueError(f"Bilinmeyen LDF yöntemi: {method} ({', '.join(LDF_METHODS)})")
+    return np.where(n > 0, f, 1.0)
+
+def fit_tail(ldf: np.ndarray, min_points: int = 3, horizon: int = TAIL_HORIZON) -> np.ndarray:
+    """
+    Exponential decay tail: log(f_j - 1) = a + b*j fitted over the factors above 1,
+    extrapolated for `horizon` further links. Returns 1.0 where the fit is not decaying.
+    """
+    j = np.arange(ldf.shape[-1], dtype=float)
+    m = np.isfinite(ldf) & (ldf > 1.0)
+    with _quiet():
+        y = np.where(m, np.log(np.where(m, ldf - 1.0, 1.0)), 0.0)
+    n = m.sum(axis=-1, keepdims=True)
+    with _quiet():
+        xbar = np.where(m, j, 0.0).sum(axis=-1, keepdims=True) / n
+        ybar = y.sum(axis=-1, keepdims=True) / n
+        dx = np.where(m, j - xbar, 0.0)
+        b = (dx * (y - ybar)).sum(axis=-1, keepdims=True) / (dx ** 2).sum(axis=-1, keepdims=True)
+        a = ybar - b * xbar
+        future = j[-1] + 1.0 + np.arange(horizon, dtype=float)
+        tail = np.prod(1.0 + np.exp(a + b * future), axis=-1)
+    good = (n[..., 0] >= min_points) & (b[..., 0] < 0) & np.isfinite(tail)
+    return np.where(good, tail, 1.0)
+
+def cdf_from_ldf(ldf: np.ndarray, tail=1.0) -> np.ndarray:
+    """Cumulative factor to ultimate at every dev (..., D); the last dev carries only the tail."""
+    tail = np.asarray(tail, dtype=float)[..., None]
+    rev = np.cumprod(ldf[..., ::-1], axis=-1)[..., ::-1]
+    return np.concatenate([rev, np.ones(ldf.shape[:-1] + (1,))], axis=-1) * tail
+
+def latest_diagonal(C: np.ndarray) -> tuple:
+    """(latest value, its dev index) per AY; AYs with no observed cell get NaN / -1."""
+    obs = ~np.isnan(C)
+    idx = C.shape[-1] - 1 - np.argmax(obs[..., ::-1], axis=-1)
+    idx = np.where(obs.any(axis=-1), idx, -1)
+    latest = np.take_along_axis(C, np.maximum(idx, 0)[..., None], axis=-1)[..., 0]
+    return np.where(idx >= 0, latest, np.nan), idx
+
+
+@dataclass(frozen=True)
+class ChainLadder:
+    """Chain-ladder arrays: leading dims are segments (or assumption variants), then AY / dev."""
+    ldf: np.ndarray
+    tail: np.ndarray
+    cdf: np.ndarray
+    latest: np.ndarray
+    latest_dev: np.ndarray
+    ultimate: np.ndarray
+    ibnr: np.ndarray
+
+    @property
+    def total_ibnr(self) -> np.ndarray:
+        return np.nansum(self.ibnr, axis=-1)
+
+
+def chain_ladder_arrays(C: np.ndarray, method: str = "volume", exclude=None, tail=False) -> ChainLadder:
+    """
+    Chain ladder on stacked cumulative arrays (..., A, D); every step is an array operation,
+    so any number of segments / variants can be stacked in the leading dims.
+    tail: False (1.0), True (fitted exponential tail) or an explicit factor / array.
+    """
+    C = np.asarray(C, dtype=float)
+    ldf = link_ratios(C, method, exclude)
+    if tail is True:
+        tail_f = fit_tail(ldf)
+    elif tail is False or tail is None:
+        tail_f = np.ones(ldf.shape[:-1])
+    else:
+        tail_f = np.broadcast_to(np.asarray(tail, dtype=float), ldf.shape[:-1])
+    cdf = cdf_from_ldf(ldf, tail_f)
+    latest, idx = latest_diagonal(C)
+    cdf_at = np.take_along_axis(cdf, np.maximum(idx, 0), axis=-1)
+    ultimate = np.where(idx >= 0, latest * cdf_at, np.nan)
+    return ChainLadder(ldf, tail_f, cdf, latest, idx, ultimate, ultimate - latest)
+
+def reference_ultimates(df: pd.DataFrame, tri, col: str = "ultimate_incurred") -> np.ndarray:
+    """(S, A) array of the given per-AY ultimate column aligned to the triangle axes (last non-null wins)."""
+    out = np.full(tri.shape[:2], np.nan)
+    if col not in df.columns:
+        return out
+    key = tri.segment_key
+    keys = [] if key is None else (list(key) if isinstance(key, tuple) else [key])
+    vals = pd.to_numeric(df[col], errors="coerce")
+    sub = df.loc[vals.notna(), keys + ["accident_year"]].assign(**{col: vals[vals.notna()]})
+    last = sub.groupby(keys + ["accident_year"], sort=False, observed=True, dropna=False)[col].last()
+    ay = last.index.get_level_values("accident_year").to_numpy(dtype="float64", na_value=np.nan)
+    a = np.searchsorted(tri.accident_years, ay)
+    if keys:
+        segs = last.index.droplevel("accident_year")
+        s = pd.Index(segment_labels(tri.segments)).get_indexer(segs.tolist() if len(keys) > 1 else segs)
+    else:
+        s = np.zeros(len(last), dtype=np.intp)
+    ok = (s >= 0) & (a < len(tri.accident_years)) & (tri.accident_years[np.minimum(a, len(tri.accident_years) - 1)] == ay)
+    out[s[ok], a[ok]] = last.to_numpy()[ok]
+    return out
+
+def chain_ladder(tri, col: str = "incurred_cum", method: str = "volume", exclude=None, tail=False,
+                 portfolio: bool = False, df: pd.DataFrame = None) -> pd.DataFrame:
+    """
+    Chain-ladder reserve per (segment, AY): latest diagonal, CDF, ultimate and IBNR; when df has
+    ultimate_incurred it is added alongside with the difference to the chain-ladder ultimate.
+    """
+    C = tri.cumulative(col, portfolio)
+    C = C[None] if portfolio else C
+    segs = [PORTFOLIO] if portfolio else tri.segments
+    cl = chain_ladder_arrays(C, method, exclude, tail)
+    s, a = np.nonzero(cl.latest_dev >= 0)
+    out = pd.DataFrame({
+        "segment": segment_labels(segs)[s],
+        "accident_year": tri.accident_years[a].astype(int),
+        "latest_dev": tri.dev[cl.latest_dev[s, a]],
+        "latest": cl.latest[s, a],
+        "cdf": np.take_along_axis(cl.cdf, cl.latest_dev.clip(0), axis=-1)[s, a],
+        "ultimate": cl.ultimate[s, a],
+        "ibnr": cl.ibnr[s, a],
+    })
+    if df is not None and "ultimate_incurred" in df.columns:
+        ref = reference_ultimates(df, tri)
+        if portfolio:
+            ref = np.where(np.isnan(ref).all(axis=0), np.nan, np.nansum(ref, axis=0))[None]
+        out["ultimate_incurred"] = ref[s, a]
+        out["diff_vs_ultimate_incurred"] = out["ultimate"] - out["ultimate_incurred"]
+    return out
+
+def ldf_table(tri, col: str = "incurred_cum", methods=LDF_METHODS, exclude=None, tail=False,
+              portfolio: bool = False) -> pd.DataFrame:
+    """LDF / CDF by age for each method, one row per (segment, method, age)."""
+    C = tri.cumulative(col, portfolio)
+    C = C[None] if portfolio else C
+    segs = segment_labels([PORTFOLIO] if portfolio else tri.segments)
+    ages = np.asarray(tri.age_labels, dtype=object)
+    parts = []
+    for m in methods:
+        cl = chain_ladder_arrays(C, m, exclude, tail)
+        n_seg, n_age = cl.ldf.shape
+        parts.append(pd.DataFrame({
+            "segment": np.repeat(segs, n_age),
+            "method": m,
+            "age": np.tile(ages, n_seg),
+            "ldf": cl.ldf.ravel(),
+            "cdf": cl.cdf[:, :-1].ravel(),
+            "tail": np.repeat(cl.tail, n_age),
+        }))
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
@@ -1,3 +1,5 @@
+import json
+
 
 def validate_json_output(obj, expected_keys=None):
     # liberal validator: ensure obj is dict and contains expected_keys
@@ -9,3 +11,76 @@ def validate_json_output(obj, expected_keys=None):
         for k in expected_keys:
             obj.setdefault(k, [] if k in ("segments","features") else "")
     return obj
+
+class IncrementalJSON:
+    """
+    Streams text in, yields (key, value) as soon as a top-level key's value is complete.
+    Text before the first '{' (e.g. ```json fences) is skipped; state is kept between feeds,
+    so total work is linear in the response length.
+    """
+
+    def __init__(self):
+        self.buf = ""
+        self.pos = 0
+        self.depth = 0
+        self.in_str = False
+        self.escape = False
+        self.started = False
+        self.key = None
+        self.value_start = None
+        self._last_str = None
+        self._str_start = None
+        self.done = {}
+
+    def feed(self, text: str) -> list:
+        self.buf += text
+        out = []
+        while self.pos < len(self.buf):
+            ch = self.buf[self.pos]
+            i = self.pos
+            self.pos += 1
+            if not self.started:
+                if ch == "{":
+                    self.started, self.depth = True, 1
+                continue
+            if self.in_str:
+                if self.escape:
+                    self.escape = False
+                elif ch == "\\":
+                    self.escape = True
+                elif ch == '"':
+                    self.in_str = False
+                    if self.depth == 1 and self.value_start is None:
+                        self._last_str = self.buf[self._str_start:i + 1]
+                continue
+            if ch == '"':
+                self.in_str = True
+                self._str_start = i
+            elif ch == ":" and self.depth == 1 and self.value_start is None:
+                try:
+                    self.key = json.loads(self._last_str)
+                except Exception:
+                    self.key = None
+                self.value_start = i + 1
+            elif ch in "{[":
+                self.depth += 1
+            elif ch in "}]":
+                self.depth -= 1
+                if self.depth == 0:
+                    out += self._close(i)
+                    self.started = False
+            elif ch == "," and self.depth == 1:
+                out += self._close(i)
+        return out
+
+    def _close(self, end: int) -> list:
+        if self.value_start is None:
+            return []
+        raw, key = self.buf[self.value_start:end], self.key
+        self.value_start, self.key = None, None
+        try:
+            value = json.loads(raw)
+        except Exception:
+            return []
+        self.done[key] = value
+        return [(key, value)]
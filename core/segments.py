@@ -0,0 +1,107 @@
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from .io import normalize_triangle_like
+from .stats import build_eda
+from .outliers import OUTLIER_METHODS
+from .triangle import build_triangle, SEGMENT_COLS
+from .parallel import run_tasks
+from .quality import check_quality
+
+
+@dataclass
+class SegmentRun:
+    """Per-segment results plus the merged portfolio view of one segment-aware run."""
+    keys: list
+    df: pd.DataFrame
+    tri: object
+    segments: dict = field(default_factory=dict)
+    outliers: dict = field(default_factory=dict)
+    portfolio: dict = field(default_factory=dict)
+    portfolio_outliers: dict = field(default_factory=dict)
+
+    def segment_frame(self) -> pd.DataFrame:
+        """One row per segment: size, notes and the headline EDA figures."""
+        rows = []
+        for seg, res in self.segments.items():
+            eda = res["eda"]
+            rows.append({
+                "segment": " / ".join(map(str, seg)) if isinstance(seg, tuple) else seg,
+                "rows": eda["shape"]["rows"],
+                "n_AY": len(eda.get("dev_quarter_max_by_AY", {})),
+                "monotone": all(v["ok"] for v in eda.get("monotonicity", {}).values()),
+                "notes": "; ".join(res["notes"]),
+                **{f"outliers_{m}": int(f["is_outlier"].sum()) for m, f in res["outliers"].items()},
+            })
+        return pd.DataFrame(rows)
+
+
+def segment_keys(df: pd.DataFrame, keys=None) -> list:
+    """Configured key columns present in df; defaults to SEGMENT_COLS."""
+    keys = SEGMENT_COLS if keys is None else ([keys] if isinstance(keys, str) else keys)
+    return [c for c in keys if c in df.columns]
+
+def split_segments(df: pd.DataFrame, keys) -> dict:
+    if not keys:
+        return {"ALL": df}
+    # a single key gives scalar labels, matching Triangle.segments
+    g = df.groupby(keys[0] if len(keys) == 1 else list(keys), sort=True, dropna=False, observed=True)
+    return {seg: part for seg, part in g}
+
+def _run_segment(seg, df: pd.DataFrame, keys: list, methods: tuple, params: dict) -> dict:
+    # normalize -> EDA -> outliers for a single segment; runs in a worker process
+    df, notes, tri = normalize_triangle_like(df, segment_cols=keys)
+    out = {"notes": notes, "eda": build_eda(df, tri=tri), "outliers": {}, "df": df}
+    if tri is not None:
+        for name in methods:
+            out["outliers"][name] = OUTLIER_METHODS[name].apply(tri, **params.get(name, {}))
+    return out
+
+def _merge_checks(results: list) -> dict:
+    # portfolio monotonicity = union of violating AYs; dev coverage = max over segments
+    mono, cover = {}, {}
+    for res in results:
+        for col, v in res["eda"].get("monotonicity", {}).items():
+            bad = mono.setdefault(col, set())
+            bad.update(v["violations_by_AY"])
+        for ay, d in res["eda"].get("dev_quarter_max_by_AY", {}).items():
+            cover[ay] = max(cover.get(ay, d), d)
+    out = {"monotonicity": {c: {"ok": not bad, "violations_by_AY": sorted(bad)} for c, bad in mono.items()}}
+    if cover:
+        out["dev_quarter_max_by_AY"] = dict(sorted(cover.items()))
+    return out
+
+def run_segments(df: pd.DataFrame, keys=None, methods=("iqr",), params=None, workers=None) -> SegmentRun:
+    """
+    Segment-aware Tur pipeline: splits df by the key columns and runs normalize -> EDA -> outliers
+    for every segment in the process pool, then merges them into per-segment and portfolio views.
+    The portfolio triangle keeps segments apart (no cross-segment "last" mixing); outliers are
+    reported per segment and on the portfolio sum.
+    """
+    keys = segment_keys(df, keys)
+    params = params or {}
+    parts = split_segments(df, keys)
+    tasks = [(seg, part, keys, tuple(methods), params) for seg, part in parts.items()]
+    results = run_tasks(_run_segment, tasks, workers=workers)
+
+    frames = [res.pop("df") for res in results]
+    df_all = pd.concat(frames, ignore_index=True) if frames else df.iloc[:0]
+    has_axes = {"accident_year","development_quarter"}.issubset(df_all.columns)
+    tri = build_triangle(df_all, segment_cols=keys) if has_axes else None
+
+    run = SegmentRun(keys=keys, df=df_all, tri=tri, segments=dict(zip(parts, results)))
+    for name in methods:
+        flags = [res["outliers"][name] for res in results if name in res["outliers"]]
+        if flags:
+            run.outliers[name] = pd.concat(flags, ignore_index=True)
+
+    run.portfolio = build_eda(df_all, tri=tri, checks=False)
+    run.portfolio.update(_merge_checks(results))
+    run.portfolio["n_segments"] = len(parts)
+    run.portfolio["data_quality"] = check_quality(df_all, segment_cols=keys)
+    if tri is not None:
+        run.portfolio_outliers = {
+            name: OUTLIER_METHODS[name].apply(tri, portfolio=True, **params.get(name, {})) for name in methods
+        }
+    return run
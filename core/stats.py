@@ -1,24 +1,102 @@
+import copy
 
 import pandas as pd
 import numpy as np
-from .export import build_tur1_summary
 
-def run_basic_eda(df: pd.DataFrame) -> dict:
-    # keep previous checks + enhanced summary
-    out = build_tur1_summary(df)
-    # add monotonic flags explicitly
+from .triangle import build_triangle, SEGMENT_COLS
+from .memo import memoize
+from .quality import check_quality
+from .telemetry import traced
+
+MONOTONE_COLS = ["incurred_cum","paid_cum","reported_claims_cum"]
+
+def _column_profile(df: pd.DataFrame) -> dict:
+    # one sweep over the columns: dtype, nulls, uniques and numeric sums together
+    dtypes, nulls, uniques, sums = {}, {}, {}, {}
+    for c in df.columns:
+        s = df[c]
+        dtypes[c] = str(s.dtype)
+        nulls[c] = int(s.isna().sum())
+        uniques[c] = int(s.nunique(dropna=True))
+        if pd.api.types.is_numeric_dtype(s.dtype):
+            sums[c] = float(s.sum())
+    return {"dtypes": dtypes, "null_counts": nulls, "unique_counts": uniques, "numeric_sums": sums}
+
+def _group_codes(df: pd.DataFrame) -> tuple:
+    # (segment, AY) group code per row; rows with missing AY get -1
+    keys = [c for c in SEGMENT_COLS if c in df.columns] + ["accident_year"]
+    codes = df.groupby(keys, sort=False, dropna=True, observed=True).ngroup()
+    codes = codes.fillna(-1).to_numpy(dtype=np.int64)
+    return codes, df["accident_year"].to_numpy(dtype="float64", na_value=np.nan)
+
+def _monotonicity(df: pd.DataFrame) -> dict:
+    cols = [c for c in MONOTONE_COLS if c in df.columns]
+    if not cols or "accident_year" not in df.columns:
+        return {}
+    codes, ay = _group_codes(df)
+    # keep row order inside each group (same as the groupby loop it replaces)
+    order = np.argsort(codes, kind="stable") if np.any(np.diff(codes) < 0) else np.arange(len(codes))
+    codes, ay = codes[order], ay[order]
+    vals = np.column_stack([
+        df[c].to_numpy(dtype="float64", na_value=np.nan)[order] for c in cols
+    ])
+    vals = np.nan_to_num(vals, nan=0.0)
+    same = (codes[1:] == codes[:-1]) & (codes[1:] >= 0)
+    drops = (np.diff(vals, axis=0) < 0) & same[:, None]
     checks = {}
-    for col in ["incurred_cum","paid_cum","reported_claims_cum"]:
-        if col in df.columns:
-            bad = []
-            for ay, g in df.groupby("accident_year", dropna=True):
-                vals = g[col].fillna(0).values
-                if np.any(np.diff(vals) < 0):
-                    bad.append(int(ay))
-            checks[col+"_nondecreasing"] = {"ok": len(bad)==0, "violations_by_AY": bad}
-    out["monotonicity"] = checks
-    # dev coverage by AY
-    if "development_quarter" in df.columns:
-        coverage = df.groupby("accident_year")["development_quarter"].max().to_dict()
-        out["dev_quarter_max_by_AY"] = {int(k): int(v) for k,v in coverage.items()}
+    for j, col in enumerate(cols):
+        bad = np.unique(ay[1:][drops[:, j]]).astype(int).tolist()
+        checks[col+"_nondecreasing"] = {"ok": len(bad)==0, "violations_by_AY": bad}
+    return checks
+
+def _dev_coverage(df: pd.DataFrame) -> dict:
+    ay = df["accident_year"].to_numpy(dtype="float64", na_value=np.nan)
+    dq = df["development_quarter"].to_numpy(dtype="float64", na_value=np.nan)
+    ok = ~(np.isnan(ay) | np.isnan(dq))
+    years, idx = np.unique(ay[ok], return_inverse=True)
+    top = np.full(years.size, -np.inf)
+    np.maximum.at(top, idx, dq[ok])
+    return {int(k): int(v) for k, v in zip(years, top)}
+
+def _age_to_age(df: pd.DataFrame, tri) -> dict:
+    ata = {}
+    try:
+        if tri is None:
+            tri = build_triangle(df)
+        cum = tri.cumulative("incurred_cum", portfolio=True)
+        col_sums = np.nansum(cum, axis=0)
+        for label, num, den in zip(tri.age_labels, col_sums[1:], col_sums[:-1]):
+            if den and den != 0:
+                ata[label] = float(num/den)
+    except Exception:
+        ata = {}
+    return ata
+
+@traced("eda")
+@memoize(maxsize=32, copy_result=copy.deepcopy)
+def build_eda(df: pd.DataFrame, tri=None, checks: bool = True) -> dict:
+    """Tur-1 EDA engine: summary, segment candidates, age-to-age, monotonicity, dev coverage and data-quality rules in one call."""
+    prof = _column_profile(df)
+    # segment candidates = low-cardinality columns (<=12 unique) or categorical-like
+    seg_candidates = [
+        {"column": c, "unique": int(u)} for c, u in prof["unique_counts"].items() if 1 < u <= 12
+    ]
+    out = {
+        "shape": {"rows": int(df.shape[0]), "cols": int(df.shape[1])},
+        "dtypes": prof["dtypes"],
+        "null_counts": prof["null_counts"],
+        "unique_counts": prof["unique_counts"],
+        "numeric_sums": prof["numeric_sums"],
+        "segment_candidates": seg_candidates,
+        "age_to_age_incurred": _age_to_age(df, tri),
+    }
+    if not checks:
+        return out
+    out["monotonicity"] = _monotonicity(df)
+    if {"accident_year","development_quarter"}.issubset(df.columns):
+        out["dev_quarter_max_by_AY"] = _dev_coverage(df)
+    out["data_quality"] = check_quality(df)
     return out
+
+def run_basic_eda(df: pd.DataFrame, tri=None) -> dict:
+    return build_eda(df, tri=tri)
@@ -0,0 +1,217 @@
+import numpy as np
+import pandas as pd
+
+from .outliers import register_outlier_method, _matrix, _long, _quiet
+from .reserving import _pairs, link_ratios, latest_diagonal
+from .triangle import segment_labels
+from .parallel import run_tasks
+from .memo import memoize
+
+# simulations per pool task are capped so one block's (sims × AY × dev) tensors stay under this
+ODP_BYTES_PER_TASK = 256 * 1024**2
+# float64 (sims × AY × dev) arrays alive at once inside a block
+_ODP_ARRAYS = 6
+PERCENTILES = (0.5, 0.75, 0.9, 0.95, 0.995)
+TOTAL = "Toplam"
+
+
+def _prefix_ldf(ldf: np.ndarray) -> np.ndarray:
+    # R[..., k] = f_0 · … · f_{k-1}, R[..., 0] = 1
+    ones = np.ones(ldf.shape[:-1] + (1,))
+    return np.concatenate([ones, np.cumprod(ldf, axis=-1)], axis=-1)
+
+def _projection(latest: np.ndarray, idx: np.ndarray, ldf: np.ndarray) -> np.ndarray:
+    # chain-ladder cumulative at every dev implied by the latest diagonal: fitted (k <= idx) and projected (k > idx)
+    R = _prefix_ldf(ldf)
+    R_idx = np.take_along_axis(R, np.maximum(idx, 0), axis=-1)
+    return latest[..., None] * R[..., None, :] / R_idx[..., None]
+
+def _incremental(C: np.ndarray) -> np.ndarray:
+    return np.diff(C, axis=-1, prepend=0.0)
+
+
+def mack_sigma2(C: np.ndarray, ldf: np.ndarray) -> np.ndarray:
+    """Mack's σ²_k (..., D-1); columns with a single link use Mack's log-linear extrapolation."""
+    num, den, ok = _pairs(C)
+    n = ok.sum(axis=-2)
+    with _quiet():
+        dev2 = np.where(ok, den * (num / np.where(ok, den, 1.0) - ldf[..., None, :]) ** 2, 0.0)
+        s2 = np.where(n > 1, dev2.sum(axis=-2) / (n - 1), np.nan)
+    for k in range(s2.shape[-1]):
+        if k >= 2:
+            a, b = s2[..., k - 2], s2[..., k - 1]
+            with _quiet():
+                ext = np.fmin(np.fmin(b * b / a, a), b)
+            s2[..., k] = np.where(np.isnan(s2[..., k]), ext, s2[..., k])
+    return np.nan_to_num(s2, nan=0.0)
+
+def mack_arrays(C: np.ndarray) -> dict:
+    """
+    Mack (1993) standard errors on stacked cumulative arrays (..., A, D), no tail.
+    Returns per-AY latest / ultimate / ibnr / se and the total reserve se along the leading dims.
+    """
+    C = np.asarray(C, dtype=float)
+    ldf = link_ratios(C, "volume")
+    s2 = mack_sigma2(C, ldf)
+    _, den, ok = _pairs(C)
+    S_k = np.where(ok, den, 0.0).sum(axis=-2)
+    latest, idx = latest_diagonal(C)
+    proj = _projection(latest, idx, ldf)
+    U = proj[..., -1]
+    k = np.arange(ldf.shape[-1])
+    future = (k >= idx[..., None]) & (idx[..., None] >= 0)
+    with _quiet():
+        term = np.where(S_k > 0, s2 / ldf ** 2, 0.0)
+        inv_S = np.where(S_k > 0, 1.0 / S_k, 0.0)
+        per_cell = term[..., None, :] * (1.0 / proj[..., :-1] + inv_S[..., None, :])
+    mse = np.nan_to_num(U) ** 2 * np.where(future, np.nan_to_num(per_cell), 0.0).sum(axis=-1)
+    # covariance between AYs: U_i · Σ_{younger l} U_l · Σ_{k >= I_i} 2σ²_k / (f_k² S_k)
+    U0 = np.nan_to_num(U)
+    younger = np.cumsum(U0[..., ::-1], axis=-1)[..., ::-1] - U0
+    cross = U0 * younger * np.where(future, 2 * term * inv_S[..., None, :], 0.0).sum(axis=-1)
+    ibnr = U - latest
+    return {
+        "ldf": ldf, "sigma2": s2, "latest": latest, "ultimate": U, "ibnr": ibnr,
+        "se": np.sqrt(mse), "total_ibnr": np.nansum(ibnr, axis=-1),
+        "total_se": np.sqrt(mse.sum(axis=-1) + cross.sum(axis=-1)),
+    }
+
+@memoize(maxsize=16, copy_result=pd.DataFrame.copy)
+def mack_table(tri, col: str = "incurred_cum", portfolio: bool = True) -> pd.DataFrame:
+    """Mack reserve table per (segment, AY) plus a total row per segment."""
+    C, segs = _matrix(tri, "cumulative", col, portfolio)
+    m = mack_arrays(C)
+    labels = segment_labels(segs)
+    frames = []
+    for i, seg in enumerate(labels):
+        has = ~np.isnan(m["latest"][i])
+        part = pd.DataFrame({
+            "segment": seg,
+            "accident_year": tri.accident_years[has].astype(int).astype(str),
+            "latest": m["latest"][i][has],
+            "ultimate": m["ultimate"][i][has],
+            "ibnr": m["ibnr"][i][has],
+            "mack_se": m["se"][i][has],
+        })
+        total = {"segment": seg, "accident_year": TOTAL, "latest": np.nansum(part["latest"]),
+                 "ultimate": np.nansum(part["ultimate"]), "ibnr": m["total_ibnr"][i], "mack_se": m["total_se"][i]}
+        frames.append(pd.concat([part, pd.DataFrame([total])], ignore_index=True))
+    out = pd.concat(frames, ignore_index=True)
+    with _quiet():
+        out["cv"] = np.where(out["ibnr"] != 0, out["mack_se"] / out["ibnr"].abs(), np.nan)
+    return out
+
+
+def odp_fit(C: np.ndarray) -> dict:
+    """
+    ODP fit of one (A, D) cumulative triangle: chain-ladder fitted incrementals, scaled Pearson
+    residuals over the observed cells, and the dispersion φ = Σr² / (n - p).
+    """
+    ldf = link_ratios(C, "volume")
+    latest, idx = latest_diagonal(C)
+    fitted = _incremental(_projection(latest, idx, ldf))
+    X = _incremental(C)
+    past = (np.arange(C.shape[-1]) <= idx[:, None]) & (idx[:, None] >= 0)
+    obs = past & ~np.isnan(X) & (fitted != 0)
+    with _quiet():
+        r = np.where(obs, (X - fitted) / np.sqrt(np.abs(fitted)), np.nan)
+    n = int(obs.sum())
+    p = int((idx >= 0).sum()) + C.shape[-1] - 1
+    phi = float(np.nansum(r ** 2) / (n - p)) if n > p else np.nan
+    adj = r * np.sqrt(n / (n - p)) if n > p else r
+    return {"fitted": fitted, "resid": adj, "obs": obs, "past": past, "idx": idx, "phi": phi, "n": n, "p": p}
+
+def _odp_block(fitted: np.ndarray, pool: np.ndarray, obs: np.ndarray, past: np.ndarray,
+               idx: np.ndarray, phi: float, n_sims: int, seed) -> np.ndarray:
+    # one block of simulations as (sims × AY × dev) tensors -> (sims, AY) reserve draws
+    rng = np.random.default_rng(seed)
+    B = n_sims
+    X = np.broadcast_to(fitted, (B,) + fitted.shape).copy()
+    r = pool[rng.integers(0, pool.size, size=(B, int(obs.sum())))]
+    X[:, obs] = fitted[obs] + r * np.sqrt(np.abs(fitted[obs]))
+    # pseudo triangle: cumulate the past cells only
+    Cp = np.cumsum(np.where(past, X, 0.0), axis=-1)
+    Cp[:, ~past] = np.nan
+    del X
+    ldf = link_ratios(Cp, "volume")
+    latest = np.take_along_axis(Cp, np.maximum(idx, 0)[None, :, None], axis=-1)[..., 0]
+    proj = _projection(latest, np.broadcast_to(idx, latest.shape), ldf)
+    mean = np.nan_to_num(np.where(past, 0.0, _incremental(proj)))
+    del Cp, proj
+    # process error: Gamma with mean m and variance φ·m (sign kept for negative means)
+    draw = np.sign(mean) * rng.gamma(np.abs(mean) / phi, phi)
+    out = draw.sum(axis=-1)
+    out[:, idx < 0] = np.nan
+    return out
+
+@memoize(maxsize=8, copy_result=lambda r: {k: v.copy() for k, v in r.items()})
+def odp_bootstrap(tri, col: str = "incurred_cum", n_sims: int = 10_000, seed: int = 0,
+                  portfolio: bool = True, workers=None) -> dict:
+    """
+    ODP bootstrap (England & Verrall) of the reserve: residual resampling + chain-ladder refit +
+    Gamma process error, batched as (sims × AY × dev) tensors. Blocks are sized to ODP_BYTES_PER_TASK,
+    seeded with SeedSequence.spawn and spread over the process pool. Returns segment -> (sims, AY) draws.
+    """
+    C, segs = _matrix(tri, "cumulative", col, portfolio)
+    root = np.random.SeedSequence(seed)
+    tasks, owners, fits = [], [], {}
+    for i, seg in enumerate(segment_labels(segs)):
+        fit = odp_fit(C[i])
+        pool = fit["resid"][fit["obs"]]
+        if not np.isfinite(fit["phi"]) or fit["phi"] <= 0 or pool.size == 0:
+            continue
+        fits[seg] = fit
+        A, D = C[i].shape
+        block = max(1, min(n_sims, ODP_BYTES_PER_TASK // (A * D * 8 * _ODP_ARRAYS)))
+        sizes = [block] * (n_sims // block) + ([n_sims % block] if n_sims % block else [])
+        for size, ss in zip(sizes, root.spawn(len(sizes))):
+            tasks.append((fit["fitted"], pool, fit["obs"], fit["past"], fit["idx"], fit["phi"], size, ss))
+            owners.append(seg)
+    results = run_tasks(_odp_block, tasks, workers=workers)
+    return {seg: np.vstack([r for r, o in zip(results, owners) if o == seg]) for seg in fits}
+
+def reserve_percentiles(tri, draws: dict, percentiles=PERCENTILES) -> pd.DataFrame:
+    """Mean / sd / percentiles of the simulated reserve per AY and in total, for every segment."""
+    frames = []
+    for seg, sims in draws.items():
+        # AYs without observations are NaN in every draw
+        keep = ~np.isnan(sims).all(axis=0)
+        cols = np.column_stack([sims[:, keep], np.nansum(sims, axis=1)])
+        ays = [str(a) for a in tri.accident_years[keep].astype(int)] + [TOTAL]
+        part = pd.DataFrame({"segment": seg, "accident_year": ays,
+                             "mean": cols.mean(axis=0), "sd": cols.std(axis=0, ddof=1)})
+        for p, q in zip(percentiles, np.quantile(cols, percentiles, axis=0)):
+            part[f"p{p * 100:g}"] = q
+        frames.append(part)
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+@register_outlier_method("odp", "ODP bootstrap + Mack (rezerv değişkenliği)",
+                         keywords=("odp", "mack", "over dispersed", "over-dispersed", "reserve bootstrap",
+                                   "stochastic reserv"),
+                         priority=20, threshold=3.0, n_sims=10_000, seed=0)
+def odp_residuals(tri, col: str = "incurred_cum", threshold: float = 3.0, n_sims: int = 10_000,
+                  seed: int = 0, portfolio: bool = False) -> pd.DataFrame:
+    """
+    Standardized Pearson residuals of the ODP chain-ladder fit per cell; |residual| >= threshold is
+    flagged. n_sims / seed are used by the Tur-3 renderer for the bootstrap itself.
+    """
+    C, segs = _matrix(tri, "cumulative", col, portfolio)
+    X = _incremental(C)
+    fitted = np.full(C.shape, np.nan)
+    resid = np.full(C.shape, np.nan)
+    phi = np.full(C.shape[:1] + C.shape[2:], np.nan)
+    for i in range(C.shape[0]):
+        fit = odp_fit(C[i])
+        fitted[i] = np.where(fit["past"], fit["fitted"], np.nan)
+        # standardized by √φ so the flag threshold is on the usual N(0, 1)-like scale
+        with _quiet():
+            resid[i] = fit["resid"] / np.sqrt(fit["phi"])
+        phi[i] = fit["phi"]
+    X = np.where(np.isnan(fitted), np.nan, X)
+    return _long(X, segs, tri, "development_quarter", tri.dev, "incremental", {
+        "fitted": fitted,
+        "residual": resid,
+        "is_outlier": np.abs(np.nan_to_num(resid)) >= threshold,
+        "phi": phi,
+    })
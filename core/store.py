@@ -0,0 +1,163 @@
+import os
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from .memo import fingerprint, _digest, _nbytes
+
+# process-wide cap on datasets nobody references any more; referenced ones are never evicted
+STORE_MAX_BYTES = int(os.environ.get("RESERVEAI_STORE_MAX_BYTES", 1024 ** 3))
+
+
+def _freeze(obj):
+    # stored form: arrays read-only (copied once only if the caller could still write them),
+    # frames detached from the caller's object (copy-on-write shares the column data)
+    if isinstance(obj, np.ndarray):
+        if obj.flags.writeable:
+            obj = obj.copy()
+            obj.setflags(write=False)
+        return obj
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return obj.copy(deep=False)
+    if isinstance(obj, (tuple, list)):
+        return [_freeze(v) for v in obj] if isinstance(obj, list) else tuple(_freeze(v) for v in obj)
+    if isinstance(obj, dict):
+        # JSON-like payloads (EDA): private containers, readers only ever get fresh ones from _view
+        return {k: _freeze(v) for k, v in obj.items()}
+    if isinstance(obj, bytearray):
+        return bytes(obj)
+    return obj
+
+def _view(obj):
+    # what a reader gets: zero-copy views and fresh containers, so in-place edits never reach the shared entry
+    if isinstance(obj, np.ndarray):
+        return obj.view()
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return obj.copy(deep=False)
+    if isinstance(obj, (tuple, list)):
+        return [_view(v) for v in obj] if isinstance(obj, list) else tuple(_view(v) for v in obj)
+    if isinstance(obj, dict):
+        return {k: _view(v) for k, v in obj.items()}
+    return obj
+
+
+class DatasetHandle:
+    """
+    A session's reference to a shared dataset. Holds only the content key; the data lives in the store.
+    Dropping the handle (or release()) decrements the reference count.
+    """
+    __slots__ = ("key", "_store", "_finalizer", "__weakref__")
+
+    def __init__(self, store, key: str):
+        self.key = key
+        self._store = store
+        self._finalizer = weakref.finalize(self, store._decref, key)
+        self._finalizer.atexit = False
+
+    def get(self):
+        if not self._finalizer.alive:
+            raise ValueError("Veri kümesi tanıtıcısı serbest bırakılmış.")
+        return self._store._get(self.key)
+
+    def release(self):
+        self._finalizer()
+
+    @property
+    def alive(self) -> bool:
+        return self._finalizer.alive
+
+    def __repr__(self):
+        return f"DatasetHandle({self.key[:12]}…, alive={self.alive})"
+
+
+class DatasetStore:
+    """
+    Reference-counted datasets keyed by content hash: sessions opening the same data share one
+    immutable copy. Entries whose count drops to zero stay cached (LRU) until the total exceeds
+    max_bytes; entries still referenced are never evicted.
+    """
+
+    def __init__(self, max_bytes: int = STORE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._refs = {}
+        # re-entrant: a handle collected while the lock is held calls back into _decref
+        self._lock = threading.RLock()
+        self.stats = {"puts": 0, "shared": 0, "evictions": 0}
+
+    def put(self, obj, key: str = None) -> DatasetHandle:
+        """
+        Stores obj (frame / array / Triangle / bytes / JSON-like dict, or a tuple of those) once per
+        content key; returns a new handle.
+        """
+        key = key or _digest(fingerprint(obj))
+        with self._lock:
+            self.stats["puts"] += 1
+            if key in self._entries:
+                self.stats["shared"] += 1
+                self._entries.move_to_end(key)
+            else:
+                self._entries[key] = _freeze(obj)
+            self._refs[key] = self._refs.get(key, 0) + 1
+            handle = DatasetHandle(self, key)
+            self._evict()
+        return handle
+
+    def open(self, key: str):
+        """A new handle on an entry that is already stored (another session put it), or None."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self.stats["shared"] += 1
+            self._entries.move_to_end(key)
+            self._refs[key] = self._refs.get(key, 0) + 1
+            return DatasetHandle(self, key)
+
+    def _get(self, key: str):
+        with self._lock:
+            self._entries.move_to_end(key)
+            return _view(self._entries[key])
+
+    def _decref(self, key: str):
+        with self._lock:
+            n = self._refs.get(key, 0) - 1
+            if n > 0:
+                self._refs[key] = n
+                return
+            self._refs.pop(key, None)
+            self._evict()
+
+    def _evict(self):
+        # oldest unreferenced entries first; sizes are re-read since Triangle views grow after put
+        total = sum(_nbytes(v) for v in self._entries.values())
+        for key in [k for k in self._entries if k not in self._refs]:
+            if total <= self.max_bytes:
+                break
+            total -= _nbytes(self._entries.pop(key))
+            self.stats["evictions"] += 1
+
+    def info(self) -> dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "referenced": len(self._refs),
+                "handles": sum(self._refs.values()),
+                "bytes": sum(_nbytes(v) for v in self._entries.values()),
+                "max_bytes": self.max_bytes,
+            }
+
+    def clear(self):
+        """Drops unreferenced entries (referenced ones stay valid for their handles)."""
+        with self._lock:
+            for key in [k for k in self._entries if k not in self._refs]:
+                del self._entries[key]
+
+
+_STORE = DatasetStore()
+
+def shared_store() -> DatasetStore:
+    return _STORE
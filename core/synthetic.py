@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+
+from .io import INPUT_COLS
+
+# development periods per accident year; "month" triangles keep the period index in development_quarter
+DEV_PERIODS = {"quarter": 4, "month": 12}
+
+
+def _keys(s, a, d, first_ay: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "line_of_business": np.char.mod("seg%03d", s),
+        "accident_year": first_ay + a,
+        "development_quarter": d + 1,
+    })
+
+def synthetic_triangle(n_segments: int = 4, n_ay: int = 20, n_dev: int = 40, dev_freq: str = "quarter",
+                       outlier_rate: float = 0.01, gap_rate: float = 0.01, nonmono_rate: float = 0.005,
+                       seed: int = 0, first_ay: int = 2000) -> tuple:
+    """
+    Kasko-shaped cumulative triangle frame (same columns as the sample CSV) for load / benchmark runs.
+    Every AY is observed up to the valuation (last AY year-end), capped at n_dev periods. Injected defects:
+    incremental spikes (outlier_rate), dropped cells (gap_rate) and incurred drops below the previous
+    period (nonmono_rate). Returns (df, truth) where truth maps each defect to its (segment, AY, dev) keys.
+    """
+    if dev_freq not in DEV_PERIODS:
+        raise ValueError(f"Bilinmeyen gelişim periyodu: {dev_freq} ({', '.join(DEV_PERIODS)})")
+    per_year = DEV_PERIODS[dev_freq]
+    rng = np.random.default_rng(seed)
+    S, A, D = n_segments, n_ay, n_dev
+    dev = np.arange(1, D + 1, dtype=float)
+    n_obs = np.minimum((A - np.arange(A)) * per_year, D)
+    obs = np.broadcast_to(dev[None, None, :] <= n_obs[None, :, None], (S, A, D))
+
+    exposure = rng.integers(5_000, 50_000, (S, A))
+    claims = rng.poisson(exposure * rng.uniform(0.05, 0.15, (S, 1)))
+    ult = claims * rng.lognormal(np.log(15_000), 0.3, (S, 1)) * rng.lognormal(0.0, 0.1, (S, A))
+    # development speed: 0.5 .. 2 years to reach ~63% of ultimate
+    tau = rng.uniform(0.5, 2.0, (S, 1, 1)) * per_year
+
+    def shares(speed, noise):
+        # noisy incremental share of ultimate per period (positive, so cumulatives are monotone)
+        pattern = 1.0 - np.exp(-dev / speed)
+        return np.diff(pattern, axis=-1, prepend=0.0) * rng.lognormal(0.0, noise, (S, A, D))
+
+    inc = ult[..., None] * shares(tau, 0.15)
+    outlier = obs & (rng.random((S, A, D)) < outlier_rate)
+    inc[outlier] *= rng.uniform(5.0, 20.0, int(outlier.sum()))
+    incurred = np.cumsum(inc, axis=-1)
+    paid = np.minimum(np.cumsum(ult[..., None] * shares(tau * 1.6, 0.2), axis=-1), incurred)
+    reported = np.floor(claims[..., None] * (1.0 - np.exp(-dev / (tau * 0.5))))
+
+    later = np.zeros((S, A, D), dtype=bool)
+    later[..., 1:] = True
+    nonmono = obs & later & ~outlier & (rng.random((S, A, D)) < nonmono_rate)
+    prev = np.concatenate([incurred[..., :1], incurred[..., :-1]], axis=-1)
+    incurred = np.where(nonmono, prev * rng.uniform(0.85, 0.97, (S, A, D)), incurred)
+    gap = obs & later & (rng.random((S, A, D)) < gap_rate)
+
+    s, a, d = np.nonzero(obs & ~gap)
+    df = _keys(s, a, d, first_ay)
+    df.insert(1, "valuation_quarter", f"{first_ay + A - 1}-Q4")
+    df.insert(4, "ultimate_incurred", np.round(ult[s, a], 2))
+    df.insert(5, "exposure_policies", exposure[s, a])
+    df.insert(6, "ultimate_claims", claims[s, a])
+    df["incurred_cum"] = np.round(incurred[s, a, d], 2)
+    df["paid_cum"] = np.round(paid[s, a, d], 2)
+    df["reported_claims_cum"] = reported[s, a, d].astype(np.int64)
+    truth = {name: _keys(*np.nonzero(m), first_ay) for name, m in
+             (("outliers", outlier & ~gap), ("non_monotone", nonmono & ~gap), ("gaps", gap))}
+    return df[INPUT_COLS], truth
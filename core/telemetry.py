@@ -0,0 +1,200 @@
+import contextvars
+import functools
+import os
+import secrets
+import threading
+import time
+from collections import deque
+
+# tracing is off unless a tracer is enabled (sidebar toggle) or RESERVEAI_TRACE=1
+MAX_SPANS = 10_000
+SERVICE_NAME = "reserveai"
+
+
+class Span:
+    __slots__ = ("name", "attrs", "span_id", "parent_id", "start_ns", "end_ns", "status", "error")
+
+    def __init__(self, name: str, attrs: dict, parent_id):
+        self.name = name
+        self.attrs = attrs
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = "ok"
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name, "span_id": self.span_id, "parent_id": self.parent_id,
+            "start_ns": self.start_ns, "end_ns": self.end_ns, "duration_ms": round(self.duration_ms, 3),
+            "status": self.status, "error": self.error, "attrs": dict(self.attrs),
+        }
+
+
+class _NoopSpan:
+    # shared do-nothing span: the disabled path allocates nothing
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+_NOOP = _NoopSpan()
+_CURRENT_SPAN = contextvars.ContextVar("reserveai_span", default=None)
+
+
+class _SpanScope:
+    __slots__ = ("tracer", "span", "token", "t0")
+
+    def __init__(self, tracer, span: Span):
+        self.tracer = tracer
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self.token = _CURRENT_SPAN.set(self.span)
+        self.t0 = time.perf_counter_ns()
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        span = self.span
+        # monotonic duration, wall-clock start
+        span.end_ns = span.start_ns + (time.perf_counter_ns() - self.t0)
+        if exc_type is not None:
+            span.status = "error"
+            span.error = f"{exc_type.__name__}: {exc}"
+        _CURRENT_SPAN.reset(self.token)
+        self.tracer._record(span)
+        return False
+
+
+class Tracer:
+    """
+    Collects finished spans (name, duration, attributes, parent) for one session / run.
+    Spans nest through a context variable, so threads and asyncio tasks keep their own parents.
+    """
+
+    def __init__(self, enabled: bool = False, max_spans: int = MAX_SPANS):
+        self.enabled = enabled
+        self.trace_id = secrets.token_hex(16)
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def span(self, name: str, **attrs):
+        if not self.enabled:
+            return _NOOP
+        parent = _CURRENT_SPAN.get()
+        return _SpanScope(self, Span(name, attrs, parent.span_id if isinstance(parent, Span) else None))
+
+    def _record(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    @property
+    def spans(self) -> list:
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+        self.trace_id = secrets.token_hex(16)
+
+    def to_records(self) -> list:
+        """Finished spans as plain dicts in start order (JSON export)."""
+        return [s.to_dict() for s in sorted(self.spans, key=lambda s: s.start_ns)]
+
+    def to_otlp(self, service: str = SERVICE_NAME) -> dict:
+        """OpenTelemetry OTLP/JSON-shaped trace (resourceSpans -> scopeSpans -> spans)."""
+        def attr(k, v):
+            if isinstance(v, bool):
+                return {"key": k, "value": {"boolValue": v}}
+            if isinstance(v, int):
+                return {"key": k, "value": {"intValue": str(v)}}
+            if isinstance(v, float):
+                return {"key": k, "value": {"doubleValue": v}}
+            return {"key": k, "value": {"stringValue": str(v)}}
+
+        spans = [{
+            "traceId": self.trace_id,
+            "spanId": s.span_id,
+            **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+            "name": s.name,
+            "kind": 1,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+            "attributes": [attr(k, v) for k, v in s.attrs.items() if v is not None],
+            "status": {"code": 2, "message": s.error} if s.status == "error" else {"code": 1},
+        } for s in sorted(self.spans, key=lambda s: s.start_ns)]
+        return {"resourceSpans": [{
+            "resource": {"attributes": [attr("service.name", service)]},
+            "scopeSpans": [{"scope": {"name": "reserveai.telemetry"}, "spans": spans}],
+        }]}
+
+    def summary(self) -> list:
+        """Per span name: count, total / mean / max milliseconds, errors (slowest first)."""
+        agg = {}
+        for s in self.spans:
+            a = agg.setdefault(s.name, {"name": s.name, "count": 0, "total_ms": 0.0, "max_ms": 0.0, "errors": 0})
+            a["count"] += 1
+            a["total_ms"] += s.duration_ms
+            a["max_ms"] = max(a["max_ms"], s.duration_ms)
+            a["errors"] += s.status == "error"
+        rows = sorted(agg.values(), key=lambda a: -a["total_ms"])
+        for a in rows:
+            a["mean_ms"] = a["total_ms"] / a["count"]
+        return rows
+
+
+_DEFAULT = Tracer(enabled=os.environ.get("RESERVEAI_TRACE", "").strip() in ("1", "true", "on"))
+_ACTIVE = contextvars.ContextVar("reserveai_tracer", default=_DEFAULT)
+
+def default_tracer() -> Tracer:
+    return _DEFAULT
+
+def current_tracer() -> Tracer:
+    return _ACTIVE.get()
+
+def activate(tracer: Tracer):
+    """Makes tracer the target of span() in the current context (e.g. one Streamlit session run)."""
+    return _ACTIVE.set(tracer)
+
+def span(name: str, **attrs):
+    """with span("eda", rows=n) as s: ... ; s.set(...) adds attributes. A no-op when tracing is off."""
+    tracer = _ACTIVE.get()
+    if not tracer.enabled:
+        return _NOOP
+    return tracer.span(name, **attrs)
+
+def annotate(**attrs):
+    """Adds attributes to the innermost open span (if any)."""
+    current = _CURRENT_SPAN.get()
+    if current is not None:
+        current.attrs.update(attrs)
+
+def traced(name: str = None):
+    """Decorator form of span(); the span name defaults to the function name."""
+    def deco(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _ACTIVE.get()
+            if not tracer.enabled:
+                return fn(*args, **kwargs)
+            with tracer.span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
@@ -0,0 +1,172 @@
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+VALUE_COLS = ("incurred_cum", "paid_cum", "reported_claims_cum")
+SEGMENT_COLS = ("line_of_business",)
+PORTFOLIO = "ALL"
+
+
+def _portfolio_sum(arr: np.ndarray) -> np.ndarray:
+    # sum over segments; cells unobserved in every segment stay NaN
+    empty = np.isnan(arr).all(axis=0)
+    out = np.nansum(arr, axis=0)
+    out[empty] = np.nan
+    return out
+
+
+def segment_labels(segments) -> np.ndarray:
+    # 1-D object array even when segments are tuples (several segment columns)
+    out = np.empty(len(segments), dtype=object)
+    out[:] = list(segments)
+    return out
+
+
+def _ffill_last_axis(arr: np.ndarray) -> np.ndarray:
+    n = arr.shape[-1]
+    idx = np.where(np.isnan(arr), 0, np.arange(n))
+    np.maximum.accumulate(idx, axis=-1, out=idx)
+    return np.take_along_axis(arr, idx, axis=-1)
+
+
+class Triangle:
+    """
+    Dense (segment × accident_year × development_quarter) view of a normalized frame.
+    Unobserved cells are NaN; cumulative / incremental / age-to-age views are computed
+    once per column and reused by every stage.
+    """
+
+    def __init__(self, values: dict, segments: list, accident_years: np.ndarray,
+                 dev: np.ndarray, segment_key=None):
+        self.values = values
+        self.segments = list(segments)
+        self.accident_years = np.asarray(accident_years)
+        self.dev = np.asarray(dev)
+        self.segment_key = segment_key
+        self._views = {}
+        self._fingerprint = None
+
+    @property
+    def shape(self) -> tuple:
+        return (len(self.segments), len(self.accident_years), len(self.dev))
+
+    @property
+    def columns(self) -> list:
+        return list(self.values)
+
+    @property
+    def age_labels(self) -> list:
+        return [f"{int(a)}->{int(b)}" for a, b in zip(self.dev[:-1], self.dev[1:])]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.values.values()) + sum(a.nbytes for a in self._views.values())
+
+    def __contains__(self, col) -> bool:
+        return col in self.values
+
+    def fingerprint(self) -> str:
+        # arrays are read-only, so the content hash is computed once
+        if self._fingerprint is None:
+            h = hashlib.blake2b(digest_size=16)
+            h.update(repr((self.segments, self.segment_key, self.accident_years.tolist(), self.dev.tolist())).encode("utf-8"))
+            for col in sorted(self.values):
+                h.update(col.encode("utf-8"))
+                h.update(np.ascontiguousarray(self.values[col]).tobytes())
+            self._fingerprint = h.hexdigest()
+        return self._fingerprint
+
+    def _view(self, kind: str, col: str, portfolio: bool, fn):
+        key = (kind, col, portfolio)
+        if key not in self._views:
+            arr = fn()
+            arr.setflags(write=False)
+            self._views[key] = arr
+        return self._views[key]
+
+    def cumulative(self, col: str = "incurred_cum", portfolio: bool = False) -> np.ndarray:
+        if not portfolio:
+            return self.values[col]
+        return self._view("cum", col, True, lambda: _portfolio_sum(self.values[col]))
+
+    def incremental(self, col: str = "incurred_cum", portfolio: bool = False) -> np.ndarray:
+        def _build():
+            cum = self.cumulative(col, portfolio)
+            # diff against the last observed cell, first observed cell keeps its cumulative value
+            prev = _ffill_last_axis(cum)[..., :-1]
+            inc = cum.copy()
+            inc[..., 1:] = cum[..., 1:] - prev
+            return np.where(np.isnan(inc), cum, inc)
+        return self._view("inc", col, portfolio, _build)
+
+    def ata(self, col: str = "incurred_cum", portfolio: bool = False) -> np.ndarray:
+        def _build():
+            cum = self.cumulative(col, portfolio)
+            den = cum[..., :-1]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return np.where(den != 0, cum[..., 1:] / den, np.nan)
+        return self._view("ata", col, portfolio, _build)
+
+    def to_frame(self, view: str = "cumulative", col: str = "incurred_cum",
+                 portfolio: bool = False) -> pd.DataFrame:
+        """Long (segment, accident_year, development_quarter, value) frame of observed cells."""
+        arr = getattr(self, view)(col, portfolio)
+        if portfolio:
+            arr = arr[None]
+        segs = [PORTFOLIO] if portfolio else self.segments
+        s, a, d = np.nonzero(~np.isnan(arr))
+        dev_col = "age" if view == "ata" else "development_quarter"
+        dev_vals = np.asarray(self.age_labels, dtype=object)[d] if view == "ata" else self.dev[d]
+        return pd.DataFrame({
+            "segment": segment_labels(segs)[s],
+            "accident_year": self.accident_years[a],
+            dev_col: dev_vals,
+            col: arr[s, a, d],
+        })
+
+
+def build_triangle(df: pd.DataFrame, value_cols=VALUE_COLS, segment_cols=None) -> Triangle:
+    if segment_cols is None:
+        segment_cols = [c for c in SEGMENT_COLS if c in df.columns]
+    segment_cols = list(segment_cols)
+
+    ay = pd.to_numeric(df["accident_year"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    dq = pd.to_numeric(df["development_quarter"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    if segment_cols:
+        g = df.groupby(segment_cols, sort=True, dropna=False, observed=True)
+        seg_idx = g.ngroup().to_numpy()
+        segments = g.size().index.tolist()
+    else:
+        seg_idx = np.zeros(len(df), dtype=np.intp)
+        segments = [PORTFOLIO]
+
+    keep = ~(np.isnan(ay) | np.isnan(dq))
+    years, ay_idx = np.unique(ay[keep].astype(np.int64), return_inverse=True)
+    if keep.any():
+        dmin, dmax = int(dq[keep].min()), int(dq[keep].max())
+    else:
+        dmin, dmax = 1, 0
+    dev = np.arange(dmin, dmax + 1)
+    dq_idx = dq[keep].astype(np.intp) - dmin
+    seg_idx = seg_idx[keep]
+
+    shape = (len(segments), len(years), len(dev))
+    values = {}
+    for col in value_cols:
+        if col not in df.columns:
+            continue
+        v = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)[keep]
+        ok = np.flatnonzero(~np.isnan(v))
+        arr = np.full(shape, np.nan)
+        # duplicate cells: last non-null row wins (same as pivot_table(aggfunc="last")); repeated indices
+        # in one fancy assignment have no guaranteed winner, so every cell is written exactly once
+        flat = np.ravel_multi_index((seg_idx[ok], ay_idx[ok], dq_idx[ok]), shape)
+        _, first_rev = np.unique(flat[::-1], return_index=True)
+        last = len(flat) - 1 - first_rev
+        arr.reshape(-1)[flat[last]] = v[ok[last]]
+        arr.setflags(write=False)
+        values[col] = arr
+
+    seg_key = segment_cols[0] if len(segment_cols) == 1 else (tuple(segment_cols) or None)
+    return Triangle(values, segments, years, dev, segment_key=seg_key)
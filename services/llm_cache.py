@@ -0,0 +1,124 @@
+# services/llm_cache.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# on: read-through cache, off: her çağrı API'ye gider, replay: yalnızca kayıtlı yanıtlar (ağ yok)
+CACHE_MODES = ("on", "off", "replay")
+DEFAULT_DIR = os.environ.get("RESERVEAI_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "reserveai"))
+DEFAULT_PATH = os.environ.get("RESERVEAI_LLM_CACHE", os.path.join(DEFAULT_DIR, "llm_cache.sqlite"))
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 5000
+DEFAULT_MAX_BYTES = 64 * 1024**2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    temperature REAL NOT NULL,
+    prompt_sha TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL,
+    size INTEGER NOT NULL
+)
+"""
+
+
+def cache_mode() -> str:
+    mode = os.environ.get("RESERVEAI_LLM_CACHE_MODE", "on").strip().lower()
+    return mode if mode in CACHE_MODES else "on"
+
+
+def prompt_key(model: str, temperature: float, prompt: str) -> tuple:
+    prompt_sha = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    key = hashlib.sha256(f"{model}\x00{float(temperature):.4f}\x00{prompt_sha}".encode("utf-8")).hexdigest()
+    return key, prompt_sha
+
+
+class LLMCache:
+    """
+    Disk tabanlı (SQLite) LLM yanıt önbelleği.
+    - Anahtar: (model, temperature, prompt hash)
+    - TTL'i geçen kayıtlar okunmaz; kayıt/boyut sınırı aşılınca en eski erişilen silinir (LRU).
+    - replay modunda TTL uygulanmaz: kaydedilmiş yanıtlar ağsız tekrar oynatılır.
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute(_SCHEMA)
+        self._conn.commit()
+
+    def get(self, model: str, temperature: float, prompt: str, ignore_ttl: bool = False):
+        key, _ = prompt_key(model, temperature, prompt)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key=?", (key,)).fetchone()
+            if row is None:
+                return None
+            if not ignore_ttl and self.ttl and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key=?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE responses SET last_access=? WHERE key=?", (now, key))
+            self._conn.commit()
+        return row[0]
+
+    def put(self, model: str, temperature: float, prompt: str, response: str):
+        key, prompt_sha = prompt_key(model, temperature, prompt)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?,?,?,?,?,?,?,?)",
+                (key, model, float(temperature), prompt_sha, response, now, now, len(response.encode("utf-8"))),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self.ttl:
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.ttl,))
+        n, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if n <= self.max_entries and total <= self.max_bytes:
+            return
+        # drop least recently used rows until both limits hold
+        drop, freed = 0, 0
+        for (size,) in self._conn.execute("SELECT size FROM responses ORDER BY last_access ASC"):
+            if n - drop <= self.max_entries and total - freed <= self.max_bytes:
+                break
+            drop += 1
+            freed += size
+        self._conn.execute(
+            "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)", (drop,)
+        )
+
+    def stats(self) -> dict:
+        with self._lock:
+            n, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        return {"entries": int(n), "bytes": int(total), "path": self.path}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+_DEFAULT = None
+_DEFAULT_LOCK = threading.Lock()
+
+def default_cache() -> LLMCache:
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            _DEFAULT = LLMCache()
+        return _DEFAULT
@@ -1,7 +1,16 @@
 # services/llm_client.py
+import asyncio
+import functools
+import hashlib
 import json
+import os
+import random
+import threading
+import time
 from typing import Union
-import streamlit as st
+
+from core.telemetry import span, annotate
+from services.llm_cache import cache_mode, default_cache
 
 def _extract_text(res) -> str | None:
     """
@@ -39,54 +48,415 @@ def _extract_text(res) -> str | None:
         return None
 
 
-def call_llm(api_key: str, model: str, prompt: str) -> Union[dict, str, None]:
+def _parse(text: str) -> Union[dict, str]:
+    annotate(response_chars=len(text))
+    # JSON parse denemesi
+    try:
+        return json.loads(text)
+    except Exception:
+        return text
+
+
+MAX_OUTPUT_TOKENS = 900
+
+
+class LLMError(RuntimeError):
+    """call_llm ailesinin hata türü; mesaj kullanıcıya gösterilecek biçimdedir (arayüz karar verir)."""
+
+
+MISSING_ARGS = "LLM çağrısı için API key / model / prompt eksik."
+REPLAY_MISS = "Replay modu: bu prompt için kayıtlı LLM yanıtı yok."
+EMPTY_RESPONSE = "LLM yanıtı boş veya beklenmeyen formatta geldi."
+
+
+class LLMSettings:
+    """Zaman aşımı / yeniden deneme ayarları (ortam değişkenleriyle değiştirilebilir)."""
+
+    def __init__(self, timeout: float = None, max_retries: int = None, backoff_base: float = 0.5,
+                 backoff_cap: float = 8.0, base_url: str = None):
+        self.timeout = float(timeout if timeout is not None else os.environ.get("RESERVEAI_LLM_TIMEOUT", 60))
+        self.max_retries = int(max_retries if max_retries is not None else os.environ.get("RESERVEAI_LLM_RETRIES", 3))
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.base_url = base_url or os.environ.get("RESERVEAI_LLM_BASE_URL") or None
+
+
+def _is_retryable(exc) -> bool:
+    import openai
+    if isinstance(exc, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError)):
+        return True
+    status = getattr(exc, "status_code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+def _backoff(settings: LLMSettings, attempt: int, exc) -> float:
+    # sunucu Retry-After verdiyse ona uy; yoksa full-jitter üstel bekleme
+    try:
+        retry_after = float(exc.response.headers.get("retry-after"))
+        return min(settings.backoff_cap, max(0.0, retry_after))
+    except Exception:
+        return random.uniform(0, min(settings.backoff_cap, settings.backoff_base * (2 ** attempt)))
+
+
+class ClientManager:
     """
-    Güçlü wrapper:
-    1) OpenAI Responses API'yi dener.
-    2) Olmazsa Chat Completions'a düşer.
-    3) Yanıt metnini JSON'a parse etmeye çalışır; olmazsa string döner.
-    4) Hataları Streamlit üzerinde gösterir (sessizce yutmaz).
+    API anahtarı (hash) + base_url başına tek OpenAI istemcisi: HTTP bağlantıları havuzlanır.
+    Her model için hangi API'nin (responses / chat) çalıştığını hatırlar; başarısız ilk denemenin
+    round-trip'i yalnızca bir kez ödenir.
     """
-    if not api_key or not model or not prompt:
-        st.error("LLM çağrısı için API key / model / prompt eksik.")
-        return None
 
+    def __init__(self, settings: LLMSettings = None):
+        self.settings = settings or LLMSettings()
+        self._clients = {}
+        self._async_clients = {}
+        self._flavor = {}
+        self._lock = threading.Lock()
+
+    def _key(self, api_key: str) -> tuple:
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest(), self.settings.base_url
+
+    def client(self, api_key: str):
+        key = self._key(api_key)
+        with self._lock:
+            if key not in self._clients:
+                from openai import OpenAI
+                self._clients[key] = OpenAI(api_key=api_key, base_url=self.settings.base_url,
+                                            timeout=self.settings.timeout, max_retries=0)
+            return self._clients[key]
+
+    def async_client(self, api_key: str):
+        # AsyncOpenAI'nin httpx havuzu ilk kullanıldığı event loop'a bağlıdır: loop başına bir istemci
+        loop = asyncio.get_running_loop()
+        key = self._key(api_key)
+        with self._lock:
+            for k in [k for k, (lp, _) in self._async_clients.items() if lp.is_closed()]:
+                del self._async_clients[k]
+            if (key, id(loop)) not in self._async_clients:
+                from openai import AsyncOpenAI
+                self._async_clients[(key, id(loop))] = (loop, AsyncOpenAI(
+                    api_key=api_key, base_url=self.settings.base_url, timeout=self.settings.timeout, max_retries=0))
+            return self._async_clients[(key, id(loop))][1]
+
+    def flavors(self, model: str) -> list:
+        known = self._flavor.get((self.settings.base_url, model))
+        return [known] if known else ["responses", "chat"]
+
+    def remember(self, model: str, flavor: str):
+        self._flavor[(self.settings.base_url, model)] = flavor
+
+    def forget(self, api_key: str = None):
+        # anahtar silindiğinde istemciyi (ve bağlantılarını) bırak
+        with self._lock:
+            keys = [k for k in self._clients if api_key is None or k == self._key(api_key)]
+            for k in keys:
+                self._clients.pop(k).close()
+            async_keys = [k for k in self._async_clients if api_key is None or k[0] == self._key(api_key)]
+            dropped = [self._async_clients.pop(k) for k in async_keys]
+        for loop, client in dropped:
+            _close_on_loop(loop, client)
+
+
+def _close_on_loop(loop, client):
+    # async istemci yalnızca kendi loop'unda kapatılabilir; loop zaten kapandıysa yapılacak bir şey yok
+    if loop.is_closed():
+        return
     try:
-        from openai import OpenAI
-        client = OpenAI(api_key=api_key)
+        if loop.is_running():
+            asyncio.run_coroutine_threadsafe(client.close(), loop)
+        else:
+            loop.run_until_complete(client.close())
+    except RuntimeError:
+        pass
 
-        # 1) Responses API
-        try:
-            res = client.responses.create(
-                model=model,
-                input=prompt,
-                temperature=0.2,
-                max_output_tokens=900,
-            )
-        except Exception as e1:
-            # 2) Chat Completions fallback
+
+_MANAGER = ClientManager()
+
+def get_client_manager() -> ClientManager:
+    return _MANAGER
+
+
+def release_api_key(api_key: str):
+    """Section kapanınca havuzdaki istemciyi de bırak (anahtar hafızada kalmasın)."""
+    if api_key:
+        _MANAGER.forget(api_key)
+
+
+def _usage(res) -> dict:
+    # token sayıları: responses API input/output_tokens, chat API prompt/completion_tokens
+    u = getattr(res, "usage", None)
+    if u is None:
+        return {}
+
+    def first(*names):
+        return next((getattr(u, n) for n in names if isinstance(getattr(u, n, None), int)), None)
+    return {"input_tokens": first("input_tokens", "prompt_tokens"),
+            "output_tokens": first("output_tokens", "completion_tokens"),
+            "total_tokens": first("total_tokens")}
+
+
+def _request(client, flavor: str, model: str, prompt: str, temperature: float):
+    if flavor == "responses":
+        return client.responses.create(
+            model=model,
+            input=prompt,
+            temperature=temperature,
+            max_output_tokens=MAX_OUTPUT_TOKENS,
+        )
+    return client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=temperature,
+        max_tokens=MAX_OUTPUT_TOKENS,
+    )
+
+
+def complete_text(api_key: str, model: str, prompt: str, temperature: float = 0.2, manager: ClientManager = None) -> str:
+    """
+    Ham metin yanıtı döner; hata durumunda exception fırlatır.
+    429/5xx/zaman aşımı için jitter'lı yeniden dener; responses API desteklenmiyorsa chat'e düşer
+    ve bu tercihi model için hatırlar.
+    """
+    manager = manager or _MANAGER
+    cfg = manager.settings
+    client = manager.client(api_key)
+    last = None
+    for flavor in manager.flavors(model):
+        for attempt in range(cfg.max_retries + 1):
             try:
-                res = client.chat.completions.create(
-                    model=model,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.2,
-                    max_tokens=900,
-                )
-            except Exception as e2:
-                st.error(f"LLM çağrısı başarısız: {e2 or e1}")
-                return None
-
-        text = _extract_text(res)
-        if not text or not isinstance(text, str):
-            st.error("LLM yanıtı boş veya beklenmeyen formatta geldi.")
-            return None
-
-        # JSON parse denemesi
+                res = _request(client, flavor, model, prompt, temperature)
+            except Exception as e:
+                last = e
+                if _is_retryable(e) and attempt < cfg.max_retries:
+                    time.sleep(_backoff(cfg, attempt, e))
+                    continue
+                break
+            text = _extract_text(res)
+            if not text or not isinstance(text, str):
+                raise ValueError(EMPTY_RESPONSE)
+            manager.remember(model, flavor)
+            annotate(api=flavor, attempts=attempt + 1, **_usage(res))
+            return text
+        if last is not None and _is_retryable(last):
+            # kalıcı 429/5xx: diğer API türünü denemek anlamsız
+            break
+    raise last
+
+
+async def acomplete_text(api_key: str, model: str, prompt: str, temperature: float = 0.2,
+                         manager: ClientManager = None) -> str:
+    """complete_text'in asyncio sürümü (AsyncOpenAI, asyncio.sleep ile backoff)."""
+    manager = manager or _MANAGER
+    cfg = manager.settings
+    client = manager.async_client(api_key)
+    last = None
+    for flavor in manager.flavors(model):
+        for attempt in range(cfg.max_retries + 1):
+            try:
+                res = await _request(client, flavor, model, prompt, temperature)
+            except Exception as e:
+                last = e
+                if _is_retryable(e) and attempt < cfg.max_retries:
+                    await asyncio.sleep(_backoff(cfg, attempt, e))
+                    continue
+                break
+            text = _extract_text(res)
+            if not text or not isinstance(text, str):
+                raise ValueError(EMPTY_RESPONSE)
+            manager.remember(model, flavor)
+            annotate(api=flavor, attempts=attempt + 1, **_usage(res))
+            return text
+        if last is not None and _is_retryable(last):
+            break
+    raise last
+
+
+def _stream_request(client, flavor: str, model: str, prompt: str, temperature: float):
+    if flavor == "responses":
+        return client.responses.create(
+            model=model,
+            input=prompt,
+            temperature=temperature,
+            max_output_tokens=MAX_OUTPUT_TOKENS,
+            stream=True,
+        )
+    return client.chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": prompt}],
+        temperature=temperature,
+        max_tokens=MAX_OUTPUT_TOKENS,
+        stream=True,
+    )
+
+
+def _delta_text(event) -> str | None:
+    # Responses API: response.output_text.delta olayları; Chat: choices[0].delta.content
+    if getattr(event, "type", None) == "response.output_text.delta":
+        return getattr(event, "delta", None)
+    try:
+        return event.choices[0].delta.content
+    except Exception:
+        return None
+
+
+def stream_text(api_key: str, model: str, prompt: str, temperature: float = 0.2, manager: ClientManager = None):
+    """
+    Metin parçalarını geldikçe üretir (generator). Yeniden deneme / API türü düşüşü yalnızca
+    ilk parça gelmeden önce yapılır; akış başladıktan sonraki hata çağırana iletilir.
+    """
+    manager = manager or _MANAGER
+    cfg = manager.settings
+    client = manager.client(api_key)
+    last = None
+    for flavor in manager.flavors(model):
+        for attempt in range(cfg.max_retries + 1):
+            try:
+                events = _stream_request(client, flavor, model, prompt, temperature)
+            except Exception as e:
+                last = e
+                if _is_retryable(e) and attempt < cfg.max_retries:
+                    time.sleep(_backoff(cfg, attempt, e))
+                    continue
+                break
+            manager.remember(model, flavor)
+            annotate(api=flavor, attempts=attempt + 1)
+            for event in events:
+                delta = _delta_text(event)
+                if delta:
+                    yield delta
+            return
+        if last is not None and _is_retryable(last):
+            break
+    raise last
+
+
+def _cached(model: str, prompt: str, temperature: float, cache):
+    # (store, text) — mode off ise store None
+    mode = cache_mode()
+    if mode == "off":
+        return None, None
+    try:
+        store = cache if cache is not None else default_cache()
+        text = store.get(model, temperature, prompt, ignore_ttl=(mode == "replay"))
+    except Exception:
+        return None, None
+    annotate(cache="hit" if text is not None else "miss")
+    return store, text
+
+
+def _store(store, model: str, temperature: float, prompt: str, text: str):
+    if store is not None:
         try:
-            return json.loads(text)
+            store.put(model, temperature, prompt, text)
         except Exception:
-            return text
+            pass
+
+
+def _llm_span(fn):
+    # her çağrı bir telemetri span'i: gecikme, prompt/yanıt boyutu, önbellek, API yolu, token kullanımı
+    def attrs(model, prompt):
+        return {"call": fn.__name__, "model": model, "prompt_chars": len(prompt or ""), "cache_mode": cache_mode()}
+
+    if asyncio.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def awrapper(api_key, model, prompt, *args, **kwargs):
+            with span("llm", **attrs(model, prompt)):
+                return await fn(api_key, model, prompt, *args, **kwargs)
+        return awrapper
 
+    @functools.wraps(fn)
+    def wrapper(api_key, model, prompt, *args, **kwargs):
+        with span("llm", **attrs(model, prompt)):
+            return fn(api_key, model, prompt, *args, **kwargs)
+    return wrapper
+
+
+@_llm_span
+def call_llm(api_key: str, model: str, prompt: str, temperature: float = 0.2, cache=None) -> Union[dict, str]:
+    """
+    Güçlü wrapper:
+    0) Önbellekte (model, temperature, prompt hash) varsa API'ye gitmeden döner;
+       RESERVEAI_LLM_CACHE_MODE=replay ise yalnızca kayıtlı yanıtlar kullanılır (ağ yok).
+    1) Havuzlanmış istemciyle, model için çalıştığı bilinen API'yi (responses / chat) dener;
+       429/5xx/zaman aşımında jitter'lı yeniden dener.
+    2) Yanıt metnini JSON'a parse etmeye çalışır; olmazsa string döner.
+    3) Hataları LLMError olarak fırlatır (sessizce yutmaz); gösterimi arayüz katmanı yapar.
+    """
+    mode = cache_mode()
+    if not model or not prompt or (not api_key and mode != "replay"):
+        raise LLMError(MISSING_ARGS)
+
+    store, text = _cached(model, prompt, temperature, cache)
+    if text is not None:
+        return _parse(text)
+    if mode == "replay":
+        raise LLMError(REPLAY_MISS)
+
+    try:
+        text = complete_text(api_key, model, prompt, temperature)
     except Exception as e:
-        st.error(f"LLM istemci hatası: {e}")
-        return None
+        raise LLMError(f"LLM çağrısı başarısız: {e}") from e
+    _store(store, model, temperature, prompt, text)
+    return _parse(text)
+
+
+@_llm_span
+async def acall_llm(api_key: str, model: str, prompt: str, temperature: float = 0.2, cache=None) -> Union[dict, str]:
+    """call_llm'in async sürümü; aynı önbellek ve hata sözleşmesi."""
+    mode = cache_mode()
+    if not model or not prompt or (not api_key and mode != "replay"):
+        raise LLMError(MISSING_ARGS)
+    store, text = _cached(model, prompt, temperature, cache)
+    if text is not None:
+        return _parse(text)
+    if mode == "replay":
+        raise LLMError(REPLAY_MISS)
+    try:
+        text = await acomplete_text(api_key, model, prompt, temperature)
+    except Exception as e:
+        raise LLMError(f"LLM çağrısı başarısız: {e}") from e
+    _store(store, model, temperature, prompt, text)
+    return _parse(text)
+
+
+@_llm_span
+def call_llm_stream(api_key: str, model: str, prompt: str, on_delta=None, on_key=None,
+                    temperature: float = 0.2, cache=None) -> Union[dict, str]:
+    """
+    call_llm ile aynı sözleşme, ama yanıt akışla gelir:
+    - on_delta(text_so_far): her parçada çağrılır (Streamlit placeholder güncellemesi için)
+    - on_key(key, value): üst seviye bir JSON anahtarının değeri tamamlanır tamamlanmaz çağrılır
+    Önbellekte varsa tam metin tek seferde iletilir.
+    """
+    from core.schemas import IncrementalJSON
+
+    mode = cache_mode()
+    if not model or not prompt or (not api_key and mode != "replay"):
+        raise LLMError(MISSING_ARGS)
+
+    parser = IncrementalJSON()
+
+    def _emit(buf: str, delta: str):
+        if on_delta:
+            on_delta(buf)
+        for key, value in parser.feed(delta):
+            if on_key:
+                on_key(key, value)
+
+    store, text = _cached(model, prompt, temperature, cache)
+    if text is not None:
+        _emit(text, text)
+        return _parse(text)
+    if mode == "replay":
+        raise LLMError(REPLAY_MISS)
+
+    buf = ""
+    try:
+        for delta in stream_text(api_key, model, prompt, temperature):
+            buf += delta
+            _emit(buf, delta)
+    except Exception as e:
+        raise LLMError(f"LLM çağrısı başarısız: {e}") from e
+    if not buf:
+        raise LLMError(EMPTY_RESPONSE)
+    _store(store, model, temperature, prompt, buf)
+    return _parse(buf)
@@ -0,0 +1,97 @@
+"""LLM istemcisi, yerel bir stub sunucuya karşı (ağ ve gerçek API anahtarı gerekmez)."""
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("openai")
+
+from services import llm_client  # noqa: E402
+from services.llm_client import ClientManager, LLMSettings, acall_llm, call_llm  # noqa: E402
+
+ANSWER = {"method": "iqr", "ok": True}
+
+
+class _Stub(BaseHTTPRequestHandler):
+    # /responses yok (404) -> istemci chat'e düşmeli; ilk `fail_first` chat isteği 503 döner
+    protocol_version = "HTTP/1.1"  # keep-alive: havuzdaki bağlantılar çağrılar arasında yeniden kullanılır
+    fail_first = 0
+    calls = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        type(self).calls.append((self.path, body.get("model")))
+        if self.path.endswith("/responses"):
+            return self._send(404, {"error": {"message": "not found", "type": "invalid_request_error"}})
+        if type(self).fail_first > 0:
+            type(self).fail_first -= 1
+            return self._send(503, {"error": {"message": "busy", "type": "server_error"}})
+        self._send(200, {
+            "id": "chatcmpl-stub", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": json.dumps(ANSWER)}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 5, "total_tokens": 8},
+        })
+
+    def _send(self, status: int, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Stub)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _Stub.calls, _Stub.fail_first = [], 0
+    manager = ClientManager(LLMSettings(timeout=5, max_retries=2, backoff_base=0.0,
+                                        base_url=f"http://127.0.0.1:{server.server_port}/v1"))
+    monkeypatch.setattr(llm_client, "_MANAGER", manager)
+    monkeypatch.setenv("RESERVEAI_LLM_CACHE_MODE", "off")
+    yield manager
+    manager.forget()
+    server.shutdown()
+    server.server_close()
+
+
+def test_call_llm_falls_back_to_chat_and_remembers(stub):
+    assert call_llm("sk-test", "stub-model", "prompt") == ANSWER
+    assert call_llm("sk-test", "stub-model", "prompt") == ANSWER
+    paths = [p for p, _ in _Stub.calls]
+    # responses API yalnızca bir kez denenir; sonraki çağrı doğrudan chat'e gider
+    assert paths == ["/v1/responses", "/v1/chat/completions", "/v1/chat/completions"]
+    assert stub.flavors("stub-model") == ["chat"]
+
+
+def test_call_llm_retries_server_errors(stub):
+    stub.remember("stub-model", "chat")
+    _Stub.fail_first = 2
+    assert call_llm("sk-test", "stub-model", "prompt") == ANSWER
+    assert len(_Stub.calls) == 3
+
+
+def test_acall_llm_survives_new_event_loops(stub):
+    # asyncio.run her seferinde yeni bir loop açar; önceki loop'un istemcisi yeniden kullanılmamalı
+    for _ in range(3):
+        assert asyncio.run(acall_llm("sk-test", "stub-model", "prompt")) == ANSWER
+
+
+def test_forget_closes_async_clients(stub):
+    async def run():
+        await acall_llm("sk-test", "stub-model", "prompt")
+        client = stub.async_client("sk-test")
+        stub.forget("sk-test")
+        await asyncio.sleep(0)
+        return client
+
+    client = asyncio.run(run())
+    assert client.is_closed()
+    assert not stub._async_clients
@@ -0,0 +1,22 @@
+"""Triangle construction (core.triangle.build_triangle)."""
+import numpy as np
+import pandas as pd
+
+from core.triangle import build_triangle
+
+
+def test_duplicate_cells_keep_last_non_null_row():
+    df = pd.DataFrame({
+        "line_of_business": ["A", "A", "A", "A", "B", "A"],
+        "accident_year": [2020, 2020, 2020, 2021, 2020, 2020],
+        "development_quarter": [1, 1, 2, 1, 1, 1],
+        "incurred_cum": [10.0, 20.0, 30.0, 40.0, 50.0, np.nan],
+    })
+    tri = build_triangle(df)
+    expected = df.dropna().pivot_table(index=["line_of_business","accident_year"], columns="development_quarter",
+                                       values="incurred_cum", aggfunc="last")
+    arr = tri.cumulative("incurred_cum")
+    assert arr[0, 0, 0] == 20.0  # A/2020/1: rows 10, 20, NaN -> last non-null
+    for (seg, ay), row in expected.iterrows():
+        s, a = tri.segments.index(seg), list(tri.accident_years).index(ay)
+        np.testing.assert_array_equal(arr[s, a], row.to_numpy())
@@ -1,6 +1,8 @@
 
 import streamlit as st
 
+from core.store import DatasetHandle
+
 def section_toggle(state_key: str, label: str = "Aktif mi?") -> bool:
     default = st.session_state.get(state_key, False)
     active = st.toggle(label, value=default, key=state_key)
@@ -9,4 +11,7 @@ def section_toggle(state_key: str, label: str = "Aktif mi?") -> bool:
 def secure_delete(keys):
     for k in keys:
         if k in st.session_state:
+            # shared datasets: drop this session's reference now, not whenever the session is collected
+            if isinstance(st.session_state[k], DatasetHandle):
+                st.session_state[k].release()
             del st.session_state[k]
@@ -0,0 +1,19 @@
+import streamlit as st
+
+from services.llm_client import LLMError
+
+def prompt_status(turn: str, built) -> bool:
+    """Shows the prompt size caption; False (with a warning) when the prompt is over its token budget."""
+    st.caption(f"{turn} prompt: ~{built.tokens:,} token (bütçe {built.budget:,}, sıkıştırma seviyesi {built.level})")
+    if built.over_budget:
+        st.warning(f"{turn} prompt en sıkı özetlemede bile token bütçesini aşıyor; LLM çağrısı yapılmadı.")
+        return False
+    return True
+
+def llm_or_error(fn, *args, **kw):
+    """Runs an LLM call (call_llm / call_llm_stream); an LLMError is shown in the page and gives None."""
+    try:
+        return fn(*args, **kw)
+    except LLMError as e:
+        st.error(str(e))
+        return None
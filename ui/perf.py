@@ -0,0 +1,37 @@
+import json
+
+import pandas as pd
+import streamlit as st
+
+from core.telemetry import Tracer
+
+def session_tracer() -> Tracer:
+    # one tracer per browser session; spans of other sessions never mix in
+    if "perf_tracer" not in st.session_state:
+        st.session_state["perf_tracer"] = Tracer()
+    return st.session_state["perf_tracer"]
+
+def render_perf_panel(tracer: Tracer):
+    """Sidebar panel: per-stage totals, the raw span list and JSON / OTLP downloads."""
+    if not tracer.enabled:
+        return
+    st.markdown("### Performans")
+    if st.button("Ölçümleri temizle", key="perf_clear"):
+        tracer.clear()
+    records = tracer.to_records()
+    if not records:
+        st.caption("Henüz ölçüm yok — bir Tur çalıştırın.")
+        return
+    summary = pd.DataFrame(tracer.summary())[["name", "count", "total_ms", "mean_ms", "max_ms", "errors"]]
+    st.dataframe(summary.round(1), use_container_width=True, hide_index=True)
+    with st.expander(f"Span'ler ({len(records)})", expanded=False):
+        spans = pd.DataFrame([{
+            "name": r["name"], "ms": r["duration_ms"], "status": r["status"],
+            "attrs": json.dumps(r["attrs"], ensure_ascii=False, default=str),
+        } for r in records])
+        st.dataframe(spans, use_container_width=True, hide_index=True)
+    c1, c2 = st.columns(2)
+    c1.download_button("JSON", json.dumps(records, ensure_ascii=False, default=str, indent=2),
+                       file_name="reserveai_spans.json", mime="application/json", key="perf_json")
+    c2.download_button("OTLP", json.dumps(tracer.to_otlp(), ensure_ascii=False, indent=2),
+                       file_name="reserveai_trace_otlp.json", mime="application/json", key="perf_otlp")
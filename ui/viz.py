@@ -0,0 +1,202 @@
+
+import streamlit as st
+import pandas as pd
+import numpy as np
+import altair as alt
+
+from core.triangle import build_triangle
+from core.outliers import apply_iqr_on_ata, apply_zscore_on_incremental  # noqa: F401 (re-exported)
+from core.evt import bootstrap_hill_many, evt_samples, gpd_threshold_scan
+from core.chartdata import ay_curves, paid_incurred_ratio, incremental_heatmap, outlier_scatter
+from core.reserving import chain_ladder, ldf_table
+from core.stochastic import mack_table, odp_bootstrap, reserve_percentiles, TOTAL
+from core.telemetry import traced, span
+
+# flagged rows shown in the table under each outlier chart (the chart itself is bounded by POINT_BUDGET)
+TABLE_ROWS = 1_000
+
+def _flag_table(flags: pd.DataFrame):
+    # only flagged cells, capped: the full method output (every cell) never goes to the browser
+    flagged = flags[flags["is_outlier"].fillna(False).astype(bool)] if "is_outlier" in flags else flags
+    note = f"; ilk {TABLE_ROWS:,} satır gösteriliyor" if len(flagged) > TABLE_ROWS else ""
+    st.caption(f"{len(flagged):,} / {len(flags):,} hücre işaretli{note}")
+    st.dataframe(flagged.head(TABLE_ROWS), use_container_width=True)
+
+def render_visuals(df_norm: pd.DataFrame, tur1_out, tur2_out, viz_spec=None, tri=None):
+    if tri is None:
+        tri = build_triangle(df_norm)
+    with span("chart:ay_curves"):
+        st.subheader("Incurred — AY Gelişim Eğrileri")
+        curve = alt.Chart(ay_curves(tri, "incurred_cum")).mark_line().encode(
+            x=alt.X("development_quarter:O", title="Gelişim Çeyreği"),
+            y=alt.Y("incurred_cum:Q", title="Kümülatif Incurred"),
+            color=alt.Color("accident_year:N", title="AY")
+        ).properties(height=300)
+        st.altair_chart(curve, use_container_width=True)
+
+    if "paid_cum" in tri and "incurred_cum" in tri:
+        with span("chart:paid_incurred_ratio"):
+            st.subheader("Paid / Incurred Oranı — Gelişim Çeyreği")
+            bar = alt.Chart(paid_incurred_ratio(tri)).mark_bar().encode(
+                x="development_quarter:O", y="ratio:Q"
+            ).properties(height=250)
+            st.altair_chart(bar, use_container_width=True)
+
+    # Heatmap: incremental incurred by AY vs DevQ
+    try:
+        with span("chart:incremental_heatmap"):
+            st.subheader("Incremental Incurred — Heatmap")
+            heat = alt.Chart(incremental_heatmap(tri, "incurred_cum")).mark_rect().encode(
+                x=alt.X("development_quarter:O", title="DevQ"),
+                y=alt.Y("accident_year:O", title="AY"),
+                color=alt.Color("inc_incr:Q", title="Incremental Incurred", scale=alt.Scale(scheme="blues"))
+            ).properties(height=250)
+            st.altair_chart(heat, use_container_width=True)
+    except Exception:
+        pass
+
+@traced("chart:outliers")
+def render_outlier_result(df_flags: pd.DataFrame):
+    if df_flags.empty:
+        st.info("Outlier bulunamadı (IQR/Tukey).")
+        return
+    st.subheader("Age-to-Age Faktörlerinde IQR Outlierları")
+    _flag_table(df_flags)
+    tooltip = ["accident_year","factor","lo","hi"]
+    chart = alt.Chart(outlier_scatter(df_flags, "age", "factor", tuple(tooltip))).mark_circle(size=90).encode(
+        x="age:N",
+        y="factor:Q",
+        color=alt.Color("is_outlier:N", title="Outlier?"),
+        tooltip=tooltip
+    ).properties(height=300)
+    st.altair_chart(chart, use_container_width=True)
+
+@traced("chart:outlier_iqr")
+def render_outlier_result_iqr(flags: pd.DataFrame):
+    st.subheader("IQR (Tukey) — Age-to-Age Faktör Outlierları")
+    if flags.empty:
+        st.info("Outlier bulunamadı.")
+        return
+    _flag_table(flags)
+    tooltip = ["segment","accident_year","factor","lo","hi"]
+    chart = alt.Chart(outlier_scatter(flags, "age", "factor", tuple(tooltip))).mark_circle(size=90).encode(
+        x="age:N", y="factor:Q", color="is_outlier:N",
+        tooltip=tooltip
+    ).properties(height=300)
+    st.altair_chart(chart, use_container_width=True)
+
+@traced("chart:outlier_zscore")
+def render_outlier_result_zscore(dfz: pd.DataFrame, z=3.0):
+    st.subheader(f"z-Score Outlierları (|z| ≥ {z}) — Incremental Incurred")
+    if dfz.empty:
+        st.info("Outlier bulunamadı.")
+        return
+    _flag_table(dfz)
+    tooltip = ["segment","accident_year","z","mu","sd"]
+    chart = alt.Chart(outlier_scatter(dfz, "development_quarter", "incremental", tuple(tooltip))).mark_circle(size=90).encode(
+        x="development_quarter:O", y="incremental:Q", color="is_outlier:N",
+        tooltip=tooltip
+    ).properties(height=300)
+    st.altair_chart(chart, use_container_width=True)
+
+@traced("chart:outlier_mad")
+def render_outlier_result_mad(dfm: pd.DataFrame, threshold=3.5):
+    st.subheader(f"MAD / Robust z Outlierları (|z| ≥ {threshold}) — Incremental Incurred")
+    if dfm.empty:
+        st.info("Outlier bulunamadı.")
+        return
+    _flag_table(dfm)
+    tooltip = ["segment","accident_year","robust_z","median","mad"]
+    chart = alt.Chart(outlier_scatter(dfm, "development_quarter", "incremental", tuple(tooltip))).mark_circle(size=90).encode(
+        x="development_quarter:O", y="incremental:Q", color="is_outlier:N",
+        tooltip=tooltip
+    ).properties(height=300)
+    st.altair_chart(chart, use_container_width=True)
+
+@traced("chart:outlier_evt")
+def render_outlier_result_evt(dfe: pd.DataFrame, tri, series="incremental", n_boot=2000):
+    st.subheader("EVT (POT) — Hill Grafiği ve Bootstrap Güven Bandı")
+    samples = evt_samples(tri, series=series)
+    hill = bootstrap_hill_many(samples, n_boot=n_boot)
+    if hill.empty:
+        st.info("EVT için yeterli pozitif gözlem yok.")
+        return
+    hill["segment"] = hill["segment"].astype(str)
+    band = alt.Chart(hill).mark_area(opacity=0.25).encode(x="k:Q", y="lo:Q", y2="hi:Q", color="segment:N")
+    line = alt.Chart(hill).mark_line().encode(
+        x=alt.X("k:Q", title="k (üst sıra istatistiği sayısı)"),
+        y=alt.Y("xi:Q", title="Hill ξ"),
+        color="segment:N",
+        tooltip=["segment","k","threshold","xi","lo","hi"]
+    )
+    st.altair_chart((band + line).properties(height=300), use_container_width=True)
+    st.caption("GPD eşik taraması (eşik kararlılığı)")
+    scan = pd.concat([gpd_threshold_scan(x).assign(segment=str(seg)) for seg, x in samples.items()], ignore_index=True)
+    st.dataframe(scan, use_container_width=True)
+    if dfe.empty:
+        st.info("Outlier bulunamadı.")
+        return
+    _flag_table(dfe)
+
+@traced("chart:outlier_odp")
+def render_outlier_result_odp(dfr: pd.DataFrame, tri, threshold=3.0, n_sims=10_000, seed=0):
+    st.subheader("ODP Bootstrap + Mack — Rezerv Değişkenliği")
+    st.caption("Mack (analitik) standart hataları")
+    st.dataframe(mack_table(tri), use_container_width=True)
+    draws = odp_bootstrap(tri, n_sims=n_sims, seed=seed)
+    if not draws:
+        st.info("ODP bootstrap için yeterli gözlem yok (n ≤ parametre sayısı).")
+    else:
+        st.caption(f"ODP bootstrap rezerv dağılımı ({n_sims:,} simülasyon, seed={seed})")
+        st.dataframe(reserve_percentiles(tri, draws), use_container_width=True)
+        total = np.nansum(next(iter(draws.values())), axis=1)
+        counts, edges = np.histogram(total, bins=50)
+        hist = pd.DataFrame({"lo": edges[:-1], "hi": edges[1:], "count": counts})
+        chart = alt.Chart(hist).mark_bar().encode(
+            x=alt.X("lo:Q", bin="binned", title=f"{TOTAL} rezerv"), x2="hi:Q", y=alt.Y("count:Q", title="Simülasyon")
+        ).properties(height=250)
+        st.altair_chart(chart, use_container_width=True)
+    st.caption(f"Standartlaştırılmış Pearson artıkları (|r| ≥ {threshold} işaretli)")
+    if dfr.empty:
+        st.info("Artık hesaplanamadı.")
+        return
+    tooltip = ["segment","accident_year","incremental","fitted","residual"]
+    chart = alt.Chart(outlier_scatter(dfr, "development_quarter", "residual", tuple(tooltip))).mark_circle(size=90).encode(
+        x="development_quarter:O", y="residual:Q", color="is_outlier:N",
+        tooltip=tooltip
+    ).properties(height=300)
+    st.altair_chart(chart, use_container_width=True)
+
+OUTLIER_RENDERERS = {
+    "iqr": lambda flags, params, tri: render_outlier_result_iqr(flags),
+    "zscore": lambda flags, params, tri: render_outlier_result_zscore(flags, z=params["z"]),
+    "mad": lambda flags, params, tri: render_outlier_result_mad(flags, threshold=params["threshold"]),
+    "evt": lambda flags, params, tri: render_outlier_result_evt(flags, tri, series=params["series"]),
+    "odp": lambda flags, params, tri: render_outlier_result_odp(
+        flags, tri, threshold=params["threshold"], n_sims=params["n_sims"], seed=params["seed"]),
+}
+
+def render_outlier_method(method, flags: pd.DataFrame, tri=None, **params):
+    kw = dict(method.defaults)
+    kw.update(params)
+    OUTLIER_RENDERERS[method.name](flags, kw, tri)
+
+@traced("chart:reserves")
+def render_reserves(tri, df_norm: pd.DataFrame = None, col="incurred_cum", tail=True):
+    st.subheader("Chain-Ladder — LDF, Ultimate ve IBNR")
+    if col not in tri:
+        st.info(f"Chain-ladder için '{col}' kolonu yok.")
+        return
+    ldfs = ldf_table(tri, col=col, tail=tail, portfolio=True)
+    iqr_ex = ldf_table(tri, col=col, methods=("volume",), exclude="iqr", tail=tail, portfolio=True)
+    ldfs = pd.concat([ldfs, iqr_ex.assign(method="volume (IQR hariç)")], ignore_index=True)
+    st.dataframe(ldfs.pivot(index="age", columns="method", values="ldf").reindex(tri.age_labels), use_container_width=True)
+    res = chain_ladder(tri, col=col, tail=tail, portfolio=True, df=df_norm)
+    st.dataframe(res, use_container_width=True)
+    st.caption(f"Toplam IBNR: {res['ibnr'].sum():,.0f} (tail faktörü: {ldfs['tail'].iloc[0]:.4f})")
+    bars = alt.Chart(res).mark_bar().encode(
+        x=alt.X("accident_year:O", title="AY"),
+        y=alt.Y("ibnr:Q", title="IBNR"),
+        tooltip=["accident_year","latest","cdf","ultimate","ibnr"]
+    ).properties(height=250)
+    st.altair_chart(bars, use_container_width=True)